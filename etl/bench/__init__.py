@@ -0,0 +1 @@
+"""Bench package for benchmarking the ETL process against synthetic game files."""
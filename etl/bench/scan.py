@@ -0,0 +1,156 @@
+"""Benchmark of the bundle scan against synthetic installs.
+
+Every scale is generated once with the synthetic module, then the get_ids
+stage is run on it once per backend, each in a new process so that its peak
+memory is measured on its own. The backends are thread counts of the scan.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from os.path import abspath, dirname, isfile, join
+from typing import Any, Dict, List
+
+# Add etl/ to sys.path so 'util' and 'services' are importable, as when running main.py
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from bench.synthetic import SCALES, SyntheticGame
+from services.memory_service import peak_rss_mb
+from util import CONFIG
+
+
+def scan(root: str, threads: int) -> Dict[str, Any]:
+    """Run the get_ids stage on a synthetic install.
+
+    Meant to be run in its own process, as it sets the thread count of the
+    services.
+
+    Args:
+        root: Directory of the synthetic install.
+        threads: Amount of threads scanning the bundles.
+
+    Returns:
+        Dictionary with the wall time, CPU time, peak resident memory and
+        counters of the scan.
+    """
+    # pylint: disable=import-outside-toplevel
+    from services import data_service
+    from services.metrics_service import METRICS
+    from util import Install, Workspace
+
+    install = Install(SyntheticGame(root).game_path, "synthetic")
+    CONFIG.override(num_threads=threads)
+
+    workspace = Workspace.temporary()
+    try:
+        service = data_service.DataService(workspace, install)
+
+        baseline_rss = peak_rss_mb()
+        METRICS.reset()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        service.get_ids()
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = time.process_time() - cpu_start
+    finally:
+        workspace.remove()
+
+    counters = METRICS.report()["counters"]
+    return {
+        "threads": threads,
+        "bundles": counters.get("bundles", 0),
+        "bytes_read": counters.get("bytes_read", 0),
+        "wall_seconds": round(wall_seconds, 3),
+        "cpu_seconds": round(cpu_seconds, 3),
+        "bundles_per_second": round(counters.get("bundles", 0) / wall_seconds, 1),
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "records": {
+            name.split(".", 1)[1]: value
+            for name, value in counters.items()
+            if name.startswith("records.")
+        },
+    }
+
+
+def benchmark(
+    corpus: str, scales: List[str], threads: List[int]
+) -> List[Dict[str, Any]]:
+    """Benchmark the scan of every scale with every backend.
+
+    Args:
+        corpus: Directory holding one synthetic install per scale, which are
+            generated if missing.
+        scales: Names of the scales, see SCALES.
+        threads: Thread counts to scan with.
+
+    Returns:
+        List of scan results, with their scale and backend.
+    """
+    logger = logging.getLogger("Benchmark")
+    results = []
+
+    for scale in scales:
+        root = join(corpus, scale)
+        if not isfile(join(root, "synthetic.json")):
+            logger.info("Generating %s bundles in %s", scale, root)
+            SyntheticGame(root).generate(SCALES[scale])
+
+        for thread_count in threads:
+            backend = f"threads-{thread_count}"
+            logger.info("Scanning %s bundles with %s", scale, backend)
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                result = executor.submit(scan, abspath(root), thread_count).result()
+            results.append({"scale": scale, "backend": backend, **result})
+            logger.info(
+                "%s %s: %.2fs wall, %.2fs CPU, %s MiB peak RSS",
+                scale,
+                backend,
+                result["wall_seconds"],
+                result["cpu_seconds"],
+                result["peak_rss_mb"],
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument(
+        "--corpus",
+        default="./bench",
+        help="directory holding the synthetic installs",
+    )
+    parser.add_argument(
+        "--scale",
+        nargs="+",
+        choices=SCALES,
+        default=["1k"],
+        help="amounts of bundles to benchmark",
+    )
+    parser.add_argument(
+        "--threads",
+        nargs="+",
+        type=int,
+        default=sorted({1, CONFIG.num_threads}),
+        help="thread counts to scan with",
+    )
+    parser.add_argument("--report", help="path of a JSON file to write results to")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s|%(name)s|%(levelname)s]: %(message)s",
+    )
+
+    bench_results = benchmark(args.corpus, args.scale, args.threads)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as report_file:
+            json.dump(bench_results, report_file, indent=4)
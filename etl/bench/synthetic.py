@@ -0,0 +1,582 @@
+"""Generator of synthetic Master Duel installs for benchmarking the ID scan.
+
+UnityPy can only save files it loaded, so the asset bundles are written from
+scratch: the objects are serialized with the type trees UnityPy ships for the
+game's Unity version, and stored in an uncompressed UnityFS bundle holding a
+single serialized file without embedded type trees, like the game bundles.
+"""
+
+import argparse
+import json
+import os
+import random
+import struct
+from os.path import join
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from UnityPy.helpers import Tpk
+from UnityPy.helpers.TypeTreeHelper import write_typetree
+from UnityPy.streams import EndianBinaryWriter
+
+UNITY_VERSION = "2020.3.41f1"
+# Unity class IDs of the serialized objects
+TEXTURE_2D = 28
+TEXT_ASSET = 49
+ASSET_BUNDLE = 142
+
+# Bundle counts of the benchmark scales
+SCALES: Dict[str, int] = {"1k": 1_000, "10k": 10_000, "50k": 50_000}
+
+# Object of a bundle: container path, if listed, class ID and field values
+BundleObject = Tuple[Optional[str], int, Dict[str, Any]]
+
+
+def _default_value(node: Any) -> Any:
+    """Build the zero value of a type tree node.
+
+    Args:
+        node: Type tree node.
+
+    Returns:
+        Value that can be written with the node.
+    """
+    if node.m_Type == "string":
+        return ""
+    if node.m_Type in ("float", "double"):
+        return 0.0
+    if node.m_Type == "bool":
+        return False
+    if node.m_Type == "TypelessData":
+        return b""
+    if node.m_Children and node.m_Children[0].m_Type == "Array":
+        return []
+    if not node.m_Children:
+        return 0
+    return {child.m_Name: _default_value(child) for child in node.m_Children}
+
+
+def serialize_object(class_id: int, **values: Any) -> bytes:
+    """Serialize an object with the type tree of the game's Unity version.
+
+    Args:
+        class_id: Unity class ID of the object.
+        **values: Values of the fields to set, the others are zero.
+
+    Returns:
+        Serialized object.
+    """
+    if Tpk.TPKTYPETREE is None:
+        Tpk.init()
+    version = tuple(int(part) for part in UNITY_VERSION.replace("f", ".").split("."))
+    node = Tpk.get_typetree_node(class_id, version)
+
+    value = _default_value(node)
+    value.update(values)
+    writer = EndianBinaryWriter(endian="<")
+    write_typetree(value, node, writer)
+    return writer.bytes
+
+
+def build_serialized_file(objects: List[Tuple[int, int, bytes]]) -> bytes:
+    """Build a version 22 serialized file without embedded type trees.
+
+    Args:
+        objects: List of (path_id, class_id, data) tuples.
+
+    Returns:
+        Serialized file.
+    """
+    class_ids = sorted({class_id for _, class_id, _ in objects})
+
+    metadata = EndianBinaryWriter(endian="<")
+    metadata.write_string_to_null(UNITY_VERSION)
+    metadata.write_int(19)  # StandaloneWindows64
+    metadata.write_boolean(False)  # No type trees
+    metadata.write_int(len(class_ids))
+    for class_id in class_ids:
+        metadata.write_int(class_id)
+        metadata.write_boolean(False)  # Not stripped
+        metadata.write_short(-1)  # No script
+        metadata.write_bytes(bytes(16))  # Type hash
+
+    data = EndianBinaryWriter(endian="<")
+    metadata.write_int(len(objects))
+    for path_id, class_id, object_data in objects:
+        metadata.align_stream()
+        metadata.write_long(path_id)
+        metadata.write_long(data.Position)
+        metadata.write_u_int(len(object_data))
+        metadata.write_int(class_ids.index(class_id))
+        data.write_bytes(object_data)
+        data.align_stream(8)
+
+    metadata.write_int(0)  # Scripts
+    metadata.write_int(0)  # Externals
+    metadata.write_int(0)  # Referenced types
+    metadata.write_string_to_null("")  # User information
+
+    header_size = 48
+    data_offset = header_size + metadata.Length
+    data_offset += (16 - data_offset % 16) % 16
+
+    writer = EndianBinaryWriter(endian=">")
+    writer.write_u_int_array([0, 0, 22, 0])
+    writer.write_boolean(False)  # Little endian metadata and data
+    writer.write_bytes(bytes(3))
+    writer.write_u_int(metadata.Length)
+    writer.write_long(data_offset + data.Length)
+    writer.write_long(data_offset)
+    writer.write_long(0)
+    writer.write_bytes(metadata.bytes)
+    writer.write_bytes(bytes(data_offset - writer.Length))
+    writer.write_bytes(data.bytes)
+    return writer.bytes
+
+
+def build_bundle(name: str, objects: List[BundleObject]) -> bytes:
+    """Build an uncompressed UnityFS bundle.
+
+    Args:
+        name: Name of the bundle, also used for its serialized file.
+        objects: Objects of the bundle, in path ID order. Objects without a
+            container path are only referenced by the listed ones.
+
+    Returns:
+        Bundle file.
+    """
+    serialized_objects = [
+        (path_id, class_id, serialize_object(class_id, **values))
+        for path_id, (_, class_id, values) in enumerate(objects, 2)
+    ]
+    container = [
+        (
+            container_path,
+            {
+                "preloadIndex": 0,
+                "preloadSize": 0,
+                "asset": {"m_FileID": 0, "m_PathID": path_id},
+            },
+        )
+        for path_id, (container_path, _, _) in enumerate(objects, 2)
+        if container_path is not None
+    ]
+    asset_bundle = serialize_object(
+        ASSET_BUNDLE, m_Name=name, m_Container=container, m_AssetBundleName=name
+    )
+    serialized_file = build_serialized_file(
+        [(1, ASSET_BUNDLE, asset_bundle)] + serialized_objects
+    )
+    file_name = f"CAB-{name}"
+
+    blocks_info = EndianBinaryWriter(endian=">")
+    blocks_info.write_bytes(bytes(16))  # Data hash
+    blocks_info.write_int(1)
+    blocks_info.write_u_int(len(serialized_file))
+    blocks_info.write_u_int(len(serialized_file))
+    blocks_info.write_u_short(0x40)  # Uncompressed
+    blocks_info.write_int(1)
+    blocks_info.write_long(0)
+    blocks_info.write_long(len(serialized_file))
+    blocks_info.write_u_int(4)  # Serialized file
+    blocks_info.write_string_to_null(file_name)
+
+    writer = EndianBinaryWriter(endian=">")
+    writer.write_string_to_null("UnityFS")
+    writer.write_u_int(7)
+    writer.write_string_to_null("5.x.x")
+    writer.write_string_to_null(UNITY_VERSION)
+    size_position = writer.Position
+    writer.write_long(0)
+    writer.write_u_int(blocks_info.Length)
+    writer.write_u_int(blocks_info.Length)
+    writer.write_u_int(0x40)  # Blocks and directory info combined
+    writer.align_stream(16)
+    writer.write_bytes(blocks_info.bytes)
+    writer.write_bytes(serialized_file)
+
+    bundle = bytearray(writer.bytes)
+    bundle[size_position : size_position + 8] = struct.pack(">q", len(bundle))
+    return bytes(bundle)
+
+
+class SyntheticGame:
+    """Generator of a fake install with the asset bundles the ID scan reads.
+
+    Bundles are laid out like the game's, in directories named after the first
+    two hex digits of the bundle name, split between the LocalData and the
+    StreamingAssets directories. Besides the bundles of each category the ETL
+    extracts, about half of the bundles hold unrelated assets, which are scanned but
+    skipped. The same seed and bundle count always give the same install.
+
+    Only the names and layout of the bundles match the game's. The image data
+    is shorter than the declared texture size and the card data is random,
+    so the steps after the scan, which decode them, fail on the install.
+    """
+
+    # Share of the bundles of each category, the rest are unrelated assets
+    shares: Dict[str, float] = {
+        "card": 0.4,
+        "icon": 0.06,
+        "sleeve": 0.02,
+        "deck_box": 0.01,
+        "wallpaper": 0.01,
+        "field": 0.005,
+        "coin": 0.002,
+    }
+    # Share of the bundles stored in StreamingAssets
+    streaming_share: float = 0.1
+    # Size of the image data of every texture, whatever its declared size
+    texture_bytes: int = 4096
+    # Size of the card data TextAssets, which hold random bytes
+    card_data_bytes: int = 65536
+
+    def __init__(self, root: str, seed: int = 0) -> None:
+        """Initialize the SyntheticGame.
+
+        Args:
+            root: Directory of the install.
+            seed: Seed of the generated names and data.
+        """
+        self.root = root
+        self.game_path = join(root, "LocalData", "5eed0000", "0000")
+        self.streaming_path = join(
+            root, "masterduel_Data", "StreamingAssets", "AssetBundle"
+        )
+        self.random = random.Random(seed)
+        self.names: Set[str] = set()
+
+    def generate(self, bundles: int) -> Dict[str, int]:
+        """Write the bundles of the install.
+
+        Args:
+            bundles: Amount of bundles to write. At least one item of every
+                category is written, so small installs can have more.
+
+        Returns:
+            Dictionary mapping each category to the amount of bundles written.
+        """
+        counts = {"card_data": 0, "face": 0}
+        for category in counts:
+            for objects in getattr(self, f"_{category}")(0):
+                self._write(objects)
+                counts[category] += 1
+
+        for category, share in self.shares.items():
+            counts[category] = 0
+            generator = getattr(self, f"_{category}")
+            index = 0
+            while counts[category] < max(int(bundles * share), 1):
+                for objects in generator(index):
+                    self._write(objects)
+                    counts[category] += 1
+                index += 1
+
+        counts["other"] = max(bundles - sum(counts.values()), 0)
+        for index in range(counts["other"]):
+            for objects in self._other(index):
+                self._write(objects)
+
+        with open(join(self.root, "synthetic.json"), "w", encoding="utf-8") as file:
+            json.dump({"bundles": bundles, "counts": counts}, file, indent=4)
+        return counts
+
+    def _write(self, objects: List[BundleObject]) -> None:
+        """Write a bundle under a new name.
+
+        Args:
+            objects: Objects of the bundle.
+        """
+        name = f"{self.random.getrandbits(32):08x}"
+        while name in self.names:
+            name = f"{self.random.getrandbits(32):08x}"
+        self.names.add(name)
+
+        is_streaming = self.random.random() < self.streaming_share
+        directory = join(
+            self.streaming_path if is_streaming else self.game_path, name[:2]
+        )
+        os.makedirs(directory, exist_ok=True)
+        with open(join(directory, name), "wb") as file:
+            file.write(build_bundle(name, objects))
+
+    def _texture(
+        self, name: str, width: int = 256, height: int = 256
+    ) -> Dict[str, Any]:
+        """Build the fields of a texture.
+
+        Args:
+            name: Name of the texture.
+            width: Width in pixels.
+            height: Height in pixels.
+
+        Returns:
+            Fields of the texture.
+        """
+        return {
+            "m_Name": name,
+            "m_Width": width,
+            "m_Height": height,
+            "m_CompleteImageSize": self.texture_bytes,
+            "m_TextureFormat": 4,  # RGBA32
+            "m_MipCount": 1,
+            "m_ImageCount": 1,
+            "m_TextureDimension": 2,
+            "image data": self.random.randbytes(self.texture_bytes),
+        }
+
+    def _card_data(self, _: int) -> List[List[BundleObject]]:
+        """Build the bundles of the encrypted card data parts.
+
+        Returns:
+            One bundle per card data part.
+        """
+        return [
+            [
+                (
+                    f"assets/resourcesassetbundle/card/data/en-us/{part}.bytes",
+                    TEXT_ASSET,
+                    {
+                        "m_Name": part,
+                        "m_Script": self.random.randbytes(self.card_data_bytes).decode(
+                            "utf-8", "surrogateescape"
+                        ),
+                    },
+                )
+            ]
+            for part in ("card_indx", "card_name", "card_desc", "card_prop")
+        ]
+
+    def _face(self, _: int) -> List[List[BundleObject]]:
+        """Build the bundle holding all card faces, in two widths.
+
+        Returns:
+            Single bundle, listing only the card picture setting.
+        """
+        frames = [0, 1, 2, 3, 7, 8, 9, 10, 12, 13, 14, 15, 16, 17, 18, 19]
+        faces = [
+            (None, TEXTURE_2D, self._texture(f"card_frame{frame:02d}", width, 1024))
+            for frame in frames
+            for width in (480, 704)
+        ]
+        return [
+            [
+                (
+                    "assets/resourcesassetbundle/card/scriptableobjects/"
+                    "cardpicturesetting/cardpicturesetting.asset",
+                    TEXT_ASSET,
+                    {"m_Name": "CardPictureSetting", "m_Script": ""},
+                )
+            ]
+            + faces
+        ]
+
+    def _card(self, index: int) -> List[List[BundleObject]]:
+        """Build the bundle of a card illustration.
+
+        Args:
+            index: Index of the card.
+
+        Returns:
+            Single bundle.
+        """
+        region = "tcg" if index % 5 == 0 else "common"
+        card_id = str(4007 + index)
+        return [
+            [
+                (
+                    "assets/resourcesassetbundle/card/images/illust/"
+                    f"{region}/{card_id}.jpg",
+                    TEXTURE_2D,
+                    self._texture(card_id, 512, 512),
+                )
+            ]
+        ]
+
+    def _icon(self, index: int) -> List[List[BundleObject]]:
+        """Build the bundles of a profile icon.
+
+        Args:
+            index: Index of the icon.
+
+        Returns:
+            One bundle per icon size.
+        """
+        icon_id = 1000001 + index
+        return [
+            [
+                (
+                    f"assets/resourcesassetbundle/images/profileicon/{size}/"
+                    f"profileicon{icon_id}.png",
+                    TEXTURE_2D,
+                    self._texture(f"ProfileIcon{icon_id}", size, size),
+                )
+            ]
+            for size in (128, 256, 512)
+        ]
+
+    def _sleeve(self, index: int) -> List[List[BundleObject]]:
+        """Build the bundle of a sleeve.
+
+        Args:
+            index: Index of the sleeve.
+
+        Returns:
+            Single bundle.
+        """
+        sleeve_id = 1070001 + index
+        return [
+            [
+                (
+                    f"assets/resourcesassetbundle/protector/common/{sleeve_id}/"
+                    f"protectoricon{sleeve_id}.png",
+                    TEXTURE_2D,
+                    self._texture(f"ProtectorIcon{sleeve_id}"),
+                )
+            ]
+        ]
+
+    def _deck_box(self, index: int) -> List[List[BundleObject]]:
+        """Build the bundle of a deck box, holding all its images.
+
+        Args:
+            index: Index of the deck box.
+
+        Returns:
+            Single bundle, listing only the small image.
+        """
+        deck_id = 1080001 + index
+        images = [
+            ("DeckCase", 256),
+            ("DeckCase_L", 256),
+            ("DeckCase_L", 512),
+            ("DeckCase_L_reverse", 256),
+            ("DeckCase_L_reverse", 512),
+            ("DeckCase_Open_L", 256),
+            ("DeckCase_Open_L", 512),
+        ]
+        return [
+            [
+                (
+                    (
+                        f"assets/resourcesassetbundle/images/deckcase/dc{deck_id}/"
+                        f"deckcase{deck_id}.png"
+                        if position == 0
+                        else None
+                    ),
+                    TEXTURE_2D,
+                    self._texture(f"{image}{deck_id}", size, size),
+                )
+                for position, (image, size) in enumerate(images)
+            ]
+        ]
+
+    def _wallpaper(self, index: int) -> List[List[BundleObject]]:
+        """Build the bundle of a wallpaper, holding all its parts.
+
+        Args:
+            index: Index of the wallpaper.
+
+        Returns:
+            Single bundle, listing only the icon.
+        """
+        wallpaper = f"{index + 1:04d}"
+        return [
+            [
+                (
+                    f"assets/resourcesassetbundle/wallpaper/wallpaper{wallpaper}/"
+                    f"wallpapericon{wallpaper}.png",
+                    TEXTURE_2D,
+                    self._texture(f"WallPaperIcon{wallpaper}"),
+                ),
+                (
+                    None,
+                    TEXTURE_2D,
+                    self._texture(f"WallPaper{wallpaper}_1", 1024, 1024),
+                ),
+                (
+                    None,
+                    TEXTURE_2D,
+                    self._texture(f"WallPaper{wallpaper}_2", 1024, 1024),
+                ),
+            ]
+        ]
+
+    def _field(self, index: int) -> List[List[BundleObject]]:
+        """Build the bundle of a field.
+
+        Args:
+            index: Index of the field.
+
+        Returns:
+            Single bundle.
+        """
+        field = f"0{index % 100:02d}"
+        return [
+            [
+                (
+                    f"assets/resourcesassetbundle/bg/mat/mat_{field}_near/"
+                    f"mat_{field}_01_basecolor_near.png",
+                    TEXTURE_2D,
+                    self._texture(f"Mat_{field}_01_BaseColor_near", 1024, 1024),
+                )
+            ]
+        ]
+
+    def _coin(self, index: int) -> List[List[BundleObject]]:
+        """Build the bundle of a coin.
+
+        Args:
+            index: Index of the coin.
+
+        Returns:
+            Single bundle.
+        """
+        coin = f"{index % 100:02d}"
+        return [
+            [
+                (
+                    f"assets/resourcesassetbundle/duel/coin/coin{coin}tex.png",
+                    TEXTURE_2D,
+                    self._texture(f"Coin{coin}"),
+                )
+            ]
+        ]
+
+    def _other(self, index: int) -> List[List[BundleObject]]:
+        """Build the bundle of an asset the ETL does not extract.
+
+        Args:
+            index: Index of the asset.
+
+        Returns:
+            Single bundle.
+        """
+        return [
+            [
+                (
+                    f"assets/resourcesassetbundle/sound/se/se_{index:06d}.bytes",
+                    TEXT_ASSET,
+                    {
+                        "m_Name": f"se_{index:06d}",
+                        "m_Script": self.random.randbytes(self.texture_bytes).hex(),
+                    },
+                )
+            ]
+        ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("output", help="directory the install is written to")
+    parser.add_argument(
+        "--scale",
+        choices=SCALES,
+        default="1k",
+        help="amount of bundles to write",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the install")
+    args = parser.parse_args()
+
+    synthetic_game = SyntheticGame(args.output, args.seed)
+    print(json.dumps(synthetic_game.generate(SCALES[args.scale]), indent=4))
+    print(f'Game path of the ID scan: "{synthetic_game.game_path}"')
@@ -10,6 +10,8 @@ import os
 import sys
 import zlib
 
+from .decrypt_ids import CryptoKey_name, ReadCryptoKey, WriteCryptoKey
+
 # 0. Definitions
 
 
@@ -59,7 +61,7 @@ def CheckCryptoKey(filename, m_iCryptoKey):
         return 1
 
 
-def FindCryptoKey(filename):
+def FindCryptoKey(filename, CryptoKey_filename):
     print("No correct crypto key found. Searching for crypto key...")
     m_iCryptoKey = -0x1
     data = ReadByteData(filename)
@@ -68,23 +70,21 @@ def FindCryptoKey(filename):
         m_iCryptoKey = m_iCryptoKey + 1
         dec_data = Decrypt(data, m_iCryptoKey)
         # if os.stat('CARD_Indx.dec').st_size > 0:
-    with open("!CryptoKey.txt", "w") as f_CryptoKey:
-        f_CryptoKey.write(hex(m_iCryptoKey))
-    f_CryptoKey.close()
+    WriteCryptoKey(CryptoKey_filename, m_iCryptoKey)
     print(
         'Found correct crypto key "'
         + hex(m_iCryptoKey)
-        + '" and wrote it to file "!CryptoKey.txt".'
+        + '" and wrote it to file "'
+        + CryptoKey_filename
+        + '".'
     )
     return m_iCryptoKey
 
 
-def GetCryptoKey(filename):
-    if FileCheck("!CryptoKey.txt") == 1:
+def GetCryptoKey(filename, CryptoKey_filename):
+    if FileCheck(CryptoKey_filename) == 1:
         print("Trying to read crypto key from file...")
-        with open("!CryptoKey.txt", "rt") as f_CryptoKey:
-            m_iCryptoKey = int(f_CryptoKey.read(), 16)
-        f_CryptoKey.close()
+        m_iCryptoKey = ReadCryptoKey(CryptoKey_filename)
         print(
             'Reading crypto key "'
             + hex(m_iCryptoKey)
@@ -96,7 +96,7 @@ def GetCryptoKey(filename):
     if CheckCryptoKey(filename, m_iCryptoKey) == 1:
         print('The crypto key "' + hex(m_iCryptoKey) + '" is correct.')
     else:
-        m_iCryptoKey = FindCryptoKey(filename)
+        m_iCryptoKey = FindCryptoKey(filename, CryptoKey_filename)
     return m_iCryptoKey
 
 
@@ -170,15 +170,15 @@ def ProgressiveProcessing(CARD_Indx_filename, filename, start):
     WriteJSON(desc, f"{filename}" + ".dec.json")
 
 
-def decrypt_desc_indx_name():
+def decrypt_desc_indx_name(directory="./etl/services/temp", CryptoKey_filename=None):
 
     # 1. Check if CARD_* files exist:
 
     CARD_filename_list = Check_files(
         [
-            "./etl/services/temp/card_indx.bytes",
-            "./etl/services/temp/card_name.bytes",
-            "./etl/services/temp/card_desc.bytes",
+            os.path.join(directory, "card_indx.bytes"),
+            os.path.join(directory, "card_name.bytes"),
+            os.path.join(directory, "card_desc.bytes"),
         ]
     )
 
@@ -189,7 +189,11 @@ def decrypt_desc_indx_name():
 
     # 2. Get crypto key
 
-    m_iCryptoKey = GetCryptoKey(CARD_Indx_filename)
+    # Kept per install, as installs can have different keys
+    m_iCryptoKey = GetCryptoKey(
+        CARD_Indx_filename,
+        CryptoKey_filename or os.path.join(directory, CryptoKey_name),
+    )
 
     # 3. Decrypt card files from section 1
 
@@ -5,10 +5,11 @@ timelic from NexusMods: https://forums.nexusmods.com/index.php?/user/145588218-t
 """
 
 import json
+import os
 import zlib
 
 
-CARD_Prop_filename = "./etl/services/temp/card_prop.bytes"
+CARD_Prop_name = "card_prop.bytes"
 
 
 def WriteJSON(l: list, json_file_path: str):
@@ -25,21 +26,65 @@ def FileCheck(filename):
         return 0
 
 
-if FileCheck("!CryptoKey.txt") == 1:
-    print("Trying to read crypto key from file...")
-    with open("!CryptoKey.txt", "rt") as f_CryptoKey:
-        m_iCryptoKey = int(f_CryptoKey.read(), 16)
-    f_CryptoKey.close()
-    print(
-        'Read crypto key "'
-        + hex(m_iCryptoKey)
-        + '" from file, checking if it is correct...'
-    )
-else:
-    m_iCryptoKey = 0x0
+CryptoKey_name = "!CryptoKey.txt"
+
+
+def ReadCryptoKey(CryptoKey_filename):
+    # A missing or half-written key file is searched again
+    try:
+        with open(CryptoKey_filename, "rt") as f_CryptoKey:
+            return int(f_CryptoKey.read(), 16)
+    except (IOError, ValueError):
+        return 0x0
 
 
-def Decrypt(filename):
+def WriteCryptoKey(CryptoKey_filename, m_iCryptoKey):
+    # Written whole, so a reader never sees a half-written key
+    with open(CryptoKey_filename + ".tmp", "w") as f_CryptoKey:
+        f_CryptoKey.write(hex(m_iCryptoKey))
+    os.replace(CryptoKey_filename + ".tmp", CryptoKey_filename)
+
+
+def LoadCryptoKey(CARD_Prop_filename, CryptoKey_filename):
+    if FileCheck(CryptoKey_filename) == 1:
+        print("Trying to read crypto key from file...")
+        m_iCryptoKey = ReadCryptoKey(CryptoKey_filename)
+        print(
+            'Read crypto key "'
+            + hex(m_iCryptoKey)
+            + '" from file, checking if it is correct...'
+        )
+    else:
+        m_iCryptoKey = 0x0
+
+    if CheckCryptoKey(CARD_Prop_filename, m_iCryptoKey) == 1:
+        print('The crypto key "' + hex(m_iCryptoKey) + '" is correct.')
+    else:
+        print("No correct crypto key found. Searching for crypto key...")
+        m_iCryptoKey = 0x0
+        while True:
+            try:
+                Decrypt(CARD_Prop_filename, m_iCryptoKey)
+                # if os.stat('CARD_Prop.dec').st_size > 0:
+                break
+            except zlib.error:
+                # print('Wrong crypto key:', hex(m_iCryptoKey), ' (zlib error)')
+                m_iCryptoKey = m_iCryptoKey + 1
+            # except Exception:
+            # print('Unexpected {err=}, {type(err)=}')
+            # else:
+        WriteCryptoKey(CryptoKey_filename, m_iCryptoKey)
+        print(
+            'Found correct crypto key "'
+            + hex(m_iCryptoKey)
+            + '" and wrote it to file "'
+            + CryptoKey_filename
+            + '".'
+        )
+    return m_iCryptoKey
+
+
+def Decrypt(filename, m_iCryptoKey):
     with open(f"{filename}", "rb") as f:
         data = bytearray(f.read())
 
@@ -53,43 +98,17 @@ def Decrypt(filename):
         f.write(zlib.decompress(data))
 
 
-def CheckCryptoKey():
+def CheckCryptoKey(CARD_Prop_filename, m_iCryptoKey):
     try:
-        Decrypt(CARD_Prop_filename)
+        Decrypt(CARD_Prop_filename, m_iCryptoKey)
         return 1
     except zlib.error:
         return 0
 
 
-if CheckCryptoKey() == 1:
-    print('The crypto key "' + hex(m_iCryptoKey) + '" is correct.')
-else:
-    print("No correct crypto key found. Searching for crypto key...")
-    m_iCryptoKey = 0x0
-    while True:
-        try:
-            Decrypt(CARD_Prop_filename)
-            # if os.stat('CARD_Prop.dec').st_size > 0:
-            break
-        except zlib.error:
-            # print('Wrong crypto key:', hex(m_iCryptoKey), ' (zlib error)')
-            m_iCryptoKey = m_iCryptoKey + 1
-        # except Exception:
-        # print('Unexpected {err=}, {type(err)=}')
-        # else:
-    with open("!CryptoKey.txt", "w") as f_CryptoKey:
-        f_CryptoKey.write(hex(m_iCryptoKey))
-    f_CryptoKey.close()
-    print(
-        'Found correct crypto key "'
-        + hex(m_iCryptoKey)
-        + '" and wrote it to file "!CryptoKey.txt".'
-    )
-
-
 # The start of CARD_Prop is 8.
 def ProgressiveProcessing(filename):
-    with open(CARD_Prop_filename + ".dec", "rb") as f:
+    with open(f"{filename}" + ".dec", "rb") as f:
         hex_str_list = (
             "{:02X}".format(int(c)) for c in f.read()
         )  # Define variables to accept file contents
@@ -106,7 +125,14 @@ def ProgressiveProcessing(filename):
     WriteJSON(Card_ID_dec_list, f"{filename}" + ".Card_IDs.dec.json")
 
 
-def decrypt_ids():
+def decrypt_ids(directory="./etl/services/temp", CryptoKey_filename=None):
+    CARD_Prop_filename = os.path.join(directory, CARD_Prop_name)
+    # Kept per install, as installs can have different keys
+    m_iCryptoKey = LoadCryptoKey(
+        CARD_Prop_filename,
+        CryptoKey_filename or os.path.join(directory, CryptoKey_name),
+    )
+
     print("Splitting files...")
 
     # 3. Decrypt CARD_Prop
@@ -117,7 +143,7 @@ def decrypt_ids():
 
     for name in filenames:
         if FileCheck(name) == 1:
-            Decrypt(name)
+            Decrypt(name, m_iCryptoKey)
             print('Decrypted file "' + name + '".')
         else:
             print(
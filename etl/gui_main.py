@@ -2,43 +2,160 @@
 
 import logging
 import tkinter as tk
+from logging.handlers import QueueHandler
 from tkinter import ttk, scrolledtext
 import threading
 import queue
 import os
+import time
 
-from services.data_service import DataService
-from services.decode_service import DecodeService
-from util import GAME_PATH, NUM_THREADS, clear_directory
+from services.metrics_service import METRICS
+from util import CONFIG
 
 
-class RedirectText:
-    """A class to redirect text output to a queue for thread-safe GUI updates.
+class LogBatcher:
+    """Turn the log records queued by the pipeline threads into text for the GUI.
 
-    This class is used to capture text output and send it to a queue, which is then
-    processed by the GUI to update the output text area in a thread-safe manner.
+    The queue is drained in batches, once per GUI refresh, and the batch is
+    rendered as one block of text. Runs of the same message are shown once
+    with their count, and only the newest lines of a batch are kept when it
+    has more than the output can hold.
     """
 
-    def __init__(self, text_widget, text_queue):
-        """Initialize the RedirectText instance.
+    # Most records taken from the queue per batch, so a batch always ends
+    max_batch = 20000
+
+    def __init__(self, record_queue, formatter, max_lines):
+        """Initialize the LogBatcher.
 
         Args:
-            text_widget: The text widget to update.
-            text_queue: The queue to put text updates into.
+            record_queue: The queue the log records are put into.
+            formatter: The formatter of the rendered records.
+            max_lines: The most lines a batch is rendered as.
         """
-        self.text_widget = text_widget
-        self.queue = text_queue
+        self.queue = record_queue
+        self.formatter = formatter
+        self.max_lines = max_lines
 
-    def write(self, string):
-        """Write text to the queue.
+    def drain(self):
+        """Render the records queued since the last batch.
 
-        Args:
-            string: The text to write.
+        Returns:
+            The text of the batch, or an empty string if nothing was logged.
         """
-        self.queue.put(string)
+        records = []
+        try:
+            while len(records) < self.max_batch:
+                records.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        lines = []
+        previous = None
+        repeats = 0
+        for record in records:
+            key = (record.name, record.levelno, record.getMessage())
+            if key == previous:
+                repeats += 1
+                continue
+            if repeats:
+                lines[-1] += f" (x{repeats + 1})"
+            lines.append(self.formatter.format(record))
+            previous = key
+            repeats = 0
+        if repeats:
+            lines[-1] += f" (x{repeats + 1})"
+
+        if len(lines) > self.max_lines:
+            skipped = len(lines) - self.max_lines + 1
+            lines = [f"... {skipped} lines skipped"] + lines[skipped:]
+        return "".join(f"{line}\n" for line in lines)
+
+
+def describe_progress(live, now, stall_seconds):
+    """Describe the progress of the bundle scan from the live metrics.
+
+    Args:
+        live: The live metrics, as returned by MetricsService.live.
+        now: The current time, as returned by time.time.
+        stall_seconds: Seconds without progress after which a worker is
+            shown as stalled.
+
+    Returns:
+        A dictionary with the bundles "done" and "total", and the "summary",
+        "workers" and "records" lines, or None if no scan has started.
+    """
+    scan = live["progress"].get("scan")
+    if scan is None:
+        return None
+
+    tasks = sorted(
+        (int(task.split()[1]), progress)
+        for task, progress in live["progress"].items()
+        if task.startswith("worker ")
+    )
+
+    done = live["counters"].get("bundles", 0)
+    total = scan["bundles"]
+    # The rate is frozen once every bundle is scanned, at the last update
+    end = scan.get("finished") or now
+    if done >= total and tasks:
+        end = min(end, max(progress["updated"] for _, progress in tasks))
+    rate = done / max(end - scan["started"], 1e-9)
+    summary = f"{done}/{total} bundles, {rate:.1f} bundles/s"
+    if 0 < done < total and scan.get("finished") is None:
+        eta = int((total - done) / rate)
+        summary += f", {eta // 60}:{eta % 60:02d} left"
+
+    workers = []
+    records = {}
+    for part, progress in tasks:
+        line = f"Worker {part}: {progress['done']}/{progress['directories']} folders"
+        if progress["directory"] is None:
+            line += ", done"
+        else:
+            line += f", in {progress['directory']}"
+            idle = now - progress["updated"]
+            if idle >= stall_seconds:
+                line += f", no progress for {int(idle)}s"
+        workers.append(line)
+        for category, count in progress["records"].items():
+            records[category] = records.get(category, 0) + count
+
+    return {
+        "done": done,
+        "total": total,
+        "summary": summary,
+        "workers": "\n".join(workers),
+        "records": ", ".join(
+            f"{category} {count}" for category, count in records.items() if count
+        ),
+    }
+
+
+def create_pipeline(installs, workspace=None):
+    """Create the service running the selected steps on the configured installs.
+
+    Importing the services loads the game file and data libraries, which
+    takes a while, so they are only imported once needed.
+
+    Args:
+        installs: The installs to extract, as given by CONFIG.installs.
+        workspace: The workspace of the run, the default one if None.
+
+    Returns:
+        A PipelineService for a single install, or an InstallService running
+        one pipeline per install if there are several.
+    """
+    # pylint: disable=import-outside-toplevel
+    if len(installs) > 1:
+        from services.install_service import InstallService
+
+        return InstallService(installs, workspace)
 
-    def flush(self):
-        """Required for compatibility with logging.StreamHandler."""
+    from services.pipeline_service import PipelineService
+
+    return PipelineService(workspace=workspace, install=installs[0])
 
 
 class ETLGUI:  # pylint: disable=too-many-instance-attributes
@@ -48,6 +165,15 @@ class ETLGUI:  # pylint: disable=too-many-instance-attributes
     allowing users to select which steps to run and view the output in real-time.
     """
 
+    # Milliseconds between refreshes of the output
+    refresh_interval = 100
+    # Most lines kept in the output, older lines are removed first
+    max_output_lines = 5000
+    # Milliseconds between refreshes of the progress panel
+    progress_interval = 500
+    # Seconds without progress after which a worker is shown as stalled
+    stall_seconds = 30
+
     def __init__(self, root):  # pylint: disable=too-many-statements
         """Initialize the ETL GUI.
 
@@ -113,21 +239,21 @@ class ETLGUI:  # pylint: disable=too-many-instance-attributes
 
         # Add configuration labels
         game_path_label = ttk.Label(
-            config_frame, text=f"Game Path: {GAME_PATH}", wraplength=700
+            config_frame, text=f"Game Path: {CONFIG.game_path}", wraplength=700
         )
         game_path_label.grid(row=0, column=0, sticky=tk.W)
 
-        threads_label = ttk.Label(config_frame, text=f"Threads: {NUM_THREADS}")
+        threads_label = ttk.Label(config_frame, text=f"Threads: {CONFIG.num_threads}")
         threads_label.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
 
-        # Create checkboxes for each step
+        # Create checkboxes for each step and the pipeline stages it runs
         self.steps = [
-            ("Get IDs", self.get_ids),
-            ("Decode Card Data", self.decode_card_data),
-            ("Get Card Names", self.get_card_data),
-            ("Clean Data", self.clean_data),
-            ("Write Data", self.write_data),
-            ("Remove Temporary Files", self.remove_temp_files),
+            ("Get IDs", ["get_ids", "get_unity3d_ids"]),
+            ("Decode Card Data", ["decode_card_data"]),
+            ("Get Card Names", ["get_card_data"]),
+            ("Clean Data", ["clean_data"]),
+            ("Write Data", ["write_data"]),
+            ("Remove Temporary Files", []),
         ]
 
         self.checkboxes = []
@@ -150,16 +276,43 @@ class ETLGUI:  # pylint: disable=too-many-instance-attributes
         )
         self.sort_fields_cb.grid(row=len(self.steps) + 3, column=0, sticky=tk.W, pady=5)
 
+        # Add checkbox for resuming interrupted runs
+        self.resume_var = tk.BooleanVar(value=True)
+        self.resume_cb = ttk.Checkbutton(
+            self.main_frame,
+            text="Skip Completed Steps",
+            variable=self.resume_var,
+        )
+        self.resume_cb.grid(row=len(self.steps) + 4, column=0, sticky=tk.W, pady=5)
+
         # Create run button
         self.run_button = ttk.Button(
             self.main_frame, text="Run Selected Steps", command=self.run_selected_steps
         )
-        self.run_button.grid(row=len(self.steps) + 4, column=0, pady=10)
+        self.run_button.grid(row=len(self.steps) + 5, column=0, pady=10)
+
+        # Create progress panel, filled from the pipeline metrics
+        self.progress_frame = ttk.LabelFrame(
+            self.main_frame, text="Progress", padding="5"
+        )
+        self.progress_frame.grid(
+            row=len(self.steps) + 6, column=0, sticky=(tk.W, tk.E), pady=(10, 0)
+        )
+        self.progress_frame.grid_columnconfigure(0, weight=1)
+
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode="determinate")
+        self.progress_bar.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        self.progress_label = ttk.Label(self.progress_frame)
+        self.progress_label.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        self.workers_label = ttk.Label(self.progress_frame, justify=tk.LEFT)
+        self.workers_label.grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+        self.records_label = ttk.Label(self.progress_frame, wraplength=700)
+        self.records_label.grid(row=3, column=0, sticky=tk.W, pady=(5, 0))
 
         # Create output area
         self.output_frame = ttk.LabelFrame(self.main_frame, text="Output", padding="5")
         self.output_frame.grid(
-            row=len(self.steps) + 5, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10
+            row=len(self.steps) + 7, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10
         )
 
         self.output_text = scrolledtext.ScrolledText(
@@ -188,26 +341,33 @@ class ETLGUI:  # pylint: disable=too-many-instance-attributes
         self.main_frame.grid_rowconfigure(7, weight=0)  # Steps
         self.main_frame.grid_rowconfigure(8, weight=0)  # Separator
         self.main_frame.grid_rowconfigure(9, weight=0)  # Sort fields
-        self.main_frame.grid_rowconfigure(10, weight=0)  # Run button
-        self.main_frame.grid_rowconfigure(11, weight=1)  # Output frame (expand)
+        self.main_frame.grid_rowconfigure(10, weight=0)  # Skip completed steps
+        self.main_frame.grid_rowconfigure(11, weight=0)  # Run button
+        self.main_frame.grid_rowconfigure(12, weight=0)  # Progress
+        self.main_frame.grid_rowconfigure(13, weight=1)  # Output frame (expand)
         self.main_frame.grid_columnconfigure(0, weight=1)
 
         # Configure output frame to expand
         self.output_frame.grid_rowconfigure(0, weight=1)
         self.output_frame.grid_columnconfigure(0, weight=1)
 
-        # Queue for thread-safe text updates
+        # Queue for thread-safe log updates, rendered in batches
         self.queue = queue.Queue()
+        self.log_batcher = LogBatcher(
+            self.queue,
+            logging.Formatter("[%(asctime)s|%(name)s|%(levelname)s]: %(message)s"),
+            self.max_output_lines,
+        )
 
-        # Initialize services
-        self.data_service = DataService()
-        self.decode_service = DecodeService()
+        # Services are created by the first run, see pipeline
+        self._pipeline = None
 
         # Set up logging
         self.setup_logging()
 
-        # Start periodic queue check
+        # Start periodic queue and progress checks
         self.check_queue()
+        self.update_progress()
 
         # Bind window resize event
         self.root.bind("<Configure>", self.on_window_resize)
@@ -231,69 +391,85 @@ class ETLGUI:  # pylint: disable=too-many-instance-attributes
         self.logger = logging.getLogger("gui_main")
         self.logger.setLevel(logging.INFO)
 
-        # Create a handler that writes to our redirected text
-        handler = logging.StreamHandler(RedirectText(self.output_text, self.queue))
-        handler.setFormatter(
-            logging.Formatter("[%(asctime)s|%(name)s|%(levelname)s]: %(message)s")
-        )
+        # Create a handler that queues the records for the GUI thread
+        handler = QueueHandler(self.queue)
         self.logger.addHandler(handler)
 
+        # Show the progress and metrics of the pipeline stages as well
+        for name in ("PipelineService", "InstallService", "MetricsService"):
+            service_logger = logging.getLogger(name)
+            service_logger.setLevel(logging.INFO)
+            service_logger.addHandler(handler)
+
     def check_queue(self):
-        """Check the queue for new text updates and display them in the output area."""
+        """Display the log records queued since the last check in the output area.
+
+        All records are inserted at once and the oldest lines are removed
+        past max_output_lines, so the output keeps up with busy stages.
+        """
         try:
-            while True:
-                msg = self.queue.get_nowait()
+            text = self.log_batcher.drain()
+            if text:
                 self.output_text.configure(state="normal")  # Enable writing
-                self.output_text.insert(tk.END, msg)
+                self.output_text.insert(tk.END, text)
+                # The last line is the empty one after the final newline
+                lines = int(self.output_text.index("end-1c").split(".")[0]) - 1
+                if lines > self.max_output_lines:
+                    self.output_text.delete(
+                        "1.0", f"{lines - self.max_output_lines + 1}.0"
+                    )
                 self.output_text.see(tk.END)
                 self.output_text.configure(state="disabled")  # Disable writing
-        except queue.Empty:
-            pass
         finally:
-            self.root.after(100, self.check_queue)
-
-    def get_ids(self):
-        """Run the get_ids step of the ETL process."""
-        self.logger.info("Getting ids...")
-        self.data_service.get_ids()
-        self.logger.info("Done")
+            self.root.after(self.refresh_interval, self.check_queue)
 
-    def decode_card_data(self):
-        """Run the decode_card_data step of the ETL process."""
-        self.logger.info("Decoding card data...")
-        self.decode_service.decrypt_desc_indx_name()
-        self.decode_service.decrypt_ids()
-        self.logger.info("Done")
+    def update_progress(self):
+        """Show the progress of the bundle scan, read from the pipeline metrics."""
+        try:
+            progress = describe_progress(
+                METRICS.live(), time.time(), self.stall_seconds
+            )
+            if progress is None:
+                self.progress_bar.configure(maximum=1, value=0)
+                self.progress_label.configure(text="Waiting for the bundle scan")
+                self.workers_label.configure(text="")
+                self.records_label.configure(text="")
+            else:
+                self.progress_bar.configure(
+                    maximum=max(progress["total"], 1), value=progress["done"]
+                )
+                self.progress_label.configure(text=progress["summary"])
+                self.workers_label.configure(text=progress["workers"])
+                self.records_label.configure(text=progress["records"])
+        finally:
+            self.root.after(self.progress_interval, self.update_progress)
 
-    def get_card_data(self):
-        """Run the get_card_data step of the ETL process."""
-        self.logger.info("Getting card names...")
-        self.data_service.get_card_data()
-        self.logger.info("Done")
+    @property
+    def pipeline(self):
+        """Get the pipeline running the steps, creating it on first use.
 
-    def clean_data(self):
-        """Run the clean_data step of the ETL process.
+        It is created by the first run instead of before the window is shown,
+        see create_pipeline.
 
-        Uses the sort_fields_var to determine whether to sort fields.
+        Returns:
+            The PipelineService or InstallService instance.
         """
-        self.logger.info("Cleaning data...")
-        self.data_service.clean_data(sort_fields=self.sort_fields_var.get())
-        self.logger.info("Done")
-
-    def write_data(self):
-        """Run the write_data step of the ETL process."""
-        self.logger.info("Writing data...")
-        self.data_service.write_data()
-        self.logger.info("Done")
+        if self._pipeline is None:
+            self._pipeline = create_pipeline(CONFIG.installs)
+        return self._pipeline
 
     def remove_temp_files(self):
         """Run the remove_temp_files step of the ETL process."""
         self.logger.info("Removing temporary files...")
-        clear_directory("./etl/services/temp")
+        self.pipeline.workspace.clear()
         self.logger.info("Done")
 
     def run_selected_steps(self):
-        """Run the selected ETL steps in order.
+        """Run the selected ETL steps.
+
+        Independent steps run concurrently, and steps completed by a previous
+        run are skipped unless the resume_var is unset. The sort_fields_var
+        determines whether to sort fields when cleaning the data.
 
         This method runs in a separate thread to keep the GUI responsive.
         It disables the run button while processing and re-enables it when done.
@@ -304,12 +480,27 @@ class ETLGUI:  # pylint: disable=too-many-instance-attributes
         def run_steps():
             try:
                 self.logger.info("Starting ETL process...")
-                self.logger.info('Game path: "%s"', GAME_PATH)
-                self.logger.info("Threads to use: %d", NUM_THREADS)
-
-                for (var, _), (_, func) in zip(self.checkboxes, self.steps):
-                    if var.get():
-                        func()
+                for install in CONFIG.installs:
+                    self.logger.info(
+                        'Game path of %s: "%s"', install.name, install.game_path
+                    )
+                self.logger.info("Threads to use: %d", CONFIG.num_threads)
+
+                stages = [
+                    stage
+                    for (var, _), (_, step_stages) in zip(self.checkboxes, self.steps)
+                    if var.get()
+                    for stage in step_stages
+                ]
+                self.pipeline.run(
+                    stages,
+                    force=not self.resume_var.get(),
+                    params={"clean_data": {"sort_fields": self.sort_fields_var.get()}},
+                )
+
+                # Temporary files are removed last, they are not a pipeline stage
+                if self.checkboxes[-1][0].get():
+                    self.remove_temp_files()
 
                 self.logger.info("ETL Finished")
             except Exception as e:  # pylint: disable=broad-exception-caught
@@ -1,20 +1,53 @@
 """Main module for the ETL process of extracting and processing card data."""
 
+import argparse
 import logging
 
-from services.data_service import DataService
-from services.decode_service import DecodeService
-from util import print_splash, BColors, GAME_PATH, NUM_THREADS, clear_directory
-
-
-def decode_card_data() -> None:
-    """Decode card data by decrypting description index names and IDs."""
-    service = DecodeService()
-    service.decrypt_desc_indx_name()
-    service.decrypt_ids()
-
+from services.install_service import InstallService
+from services.pipeline_service import PipelineService
+from util import (
+    print_splash,
+    BColors,
+    CONFIG,
+    TEMP_PATH,
+    Workspace,
+)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="run every step, even those completed by an interrupted run",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile the scan of the game files and list the slowest parts",
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="probe the memory used by each step and by the largest bundles",
+    )
+    parser.add_argument(
+        "--config",
+        default=CONFIG.path,
+        help="configuration file with the game paths and thread count",
+    )
+    parser.add_argument(
+        "--workspace",
+        default=TEMP_PATH,
+        help="directory for the intermediate files, runs can be resumed from it",
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help="keep the intermediate files of this run only, in memory if possible",
+    )
+    args = parser.parse_args()
+    CONFIG.load(args.config)
+
     logging.basicConfig(
         level=logging.INFO,
         format="[%(asctime)s|%(name)s|%(levelname)s]: %(message)s",
@@ -24,44 +57,51 @@ if __name__ == "__main__":
     print_splash()
     DONE_MESSAGE = BColors.OKCYAN + "Done" + BColors.ENDC
 
-    logger.info(
-        '%sGame path: "%s"%s',
-        BColors.OKCYAN,
-        GAME_PATH,
-        BColors.ENDC,
-    )
+    for install in CONFIG.installs:
+        logger.info(
+            '%sGame path of %s: "%s"%s',
+            BColors.OKCYAN,
+            install.name,
+            install.game_path,
+            BColors.ENDC,
+        )
     logger.info(
         "%sThreads to use: %d%s",
         BColors.OKCYAN,
-        NUM_THREADS,
+        CONFIG.num_threads,
         BColors.ENDC,
     )
 
-    data_service = DataService()
-
-    logger.info("Getting ids...")
-    data_service.get_ids()
-    logger.info(DONE_MESSAGE)
-
-    logger.info("Decoding card data...")
-    decode_card_data()
-    logger.info(DONE_MESSAGE)
-
-    logger.info("Getting card names...")
-    data_service.get_card_data()
-    logger.info(DONE_MESSAGE)
-
-    # NOTE: field sorting is not yet automated
-    logger.info("Cleaning data...")
-    data_service.clean_data()
-    logger.info(DONE_MESSAGE)
+    workspace = (
+        Workspace.temporary(in_memory=True)
+        if args.in_memory
+        else Workspace(args.workspace)
+    )
 
-    logger.info("Writing data...")
-    data_service.write_data()
-    logger.info(DONE_MESSAGE)
+    # Independent steps run concurrently, steps completed by an interrupted
+    # run are skipped
+    try:
+        if len(CONFIG.installs) == 1:
+            pipeline = PipelineService(
+                workspace=workspace,
+                profile=args.profile,
+                memory=args.memory,
+                install=CONFIG.installs[0],
+            )
+            pipeline.run(pipeline.stages, force=args.force)
+        else:
+            InstallService(
+                CONFIG.installs, workspace, profile=args.profile, memory=args.memory
+            ).run(force=args.force)
+        logger.info(DONE_MESSAGE)
+    finally:
+        # An in-memory run can't be resumed, so its files are never kept
+        if args.in_memory:
+            workspace.remove()
 
     logger.info("Removing temporary files...")
-    clear_directory("./etl/services/temp")
+    if not args.in_memory:
+        workspace.clear()
     logger.info(DONE_MESSAGE)
 
     logger.info("%sETL Finished%s", BColors.OKGREEN, BColors.ENDC)
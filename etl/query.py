@@ -0,0 +1,286 @@
+"""Indexed, read-only access to the published Parquet tables."""
+
+import glob
+import logging
+import os
+import threading
+from bisect import bisect_left
+from functools import cached_property
+from os.path import isfile, join
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from tables import OUTPUT_BUNDLE_COLUMNS, TEXT_INDEX_FIELDS
+from text_index import TextIndex, build_text_index
+from util import DATA_PATH
+
+
+def default_cache_dir(directory: str) -> str:
+    """Get the directory the decoded tables of a data directory are cached in.
+
+    Args:
+        directory: Directory holding the published Parquet files.
+
+    Returns:
+        Directory outside of every published directory.
+    """
+    directory = os.path.abspath(directory)
+    data_path = os.path.abspath(DATA_PATH)
+    if os.path.commonpath([directory, data_path]) != data_path:
+        return f"{directory}.arrow"
+    return os.path.normpath(
+        join(f"{data_path}.arrow", os.path.relpath(directory, data_path))
+    )
+
+
+class DataQuery:
+    """Lookups on the tables of a data directory.
+
+    Tables are loaded on first use. Each Parquet file is decoded once into an
+    uncompressed Arrow IPC file in the cache directory, which is then
+    memory-mapped, so later loads are zero-copy and only the pages of the
+    columns actually read are loaded. The cache files are named after the
+    size and modification time of their Parquet file, so a newly published
+    table is decoded again. The cache is kept outside the published
+    directories, so publishing neither copies it nor is blocked by its
+    memory maps.
+
+    Lookup indexes are plain dictionaries and sorted lists, built from the
+    columns they need the first time they are used.
+    """
+
+    # Tables with a name and a bundle column, indexed by name_to_bundle
+    named_tables: Tuple[str, ...] = ("cards", "faces", "metadata")
+
+    def __init__(
+        self, directory: str = DATA_PATH, cache_dir: Optional[str] = None
+    ) -> None:
+        """Initialize the DataQuery.
+
+        Args:
+            directory: Directory holding the published Parquet files.
+            cache_dir: Directory holding the decoded Arrow files. Defaults to
+                a directory next to the data directory, with the .arrow
+                extension, or under data.arrow for directories in the data
+                directory, such as the output directories of installs.
+        """
+        self.logger = logging.getLogger("DataQuery")
+        self.directory = directory
+        self.cache_dir = cache_dir or default_cache_dir(directory)
+        self.lock = threading.RLock()
+        self.tables: Dict[str, pa.Table] = {}
+        self._names: Dict[str, Dict[str, str]] = {}
+        self._bundles: Optional[Dict[str, List[str]]] = None
+        self._card_rows: Optional[Dict[int, int]] = None
+        self._sorted_names: Optional[Tuple[List[str], List[str]]] = None
+        self._text_index: Optional[TextIndex] = None
+
+    @cached_property
+    def version(self) -> Optional[str]:
+        """Content of the version.txt file when first read, or None."""
+        path = join(self.directory, "version.txt")
+        if not isfile(path):
+            return None
+        with open(path, "r", encoding="utf-8") as version_file:
+            return version_file.read().strip()
+
+    def table(self, name: str) -> pa.Table:
+        """Get a published table.
+
+        Args:
+            name: Name of the Parquet file, without extension.
+
+        Returns:
+            Memory-mapped table.
+
+        Raises:
+            FileNotFoundError: If the table is not published.
+        """
+        with self.lock:
+            if name not in self.tables:
+                self.tables[name] = self._load(name)
+            return self.tables[name]
+
+    def _load(self, name: str) -> pa.Table:
+        """Memory-map a table, decoding its Parquet file first if needed.
+
+        Args:
+            name: Name of the Parquet file, without extension.
+
+        Returns:
+            Memory-mapped table, or the decoded Parquet file if the cache
+            directory can't be written.
+        """
+        path = join(self.directory, f"{name}.parquet")
+        stat = os.stat(path)
+        cache_path = join(
+            self.cache_dir, f"{name}-{stat.st_size}-{stat.st_mtime_ns}.arrow"
+        )
+
+        if not isfile(cache_path):
+            table = pq.read_table(path, memory_map=True)
+            try:
+                self._write_cache(name, table, cache_path)
+            except OSError as error:
+                self.logger.warning("Not caching %s: %s", name, error)
+                return table
+
+        with pa.memory_map(cache_path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _write_cache(self, name: str, table: pa.Table, cache_path: str) -> None:
+        """Write a decoded table to the cache, replacing its older versions.
+
+        Args:
+            name: Name of the Parquet file, without extension.
+            table: Decoded table.
+            cache_path: Path of the cache file.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for stale_path in glob.glob(join(glob.escape(self.cache_dir), f"{name}-*")):
+            os.remove(stale_path)
+
+        with pa.OSFile(f"{cache_path}.tmp", "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(f"{cache_path}.tmp", cache_path)
+
+    def name_to_bundle(self, name: str, table: str = "cards") -> Optional[str]:
+        """Find the bundle of a named row.
+
+        Args:
+            name: Value of the name column.
+            table: Table to look in, one of named_tables.
+
+        Returns:
+            Bundle of the row, or None if there is no row with that name.
+        """
+        if table not in self._names:
+            with self.lock:
+                if table not in self._names:
+                    data = self.table(table)
+                    self._names[table] = dict(
+                        zip(
+                            data["name"].to_pylist(),
+                            data["bundle"].to_pylist(),
+                        )
+                    )
+        return self._names[table].get(name)
+
+    def bundle_to_categories(self, bundle: str) -> List[str]:
+        """Find the tables a bundle is used in.
+
+        Args:
+            bundle: Bundle name.
+
+        Returns:
+            Names of the tables with the bundle in any of their bundle
+            columns, in OUTPUT_BUNDLE_COLUMNS order.
+        """
+        if self._bundles is None:
+            with self.lock:
+                if self._bundles is None:
+                    bundles: Dict[str, List[str]] = {}
+                    for name, columns in OUTPUT_BUNDLE_COLUMNS.items():
+                        if not columns or not isfile(
+                            join(self.directory, f"{name}.parquet")
+                        ):
+                            continue
+                        data = self.table(name)
+                        values = pc.unique(
+                            pa.chunked_array(
+                                [
+                                    chunk
+                                    for column in columns
+                                    for chunk in data[column].chunks
+                                ],
+                                pa.string(),
+                            ).drop_null()
+                        )
+                        for value in values.to_pylist():
+                            bundles.setdefault(value, []).append(name)
+                    self._bundles = bundles
+        return list(self._bundles.get(bundle, []))
+
+    def card(self, data_index: int) -> Optional[Dict[str, Any]]:
+        """Get a card by its index in the game card data.
+
+        Args:
+            data_index: Index of the card in the decoded card data.
+
+        Returns:
+            Row of the card, or None if there is no such card.
+        """
+        if self._card_rows is None:
+            with self.lock:
+                if self._card_rows is None:
+                    indexes = self.table("cards")["data_index"].to_pylist()
+                    self._card_rows = {index: row for row, index in enumerate(indexes)}
+
+        row = self._card_rows.get(data_index)
+        if row is None:
+            return None
+        return self.table("cards").slice(row, 1).to_pylist()[0]
+
+    def search(self, prefix: str, limit: Optional[int] = 20) -> List[str]:
+        """Find the card names starting with a prefix, ignoring case.
+
+        Args:
+            prefix: Start of the names.
+            limit: Maximum amount of names returned, or None for all.
+
+        Returns:
+            Matching card names, in case-insensitive order.
+        """
+        if self._sorted_names is None:
+            with self.lock:
+                if self._sorted_names is None:
+                    names = sorted(
+                        self.table("cards")["name"].to_pylist(), key=str.casefold
+                    )
+                    self._sorted_names = ([name.casefold() for name in names], names)
+
+        keys, names = self._sorted_names
+        prefix = prefix.casefold()
+        matches = []
+        for position in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[position].startswith(prefix) or len(matches) == limit:
+                break
+            matches.append(names[position])
+        return matches
+
+    def text_search(
+        self,
+        text: str,
+        fields: Sequence[str] = TEXT_INDEX_FIELDS,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Find the cards containing a text, ignoring case.
+
+        Uses the published card_text_index table, or builds the index from
+        the cards table if it was not published.
+
+        Args:
+            text: Text to find, such as a mechanic mentioned in descriptions.
+            fields: Fields to look in, any of TEXT_INDEX_FIELDS.
+            limit: Maximum amount of cards returned, or None for all.
+
+        Returns:
+            Rows of the matching cards, in data_index order.
+        """
+        if self._text_index is None:
+            with self.lock:
+                if self._text_index is None:
+                    cards = self.table("cards")
+                    if isfile(join(self.directory, "card_text_index.parquet")):
+                        index = self.table("card_text_index")
+                    else:
+                        self.logger.info("No published text index, building it")
+                        index = build_text_index(cards)
+                    self._text_index = TextIndex(index, cards)
+
+        data_indexes = self._text_index.search(text, fields)[:limit]
+        return [self.card(data_index) for data_index in data_indexes]
@@ -0,0 +1,355 @@
+"""Local lookup server over the published tables.
+
+Loads a data folder once and answers batched lookups over HTTP on localhost,
+so tools running as several processes share one set of hot indexes instead
+of each reading the tables at startup.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import abspath, dirname, join
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+# Add etl/ to sys.path so 'query' is importable when run as a script
+sys.path.insert(0, dirname(abspath(__file__)))
+
+# pylint: disable=wrong-import-position
+from query import DataQuery
+from util import DATA_PATH
+
+DEFAULT_PORT = 8765
+
+
+class LookupServer:
+    """Server answering lookups on a data folder.
+
+    The tables and indexes of the data folder are loaded once, before the
+    server starts answering. A watcher thread checks version.txt and, when a
+    new version is published, loads it in the background and swaps it in, so
+    every request is answered from a single loaded version.
+
+    Requests:
+        GET /version: {"version": ...}
+        GET /search?prefix=...&limit=...: {"version": ..., "names": [...]}
+        POST /lookup with a JSON object holding any of "names", "bundles",
+            "ids" and "prefixes" lists: {"version": ..., "names": {name:
+            bundle}, "bundles": {bundle: [tables]}, "ids": {id: row},
+            "prefixes": {prefix: [names]}}, with null for missing keys.
+    """
+
+    # Seconds between checks of version.txt
+    reload_interval: float = 2.0
+    # Largest amount of keys answered by a single lookup
+    max_batch: int = 10000
+
+    def __init__(
+        self,
+        directory: str = DATA_PATH,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+        cache_dir: Optional[str] = None,
+    ) -> None:
+        """Initialize the LookupServer, loading the data folder.
+
+        Args:
+            directory: Directory holding the published Parquet files.
+            host: Address to listen on.
+            port: Port to listen on, or 0 for any free port.
+            cache_dir: Directory holding the decoded Arrow files, see
+                DataQuery.
+        """
+        self.logger = logging.getLogger("LookupServer")
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.stamp = self._version_stamp()
+        self.query = self._load()
+        self.stopped = threading.Event()
+
+        self.http = ThreadingHTTPServer((host, port), LookupHandler)
+        self.http.daemon_threads = True
+        self.http.lookup_server = self
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port the server listens on."""
+        return self.http.server_address[:2]
+
+    def _version_stamp(self) -> Optional[Tuple[int, int]]:
+        """Identify the published version without reading it.
+
+        Returns:
+            Modification time and size of version.txt, or None while there
+            is none, such as in the middle of a publish.
+        """
+        try:
+            stat = os.stat(join(self.directory, "version.txt"))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> DataQuery:
+        """Load the data folder and build all of its indexes.
+
+        Returns:
+            DataQuery with hot indexes.
+        """
+        query = DataQuery(self.directory, self.cache_dir)
+        _ = query.version
+        query.name_to_bundle("")
+        query.bundle_to_categories("")
+        query.card(-1)
+        query.search("", limit=0)
+        self.logger.info("Loaded version %s of %s", query.version, self.directory)
+        return query
+
+    def reload_if_changed(self) -> bool:
+        """Load the data folder again if a new version was published.
+
+        Returns:
+            True if a new version was loaded.
+        """
+        stamp = self._version_stamp()
+        if stamp is None or stamp == self.stamp:
+            return False
+
+        # Requests keep being answered from the loaded version meanwhile
+        self.query = self._load()
+        self.stamp = stamp
+        return True
+
+    def _watch(self) -> None:
+        """Check for new versions until the server is shut down."""
+        while not self.stopped.wait(self.reload_interval):
+            try:
+                self.reload_if_changed()
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.logger.exception("Loading the new version failed, will retry")
+
+    def lookup(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a batch of lookups.
+
+        Args:
+            request: Dictionary holding any of the "names", "bundles", "ids"
+                and "prefixes" lists.
+
+        Returns:
+            Dictionary with the loaded version and, for each requested list,
+            a dictionary mapping each key to its result.
+
+        Raises:
+            ValueError: If the request is not a valid batch.
+        """
+        kinds = ("names", "bundles", "ids", "prefixes")
+        if not isinstance(request, dict) or set(request) - set(kinds):
+            raise ValueError(f"Expected an object with lists of {list(kinds)}")
+        batches = {kind: request.get(kind, []) for kind in kinds}
+        for kind, keys in batches.items():
+            key_type = int if kind == "ids" else str
+            # JSON booleans are ints in Python
+            if not isinstance(keys, list) or not all(
+                isinstance(key, key_type) and not isinstance(key, bool) for key in keys
+            ):
+                raise ValueError(f'"{kind}" must be a list of {key_type.__name__}')
+        if sum(len(keys) for keys in batches.values()) > self.max_batch:
+            raise ValueError(f"At most {self.max_batch} keys can be looked up at once")
+
+        query = self.query
+        return {
+            "version": query.version,
+            "names": {name: query.name_to_bundle(name) for name in batches["names"]},
+            "bundles": {
+                bundle: query.bundle_to_categories(bundle)
+                for bundle in batches["bundles"]
+            },
+            "ids": {str(index): query.card(index) for index in batches["ids"]},
+            "prefixes": {
+                prefix: query.search(prefix) for prefix in batches["prefixes"]
+            },
+        }
+
+    def start(self) -> None:
+        """Answer requests and watch for new versions in background threads."""
+        self._threads = [
+            threading.Thread(target=self.http.serve_forever, daemon=True),
+            threading.Thread(target=self._watch, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        self.logger.info("Listening on http://%s:%d", *self.address)
+
+    def serve_forever(self) -> None:
+        """Answer requests until interrupted."""
+        self.start()
+        try:
+            self.stopped.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        """Stop answering requests and watching for new versions."""
+        self.stopped.set()
+        self.http.shutdown()
+        self.http.server_close()
+        for thread in self._threads:
+            thread.join()
+
+
+class LookupHandler(BaseHTTPRequestHandler):
+    """Handler of the requests of a LookupServer."""
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answer the version and search requests."""
+        url = urlparse(self.path)
+        server = self.server.lookup_server
+        query = server.query
+
+        if url.path == "/version":
+            self._send(200, {"version": query.version})
+        elif url.path == "/search":
+            params = parse_qs(url.query)
+            try:
+                limit = int(params.get("limit", ["20"])[0])
+                if not 0 <= limit <= server.max_batch:
+                    raise ValueError(limit)
+            except ValueError:
+                self._send(
+                    400,
+                    {
+                        "error": "limit must be an integer from 0 to "
+                        f"{server.max_batch}"
+                    },
+                )
+                return
+            self._send(
+                200,
+                {
+                    "version": query.version,
+                    "names": query.search(params.get("prefix", [""])[0], limit),
+                },
+            )
+        else:
+            self._send(404, {"error": f"Unknown path {url.path}"})
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Answer the batched lookup requests."""
+        if urlparse(self.path).path != "/lookup":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            response = self.server.lookup_server.lookup(request)
+        except ValueError as error:
+            self._send(400, {"error": str(error)})
+            return
+        self._send(200, response)
+
+    def _send(self, status: int, body: Dict[str, Any]) -> None:
+        """Send a JSON response.
+
+        Args:
+            status: HTTP status code.
+            body: JSON serializable response.
+        """
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(  # pylint: disable=redefined-builtin
+        self, format: str, *args: Any
+    ) -> None:
+        """Log requests at debug level instead of printing them."""
+        self.server.lookup_server.logger.debug(format, *args)
+
+
+class LookupClient:
+    """Client of a LookupServer."""
+
+    def __init__(self, url: str = f"http://127.0.0.1:{DEFAULT_PORT}") -> None:
+        """Initialize the LookupClient.
+
+        Args:
+            url: Base URL of the server.
+        """
+        self.url = url.rstrip("/")
+
+    def _request(self, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        """Send a request to the server.
+
+        Args:
+            path: Path and query of the request.
+            body: JSON body, sent with POST if given.
+
+        Returns:
+            Decoded JSON response.
+        """
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        request = Request(self.url + path, data, {"Content-Type": "application/json"})
+        with urlopen(request) as response:
+            return json.load(response)
+
+    def version(self) -> Optional[str]:
+        """Get the version loaded by the server.
+
+        Returns:
+            Content of the version.txt file of the loaded data.
+        """
+        return self._request("/version")["version"]
+
+    def lookup(
+        self,
+        names: Optional[List[str]] = None,
+        bundles: Optional[List[str]] = None,
+        ids: Optional[List[int]] = None,
+        prefixes: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Look up a batch of keys.
+
+        Args:
+            names: Card names to find the bundle of.
+            bundles: Bundles to find the tables of.
+            ids: Card data indexes to find the row of.
+            prefixes: Prefixes to find the card names of.
+
+        Returns:
+            Response of the server, see LookupServer.
+        """
+        return self._request(
+            "/lookup",
+            {
+                "names": names or [],
+                "bundles": bundles or [],
+                "ids": ids or [],
+                "prefixes": prefixes or [],
+            },
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--data", default=DATA_PATH, help="data folder to serve")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="port to listen on"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s|%(name)s|%(levelname)s]: %(message)s",
+    )
+    LookupServer(args.data, args.host, args.port).serve_forever()
@@ -1,8 +1,49 @@
-"""Services package for handling various data operations."""
+"""Services package for handling various data operations.
 
-from .data_service import DataService
-from .decode_service import DecodeService
-from .game_service import GameService
-from .unity_service import UnityService
+The services are imported on first use, so importing one of them doesn't load
+the libraries used by the others.
+"""
 
-__all__ = ["DataService", "DecodeService", "GameService", "UnityService"]
+from importlib import import_module
+from typing import Any
+
+# Module of each exported service
+_MODULES = {
+    "BundleCacheService": "bundle_cache_service",
+    "CheckpointService": "checkpoint_service",
+    "DataService": "data_service",
+    "DecodeService": "decode_service",
+    "FieldService": "field_service",
+    "GameService": "game_service",
+    "InstallService": "install_service",
+    "JournalService": "journal_service",
+    "MemoryService": "memory_service",
+    "MetricsService": "metrics_service",
+    "PipelineService": "pipeline_service",
+    "ProfileService": "profile_service",
+    "RecordSink": "sink_service",
+    "RecordingSink": "bundle_cache_service",
+    "SinkService": "sink_service",
+    "Stage": "pipeline_service",
+    "UnityService": "unity_service",
+    "WriterService": "writer_service",
+}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(name: str) -> Any:
+    """Import an exported service from its module.
+
+    Args:
+        name: Name of the service.
+
+    Returns:
+        The service.
+
+    Raises:
+        AttributeError: If the name is not exported.
+    """
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(f".{_MODULES[name]}", __name__), name)
@@ -0,0 +1,141 @@
+"""Service for sharing the results of scanned bundles between installs."""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from os.path import isfile, join
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sink_service import RecordSink
+
+# Records of a bundle, as (category, values) pairs without the bundle name
+BundleRecords = List[Tuple[str, List[Any]]]
+
+
+class RecordingSink:
+    """Sink keeping a copy of the records emitted for a bundle.
+
+    Every record ends with the name of the bundle it was found in, which is
+    left out of the copy, so the records can be replayed for a bundle with the
+    same content under another name.
+    """
+
+    def __init__(self, sink: RecordSink) -> None:
+        """Initialize the RecordingSink.
+
+        Args:
+            sink: Sink the records are passed on to.
+        """
+        self.sink = sink
+        self.records: BundleRecords = []
+
+    def emit(self, category: str, *values: Any) -> None:
+        """Add a record to a category and keep a copy of it.
+
+        Args:
+            category: Category of the record.
+            *values: Values of the record, ending with the bundle name.
+        """
+        self.records.append((category, list(values[:-1])))
+        self.sink.emit(category, *values)
+
+
+class BundleCacheService:
+    """Service class for the bundle cache shared by the installs of a run.
+
+    Most bundles are identical between installs, so the records found in a
+    bundle and the card data parts extracted from it are stored under a hash
+    of its content, and any install scanning a bundle with the same content
+    replays them instead of parsing it again. Entries are written to a
+    temporary directory and renamed into place, so installs extracted in other
+    processes can share the cache.
+    """
+
+    hash_name: str = "sha256"
+    records_file: str = "records.json"
+
+    def __init__(self, directory: str) -> None:
+        """Initialize the BundleCacheService, creating its directory if missing.
+
+        Args:
+            directory: Directory holding one subdirectory per cached bundle.
+        """
+        self.logger = logging.getLogger("BundleCacheService")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, path: str) -> str:
+        """Hash the content of a bundle.
+
+        Args:
+            path: Path to the bundle file.
+
+        Returns:
+            Hex digest of the bundle content.
+        """
+        with open(path, "rb") as bundle_file:
+            return hashlib.file_digest(bundle_file, self.hash_name).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        """Get the directory of a cache entry.
+
+        Args:
+            key: Content hash of the bundle.
+
+        Returns:
+            Path of the entry directory.
+        """
+        return join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[Tuple[BundleRecords, Dict[str, str]]]:
+        """Get the cached results of a bundle.
+
+        Args:
+            key: Content hash of the bundle.
+
+        Returns:
+            Tuple of the records of the bundle and a dictionary mapping the
+            name of each card data part extracted from it to its cached file,
+            or None if the bundle is not cached.
+        """
+        entry_dir = self._entry_dir(key)
+        records_path = join(entry_dir, self.records_file)
+        if not isfile(records_path):
+            return None
+
+        with open(records_path, "r", encoding="utf-8") as records_file:
+            entry = json.load(records_file)
+        return (
+            [(category, values) for category, values in entry["records"]],
+            {part: join(entry_dir, part) for part in entry["parts"]},
+        )
+
+    def put(self, key: str, records: BundleRecords, parts: Dict[str, str]) -> None:
+        """Cache the results of a bundle, unless another install already did.
+
+        Args:
+            key: Content hash of the bundle.
+            records: Records of the bundle, without the bundle name.
+            parts: Dictionary mapping the name of each card data part
+                extracted from the bundle to the file it was extracted to.
+        """
+        entry_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix=f".{key}.", dir=os.path.dirname(entry_dir))
+
+        try:
+            for part, path in parts.items():
+                shutil.copyfile(path, join(temp_dir, part))
+            with open(
+                join(temp_dir, self.records_file), "w", encoding="utf-8"
+            ) as records_file:
+                json.dump({"records": records, "parts": list(parts)}, records_file)
+            os.rename(temp_dir, entry_dir)
+        except OSError as error:
+            # Another install cached the same content first, or the entry
+            # could not be written, either way the bundle was already parsed
+            self.logger.debug("Not caching %s: %s", key, error)
+            shutil.rmtree(temp_dir, ignore_errors=True)
@@ -0,0 +1,94 @@
+"""Service for passing typed tables between the ETL stages."""
+
+import logging
+import os
+from os.path import isdir, join
+from typing import Dict
+
+import pyarrow as pa
+
+from util import TEMP_PATH
+
+
+class CheckpointService:
+    """Service class for storing the output of each ETL stage.
+
+    Every stage stores one Arrow table per category. The tables are kept in
+    memory for the stages that follow in the same run, and are also written as
+    Arrow IPC files so that a stage run on its own can memory-map the output of
+    a previous run instead of rebuilding it.
+    """
+
+    def __init__(self, directory: str = TEMP_PATH) -> None:
+        """Initialize the CheckpointService.
+
+        Args:
+            directory: Directory where the checkpoint files are written.
+        """
+        self.logger = logging.getLogger("CheckpointService")
+        self.directory = directory
+        self.stages: Dict[str, Dict[str, pa.Table]] = {}
+
+    def put(self, stage: str, tables: Dict[str, pa.Table]) -> None:
+        """Store the tables produced by a stage.
+
+        Args:
+            stage: Name of the stage.
+            tables: Dictionary mapping each category to its table.
+        """
+        stage_dir = join(self.directory, stage)
+        os.makedirs(stage_dir, exist_ok=True)
+
+        for category, table in tables.items():
+            path = join(stage_dir, f"{category}.arrow")
+            with pa.OSFile(f"{path}.tmp", "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(f"{path}.tmp", path)
+
+        self.stages[stage] = dict(tables)
+
+    def get(self, stage: str) -> Dict[str, pa.Table]:
+        """Get the tables produced by a stage.
+
+        Tables from the current run are returned directly, otherwise they are
+        memory-mapped from the checkpoint files.
+
+        Args:
+            stage: Name of the stage.
+
+        Returns:
+            Dictionary mapping each category to its table.
+
+        Raises:
+            FileNotFoundError: If the stage has no checkpoint.
+        """
+        if stage in self.stages:
+            return dict(self.stages[stage])
+
+        stage_dir = join(self.directory, stage)
+        if not isdir(stage_dir):
+            raise FileNotFoundError(f"No checkpoint found for stage '{stage}'.")
+
+        self.logger.info("Loading %s checkpoint", stage)
+        tables = {}
+        for entry in sorted(os.listdir(stage_dir)):
+            if entry.endswith(".arrow"):
+                with pa.memory_map(join(stage_dir, entry), "r") as source:
+                    tables[entry[: -len(".arrow")]] = pa.ipc.open_file(
+                        source
+                    ).read_all()
+
+        self.stages[stage] = tables
+        return dict(tables)
+
+    def has(self, stage: str) -> bool:
+        """Check whether a stage has stored its output.
+
+        Args:
+            stage: Name of the stage.
+
+        Returns:
+            True if the stage tables are in memory or on disk.
+        """
+        return stage in self.stages or isdir(join(self.directory, stage))
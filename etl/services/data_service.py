@@ -3,35 +3,88 @@
 import json
 import logging
 import os
+import time
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
-from os.path import isfile
-from typing import Any, Dict, List, Union
+from functools import reduce
+from itertools import islice
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from datetime import datetime
 
-from pandas import DataFrame, Series
-
-from util import (
-    EXCLUDED_SLEEVES,
-    GAME_PATH,
-    get_data_wrapper,
-    merge_nested_dict_lists,
-    merge_nested_dicts,
-    chunkify,
-    NUM_THREADS,
-    STREAMING_PATH,
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from tables import (
+    CARD_NAMES_SCHEMA,
+    CLEAN_SCHEMAS,
+    DECK_BOX_SIZES,
+    ICON_SIZES,
+    ID_SCHEMAS,
+    OUTPUT_TABLES,
+    WALLPAPER_PARTS,
+    validate_tables,
 )
+from text_index import build_text_index
+from util import CONFIG, Install, Workspace, chunkify
 
+from .bundle_cache_service import BundleCacheService
+from .checkpoint_service import CheckpointService
+from .field_service import FieldService
 from .game_service import GameService
+from .metrics_service import METRICS
+from .sink_service import SinkService
+from .writer_service import WriterService
+
+# pandas and PIL are imported by the stages using them, they take a while
+# pylint: disable=import-outside-toplevel
+if TYPE_CHECKING:
+    from pandas import Series
+    from PIL.Image import Image
 
 
 class DataService:
     """Service class for handling data operations."""
 
-    def __init__(self) -> None:
-        """Initialize the DataService with a GameService instance."""
-        self.game_service = GameService()
+    # Amount of fields to load ahead while the user answers a field prompt
+    field_prefetch: int = 3
+    # Largest side, in pixels, of the field previews shown when sorting
+    field_preview_size: int = 512
+
+    def __init__(
+        self,
+        workspace: Optional[Workspace] = None,
+        install: Optional[Install] = None,
+        bundle_cache: Optional[BundleCacheService] = None,
+    ) -> None:
+        """Initialize the DataService with its dependent services.
+
+        Args:
+            workspace: Workspace holding the intermediate files of the run.
+            install: Install the data is extracted from and published for.
+            bundle_cache: Cache of bundles scanned by other installs, if any.
+        """
+        self.workspace = workspace or Workspace()
+        self.install = install or CONFIG.installs[0]
+        self.game_service = GameService(self.workspace, self.install, bundle_cache)
+        self.field_service = FieldService()
+        self.checkpoint_service = CheckpointService(self.workspace.directory)
+        self.sink_service = SinkService(self.workspace.path("records"))
+        self.writer_service = WriterService(self.install.output_dir)
         self.logger = logging.getLogger("DataService")
-        self.processed = 0
+        # Called with the path of each card data part as soon as it is
+        # extracted, and again for every later bundle carrying it
+        self.on_extracted: Optional[Callable[[str], None]] = None
 
     def clean_data(self, sort_fields: bool = True) -> None:
         """Clean and validate the extracted data.
@@ -39,200 +92,251 @@ class DataService:
         Args:
             sort_fields: Whether to sort fields (requires user input). Defaults to True.
         """
-        with open(
-            "./etl/services/temp/data_dirty.json", "r", encoding="utf-8"
-        ) as data_file:
-            data = json.load(data_file)
-
-            self.logger.info("Removing bad icons")
-            to_remove = []
+        data = self.checkpoint_service.get("data_dirty")
 
-            for key, value in data["icon"].items():
-                if len(value) != 3 or not key.isdigit():
-                    to_remove.append(key)
-                else:
-                    art_list = self.game_service.unity_service.sort_sprite_list(value)
-                    if not art_list or len(art_list) != 3:
-                        to_remove.append(key)
-
-            for key in to_remove:
-                del data["icon"][key]
-
-            self.logger.info("Removing bad deck boxes")
-            to_remove = []
-
-            for key, value in data["deck_box"].items():
-                if len(value) != 7 or not key.isdigit():
-                    to_remove.append(key)
-                if (
-                    not {
-                        "large",
-                        "o_large",
-                        "r_large",
-                        "o_medium",
-                        "r_medium",
-                        "medium",
-                        "small",
-                    }.issubset(value.keys())
-                    and key not in to_remove
-                ):
-                    to_remove.append(key)
-
-            for key in to_remove:
-                del data["deck_box"][key]
-
-            self.logger.info("Removing bad sleeves")
-            to_remove = []
-
-            for key, value in enumerate(data["sleeve"]):
-                if value in EXCLUDED_SLEEVES:
-                    to_remove.append(key)
-
-            for key in sorted(to_remove, reverse=True):
-                del data["sleeve"][key]
-
-            self.logger.info("Removing bad wallpapers")
-            to_remove = []
-
-            for key in data["wallpaper"]:
-                if len(data["wallpaper"][key]) != 3:
-                    to_remove.append(key)
-
-            for key in to_remove:
-                del data["wallpaper"][key]
-
-            self.logger.info("Sorting fields")
-            fields = {}
-            field_position_prompt = """
-                Was the field center:
-                [1] On the top
-                [2] On the bottom
-                [3] Neither
-                > 
-                """
-            field_flip_prompt = (
-                "Was the field top:\n[1] On the top\n[2] On the bottom\n[3] Neither\n> "
+        self.logger.info("Removing bad icons")
+        icons = data["icon"].filter(
+            pc.and_(
+                pc.equal(pc.list_value_length(data["icon"]["bundles"]), 3),
+                pc.utf8_is_digit(data["icon"]["name"]),
             )
-
-            if sort_fields:
-                for field in sorted(data["field"]):
-                    field_data = {}
-                    field_image = self.game_service.unity_service.fetch_image(
-                        field, "fld"
-                    )
-                    field_image.show()
-
+        )
+        sorted_icons = {}
+
+        for key, value in zip(icons["name"].to_pylist(), icons["bundles"].to_pylist()):
+            art_list = self.game_service.unity_service.sort_sprite_list(value)
+            if art_list and len(art_list) == 3:
+                sorted_icons[key] = art_list
+
+        data["icon"] = pa.Table.from_pydict(
+            {
+                "name": list(sorted_icons),
+                **{
+                    size: [art_list[size] for art_list in sorted_icons.values()]
+                    for size in ICON_SIZES
+                },
+            },
+            schema=CLEAN_SCHEMAS["icon"],
+        )
+
+        self.logger.info("Removing bad deck boxes")
+        boxes = data["deck_box"]
+        data["deck_box"] = boxes.filter(
+            reduce(
+                pc.and_,
+                [pc.is_valid(boxes[size]) for size in DECK_BOX_SIZES],
+                pc.and_(pc.utf8_is_digit(boxes["name"]), pc.is_null(boxes["unknown"])),
+            )
+        ).drop_columns(["unknown"])
+
+        self.logger.info("Removing bad sleeves")
+        data["sleeve"] = data["sleeve"].filter(
+            pc.invert(
+                pc.is_in(
+                    data["sleeve"]["bundle"],
+                    value_set=pa.array(CONFIG.excluded_sleeves, pa.string()),
+                )
+            )
+        )
+
+        self.logger.info("Removing bad wallpapers")
+        wallpapers = data["wallpaper"]
+        data["wallpaper"] = wallpapers.filter(
+            reduce(pc.and_, [pc.is_valid(wallpapers[part]) for part in WALLPAPER_PARTS])
+        )
+
+        self.logger.info("Sorting fields")
+        field_position_prompt = """
+            Was the field center:
+            [1] On the top
+            [2] On the bottom
+            [3] Neither
+            > 
+            """
+        field_flip_prompt = (
+            "Was the field top:\n[1] On the top\n[2] On the bottom\n[3] Neither\n> "
+        )
+        field_bundles = data["field"]["bundle"].to_pylist()
+
+        if sort_fields:
+            new_fields = self.field_service.get_unclassified(field_bundles)
+            self.logger.info("%d new fields to sort", len(new_fields))
+
+            for field, field_image in self._prefetch_field_images(new_fields):
+                field_data = {}
+                field_image.show()
+
+                field_type = 0
+                while field_type not in ["1", "2", "3"]:
+                    field_type = input(field_position_prompt)
+                    match field_type:
+                        case "1":
+                            field_data["bottom"] = False
+                        case "2":
+                            field_data["bottom"] = True
+                        case "3":
+                            pass  # Skip unsupported fields
+
+                if field_type in ["1", "2"]:
                     field_type = 0
-                    while field_type not in ["1", "2", "3"]:
-                        field_type = input(field_position_prompt)
+                    while field_type not in ["1", "2"]:
+                        field_type = input(field_flip_prompt)
+
                         match field_type:
                             case "1":
-                                field_data["bottom"] = False
+                                field_data["flipped"] = False
                             case "2":
-                                field_data["bottom"] = True
-                            case "3":
-                                pass  # Skip unsupported fields
-
-                    if field_type in ["1", "2"]:
-                        field_type = 0
-                        while field_type not in ["1", "2"]:
-                            field_type = input(field_flip_prompt)
-
-                            match field_type:
-                                case "1":
-                                    field_data["flipped"] = False
-                                case "2":
-                                    field_data["flipped"] = True
-
-                        fields[field] = field_data
-
-                    print("\n")
-            else:
-                self.logger.info("Skipping field sorting")
-                if isfile("./etl/services/temp/data.json"):
-                    with open(
-                        "./etl/services/temp/data.json", "r", encoding="utf-8"
-                    ) as clean_file:
-                        clean_file_data = json.load(clean_file)
-                        fields = clean_file_data["field"]
-
-            data["field"] = fields
-
-            with open(
-                "./etl/services/temp/data.json", "w", encoding="utf-8"
-            ) as clean_file:
-                json.dump(data, clean_file)
+                                field_data["flipped"] = True
 
-    def get_ids(self) -> None:
-        """Extract and process game IDs from asset bundles."""
-        ids = get_data_wrapper()
+                    self.field_service.record(field, field_data)
+                else:
+                    self.field_service.record(field, None)
 
-        self.logger.info("Getting AssetBundles data...")
+                print("\n")
+        else:
+            self.logger.info("Skipping field sorting")
 
-        # self.game_service.get_dir_data("c7", True)
+        fields = self.field_service.get_fields(field_bundles)
+        data["field"] = pa.Table.from_pydict(
+            {
+                "bottom": [field["bottom"] for field in fields.values()],
+                "flipped": [field["flipped"] for field in fields.values()],
+                "bundle": list(fields),
+            },
+            schema=CLEAN_SCHEMAS["field"],
+        )
 
-        all_dirs = [
-            [data_dir, is_streaming]
-            for is_streaming, path in [(False, GAME_PATH), (True, STREAMING_PATH)]
-            for _, dirs, _ in os.walk(path)
-            for data_dir in dirs
-        ]
+        self.checkpoint_service.put("data", data)
 
-        dir_chunks = chunkify(all_dirs, NUM_THREADS)
+    def _prefetch_field_images(
+        self, fields: List[str]
+    ) -> Iterator[Tuple[str, "Image"]]:
+        """Yield field previews, loading the next ones in a background thread.
 
-        with ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
-            results = list(executor.map(self.process_dirs, dir_chunks))
+        Args:
+            fields: Field bundles, in the order they should be yielded.
 
-        for result in results:
-            self.merge_data(ids, result)
+        Yields:
+            Tuples of the field bundle and its downscaled preview image.
+        """
 
-        self.logger.info("Getting unity3d data...")
+        def fetch(field: str) -> "Image":
+            return self.game_service.unity_service.fetch_image(
+                field, "fld", max_size=self.field_preview_size
+            )
 
-        unity3d_data = self.game_service.get_unity3d_data()
+        remaining = iter(fields)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = deque(
+                (field, executor.submit(fetch, field))
+                for field in islice(remaining, self.field_prefetch + 1)
+            )
+            while pending:
+                field, future = pending.popleft()
+                for next_field in islice(remaining, 1):
+                    pending.append((next_field, executor.submit(fetch, next_field)))
+                yield field, future.result()
 
-        ids["card_icon"].update(unity3d_data["card_icon"])
+    def get_ids(self) -> None:
+        """Extract and process game IDs from asset bundles.
 
-        self.logger.info("Saving ids...")
+        Card icons are not stored in the asset bundles, see get_unity3d_ids.
+        """
+        self.logger.info("Getting AssetBundles data...")
 
-        with open("./etl/services/temp/ids.json", "w", encoding="utf-8") as outfile:
-            json.dump(ids, outfile)
+        # self.game_service.get_dir_data("c7", True)
 
-    def process_dirs(
-        self, dir_list: List[List[Union[str, bool]]]
-    ) -> Dict[str, Union[Dict[str, Any], List[Any]]]:
-        """Process a list of directories to extract game data.
+        all_dirs = []
+        bundles = 0
+        for is_streaming, path in [
+            (False, self.install.game_path),
+            (True, self.install.streaming_path),
+        ]:
+            for directory, dirs, files in os.walk(path):
+                all_dirs += [[data_dir, is_streaming] for data_dir in dirs]
+                if directory != path and os.path.basename(directory) != "root":
+                    bundles += len(files)
+        METRICS.set_progress(
+            "scan", bundles=bundles, started=time.time(), finished=None
+        )
+
+        num_threads = CONFIG.num_threads
+        dir_chunks = chunkify(all_dirs, num_threads)
+
+        # Each chunk streams its records to its own sink
+        self.sink_service.reset()
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            list(executor.map(self.process_dirs, dir_chunks, range(len(dir_chunks))))
+        METRICS.set_progress("scan", finished=time.time())
 
-        Args:
-            dir_list: List of [directory_name, is_streaming] pairs.
+        self.logger.info("Saving ids...")
 
-        Returns:
-            Dictionary containing extracted data.
-        """
-        local_ids = get_data_wrapper()
-        for data_dir, is_streaming in dir_list:
-            if data_dir != "root":
-                dir_ids = self.game_service.get_dir_data(data_dir, is_streaming)
-                self.merge_data(local_ids, dir_ids)
-                self.processed += 1
+        self.checkpoint_service.put("ids", self.sink_service.collect())
 
-        return local_ids
+    def get_unity3d_ids(self) -> None:
+        """Extract the card icon positions from the data.unity3d sprite atlas."""
+        self.logger.info("Getting unity3d data...")
 
-    def merge_data(self, ids: Dict[str, Any], result: Dict[str, Any]) -> None:
-        """Merge extracted data into the main data structure.
+        card_icons = self.game_service.get_unity3d_data()["card_icon"]
+        dimensions = ("x", "y", "width", "height")
+
+        self.checkpoint_service.put(
+            "unity3d_ids",
+            {
+                "card_icon": pa.Table.from_pydict(
+                    {
+                        "name": list(card_icons),
+                        **{
+                            dimension: [icon[dimension] for icon in card_icons.values()]
+                            for dimension in dimensions
+                        },
+                    },
+                    schema=ID_SCHEMAS["card_icon"],
+                )
+            },
+        )
+
+    def process_dirs(
+        self, dir_list: List[List[Union[str, bool]]], part: int = 0
+    ) -> None:
+        """Process a list of directories to extract game data.
+
+        The directories done and the records found so far are published as
+        the progress of the worker, see MetricsService.set_progress.
 
         Args:
-            ids: Main data structure to merge into.
-            result: Data to merge.
+            dir_list: List of [directory_name, is_streaming] pairs.
+            part: Index of the list among all processed lists, which orders
+                its records before those of the following lists.
         """
-        ids["card_id"].update(result["card_id"])
-        ids["sleeve"].extend(result["sleeve"])
-        merge_nested_dict_lists(ids, result)
-        merge_nested_dicts(ids["deck_box"], result["deck_box"])
-        merge_nested_dicts(ids["wallpaper"], result["wallpaper"])
-        ids["field"].extend(result["field"])
-        ids["card_data"].update(result["card_data"])
-        ids["face"].update(result["face"])
-        ids["coin"].extend(result["coin"])
+        task = f"worker {part}"
+        with self.sink_service.open(part) as sink:
+            for done, (data_dir, is_streaming) in enumerate(dir_list):
+                METRICS.set_progress(
+                    task,
+                    directory=data_dir,
+                    done=done,
+                    directories=len(dir_list),
+                    records=sink.counts,
+                )
+                if data_dir != "root":
+                    card_data_parts = self.game_service.get_dir_data(
+                        data_dir, is_streaming, sink
+                    )
+                    METRICS.increment("directories")
+
+                    if self.on_extracted is not None:
+                        for card_data_part in card_data_parts:
+                            self.on_extracted(self.workspace.path(card_data_part))
+
+            # The sink counts are moved to the counters once it is closed
+            METRICS.set_progress(
+                task,
+                directory=None,
+                done=len(dir_list),
+                directories=len(dir_list),
+                records=sink.counts,
+            )
 
     def add_suffix(self, names: List[str]) -> List[str]:
         """Add suffixes to duplicate names.
@@ -243,22 +347,9 @@ class DataService:
         Returns:
             List of names with suffixes added for duplicates.
         """
-        # Reverse the list to process from last to first
-        reversed_names = list(reversed(names))
-        name_counts: Dict[str, int] = {}
-        updated_names = []
-
-        for name in reversed_names:
-            # Increment the count for this name
-            if name in name_counts:
-                name_counts[name] += 1
-                updated_names.append(f"{name} (alt {name_counts[name] - 1})")
-            else:
-                name_counts[name] = 1
-                updated_names.append(name)
-
-        # Reverse the list back to the original order
-        return list(reversed(updated_names))
+        from pandas import Series
+
+        return self._add_suffix_column(Series(names, dtype=object)).tolist()
 
     def remove_extra_suffix(self, cards: Dict[str, Any]) -> Dict[str, Any]:
         """Remove extra suffixes from card names.
@@ -269,245 +360,107 @@ class DataService:
         Returns:
             Dictionary with cleaned card names.
         """
-        # Create a new dictionary to store the updated keys
-        updated_dict: Dict[str, Any] = {}
-
-        # Iterate through the original dictionary
-        for key, value in cards.items():
-            # Check if the key contains '(alt 1)'
-            if "(alt 1)" in key:
-                # Remove '(alt 1)' from the key
-                new_key = key.replace(" (alt 1)", "")
-
-                # Check if the new key already exists in the updated dictionary
-                if new_key not in cards:
-                    # If it doesn't exist, add the new key with the original value
-                    updated_dict[new_key] = value
-                else:
-                    # If it does exist, keep the original key and value
-                    updated_dict[key] = value
-            else:
-                updated_dict[key] = value
+        from pandas import Series
+
+        names = self._remove_extra_suffix_column(Series(list(cards), dtype=object))
+        return dict(zip(names, cards.values()))
+
+    def _add_suffix_column(self, names: "Series") -> "Series":
+        """Number every duplicate name but the last one as an alt art.
+
+        Args:
+            names: Column of names to process.
+
+        Returns:
+            Column with " (alt n)" appended to the duplicates, counting back
+            from the last occurrence of each name.
+        """
+        alt = names.groupby(names, sort=False).cumcount(ascending=False)
+        return names.where(alt == 0, names + " (alt " + alt.astype(str) + ")")
 
-        return updated_dict
+    def _remove_extra_suffix_column(self, names: "Series") -> "Series":
+        """Remove the "(alt 1)" suffix from names whose base name is missing.
+
+        Args:
+            names: Column of names to process.
+
+        Returns:
+            Column with the suffix removed where it no longer marks an alt art.
+        """
+        base_names = names.str.replace(" (alt 1)", "", regex=False)
+        extra = names.str.contains("(alt 1)", regex=False) & ~base_names.isin(names)
+        return names.where(~extra, base_names)
 
     def get_card_data(self) -> None:
-        """Extract and process card data from JSON files."""
+        """Join the decoded card data with the card arts found in the game files."""
+        from pandas import DataFrame, Series
+
         # Add alt art
         with open(
-            "./etl/services/temp/card_name.bytes.dec.json", "r", encoding="utf-8"
+            self.workspace.path("card_name.bytes.dec.json"), "r", encoding="utf-8"
         ) as names_json:
-            names = self.add_suffix(json.load(names_json))
+            names = self._add_suffix_column(Series(json.load(names_json), dtype=object))
 
         with (
             open(
-                "./etl/services/temp/card_prop.bytes.Card_IDs.dec.json",
+                self.workspace.path("card_prop.bytes.Card_IDs.dec.json"),
                 "r",
                 encoding="utf-8",
             ) as props_json,
             open(
-                "./etl/services/temp/card_desc.bytes.dec.json", "r", encoding="utf-8"
+                self.workspace.path("card_desc.bytes.dec.json"), "r", encoding="utf-8"
             ) as desc_json,
         ):
-            id_names = {
-                key: [value_b, value_c, value_d]
-                for key, value_b, value_c, value_d in zip(
-                    json.load(props_json),
-                    json.load(desc_json),
-                    names,
-                    range(len(names)),
-                )
+            card_ids = np.asarray(json.load(props_json), dtype=np.int64)
+            descriptions = json.load(desc_json)
+
+        count = min(len(card_ids), len(descriptions), len(names))
+        card_data = DataFrame(
+            {
+                "card_id": card_ids[:count],
+                "description": descriptions[:count],
+                "name": names[:count].to_numpy(),
+                "data_index": np.arange(count, dtype=np.int64),
             }
+        )
 
-            # Cards in this range seem to be irrelevant duplicates of exising ones
-            to_remove = [key for key in id_names if key in range(30000, 30100)]
-            for key in to_remove:
-                del id_names[key]
-
-        with open("./etl/services/temp/ids.json", "r", encoding="utf-8") as ids_json:
-            ids = json.load(ids_json)
-            updated_card_id = self.remove_extra_suffix(
-                {
-                    id_names.get(int(key), key)[1]: [
-                        value,
-                        id_names.get(int(key), key)[0],
-                        id_names.get(int(key), key)[2],
-                    ]
-                    for key, value, in ids["card_id"].items()
-                }
-            )
+        # Cards in this range seem to be irrelevant duplicates of exising ones
+        card_data = card_data[
+            ~card_data["card_id"].between(30000, 30099)
+        ].drop_duplicates("card_id", keep="last")
 
-            ids["card_names"] = updated_card_id
-            ids["legacy"] = {
-                name: value[0] for name, value in ids["card_names"].items()
-            }
+        ids = self.checkpoint_service.get("ids")
+        # Card icons come from the sprite atlas, which is scanned separately
+        ids["card_icon"] = self.checkpoint_service.get("unity3d_ids")["card_icon"]
+        arts = ids["card_id"].to_pandas()
+        arts["card_id"] = arts.pop("name").astype(np.int64)
+        cards = arts.merge(card_data, on="card_id", how="inner")
+
+        missing = len(arts) - len(cards)
+        if missing:
+            self.logger.warning("Skipping %d arts without card data", missing)
+
+        # Arts sharing a name keep the position of the first and data of the last
+        cards = cards.groupby("name", sort=False, as_index=False).last()
+        cards["name"] = self._remove_extra_suffix_column(cards["name"])
+        cards = cards.groupby("name", sort=False, as_index=False).last()
 
-            with open(
-                "./etl/services/temp/data_dirty.json", "w", encoding="utf-8"
-            ) as data_file:
-                json.dump(ids, data_file)
+        card_names = pa.Table.from_pandas(
+            cards, schema=CARD_NAMES_SCHEMA, preserve_index=False
+        )
+
+        self.checkpoint_service.put("data_dirty", {**ids, "card_names": card_names})
 
     def write_data(self) -> None:
         """Write processed data to Parquet files and update version information."""
-        with open("./etl/services/temp/data.json", "r", encoding="utf-8") as data_file:
-            data = json.load(data_file)
-
-            self.logger.info("Writing Sleeves...")
-            sleeves = DataFrame()
-            sleeves.insert(0, "bundle", data["sleeve"])
-            sleeves.to_parquet("./data/sleeves.parquet")
-
-            self.logger.info("Writing Cards...")
-            cards = DataFrame()
-            cards.insert(0, "name", data["card_names"].keys())
-            cards.insert(
-                0, "bundle", Series([value[0] for value in data["card_names"].values()])
-            )
-            cards.insert(
-                0,
-                "description",
-                Series([value[1] for value in data["card_names"].values()]),
-            )
-            cards.insert(
-                0,
-                "data_index",
-                Series([value[2] for value in data["card_names"].values()]),
-            )
-            cards.to_parquet("./data/cards.parquet")
-
-            self.logger.info("Writing Fields...")
-            fields = DataFrame()
-            fields.insert(0, "bundle", data["field"].keys())
-            fields.insert(
-                0,
-                "flipped",
-                Series([field["flipped"] for field in data["field"].values()]),
-            )
-            fields.insert(
-                0,
-                "bottom",
-                Series([field["bottom"] for field in data["field"].values()]),
-            )
-            fields.to_parquet("./data/fields.parquet")
-
-            self.logger.info("Writing Wallpapers...")
-            wallpapers = DataFrame()
-            wallpapers.insert(0, "name", data["wallpaper"].keys())
-            wallpapers.insert(
-                0,
-                "icon",
-                Series([wallpaper["icon"] for wallpaper in data["wallpaper"].values()]),
-            )
-            wallpapers.insert(
-                0,
-                "back",
-                Series([wallpaper["back"] for wallpaper in data["wallpaper"].values()]),
-            )
-            wallpapers.insert(
-                0,
-                "front",
-                Series(
-                    [wallpaper["front"] for wallpaper in data["wallpaper"].values()]
-                ),
-            )
-            wallpapers.to_parquet("./data/wallpapers.parquet")
+        data = self.checkpoint_service.get("data")
 
-            self.logger.info("Writing Card Faces...")
-            faces = DataFrame()
-            faces.insert(
-                0, "bundle", Series([f["bundle"] for f in data["face"].values()])
-            )
-            faces.insert(0, "key", Series([f["key"] for f in data["face"].values()]))
-            faces.insert(0, "name", data["face"].keys())
-            faces.to_parquet("./data/faces.parquet")
-
-            self.logger.info("Writing Deck Boxes...")
-            boxes = DataFrame()
-            boxes.insert(0, "name", data["deck_box"].keys())
-            boxes.insert(
-                0,
-                "r_large",
-                Series([deck_box["r_large"] for deck_box in data["deck_box"].values()]),
-            )
-            boxes.insert(
-                0,
-                "o_large",
-                Series([deck_box["o_large"] for deck_box in data["deck_box"].values()]),
-            )
-            boxes.insert(
-                0,
-                "large",
-                Series([deck_box["large"] for deck_box in data["deck_box"].values()]),
-            )
-            boxes.insert(
-                0,
-                "r_medium",
-                Series(
-                    [deck_box["r_medium"] for deck_box in data["deck_box"].values()]
-                ),
-            )
-            boxes.insert(
-                0,
-                "o_medium",
-                Series(
-                    [deck_box["o_medium"] for deck_box in data["deck_box"].values()]
-                ),
-            )
-            boxes.insert(
-                0,
-                "medium",
-                Series([deck_box["medium"] for deck_box in data["deck_box"].values()]),
-            )
-            boxes.insert(
-                0,
-                "small",
-                Series([deck_box["small"] for deck_box in data["deck_box"].values()]),
-            )
-            boxes.to_parquet("./data/deck_boxes.parquet")
+        self.logger.info("Building the card text index...")
+        tables = {name: data[category] for name, category in OUTPUT_TABLES.items()}
+        tables["card_text_index"] = build_text_index(data["card_names"])
 
-            self.logger.info("Writing Icons...")
-            icons = DataFrame()
-            sorted_icons = self.game_service.unity_service.sort_icon_sizes(
-                data["icon"].values()
-            )
-            icons.insert(0, "small", Series([icon["small"] for icon in sorted_icons]))
-            icons.insert(0, "medium", Series([icon["medium"] for icon in sorted_icons]))
-            icons.insert(0, "large", Series([icon["large"] for icon in sorted_icons]))
-            icons.insert(0, "name", data["icon"].keys())
-            icons.to_parquet("./data/icons.parquet")
-
-            self.logger.info("Writing Card Metadata...")
-            metadata = DataFrame()
-            metadata.insert(0, "name", data["card_data"].keys())
-            metadata.insert(0, "bundle", data["card_data"].values())
-            metadata.to_parquet("./data/metadata.parquet")
-
-            self.logger.info("Writing Coins...")
-            coins = DataFrame()
-            coins.insert(0, "bundle", data["coin"])
-            coins.to_parquet("./data/coins.parquet")
-
-            self.logger.info("Writing Card Icons...")
-            card_icons = DataFrame()
-            card_icons.insert(
-                0,
-                "height",
-                Series([icon["height"] for icon in data["card_icon"].values()]),
-            )
-            card_icons.insert(
-                0,
-                "width",
-                Series([icon["width"] for icon in data["card_icon"].values()]),
-            )
-            card_icons.insert(
-                0, "y", Series([icon["y"] for icon in data["card_icon"].values()])
-            )
-            card_icons.insert(
-                0, "x", Series([icon["x"] for icon in data["card_icon"].values()])
-            )
-            card_icons.insert(0, "name", data["card_icon"].keys())
-            card_icons.to_parquet("./data/card_icons.parquet")
+        self.logger.info("Validating tables...")
+        validate_tables(tables)
 
-            self.logger.info("Updating Version...")
-            with open("./data/version.txt", "w", encoding="utf-8") as file:
-                file.write(datetime.today().strftime("%Y-%m-%d"))
+        self.logger.info("Writing tables...")
+        self.writer_service.write(tables, datetime.today().strftime("%Y-%m-%d"))
@@ -1,11 +1,46 @@
 """Service for handling card data decryption operations."""
 
-from typing import Any
+import os
+from os.path import dirname, join
+from typing import Any, Optional
+
+from util import CONFIG, Install, Workspace
+
+
+def crypto_key_path(install: Install) -> str:
+    """Get the path of the file keeping the crypto key of an install.
+
+    The key is kept next to the field store rather than in the workspace,
+    which is cleared after every run, so it is only searched for again when
+    the game changes it.
+
+    Args:
+        install: Install the key decrypts the card data of.
+
+    Returns:
+        Path of the key file, named after the install.
+    """
+    return join(dirname(CONFIG.field_store), f"{install.name}.CryptoKey.txt")
 
 
 class DecodeService:
     """Service class for decrypting card data."""
 
+    def __init__(
+        self, workspace: Optional[Workspace] = None, key_path: Optional[str] = None
+    ) -> None:
+        """Initialize the DecodeService.
+
+        Args:
+            workspace: Workspace holding the card data parts to decrypt.
+            key_path: Path of the file keeping the crypto key, see
+                crypto_key_path. Defaults to a file in the workspace.
+        """
+        self.workspace = workspace or Workspace()
+        self.key_path = key_path
+        if key_path is not None:
+            os.makedirs(dirname(key_path) or ".", exist_ok=True)
+
     def decrypt_desc_indx_name(self) -> Any:
         """Decrypt the description index name data.
 
@@ -14,7 +49,7 @@ class DecodeService:
         """
         from decode.decrypt_card import decrypt_desc_indx_name
 
-        return decrypt_desc_indx_name()
+        return decrypt_desc_indx_name(self.workspace.directory, self.key_path)
 
     def decrypt_ids(self) -> Any:
         """Decrypt the card IDs data.
@@ -24,4 +59,4 @@ class DecodeService:
         """
         from decode.decrypt_ids import decrypt_ids
 
-        return decrypt_ids()
+        return decrypt_ids(self.workspace.directory, self.key_path)
@@ -0,0 +1,96 @@
+"""Service for persisting field orientation decisions between runs."""
+
+import json
+import logging
+import os
+from os.path import isfile
+from typing import Dict, Iterable, List, Optional
+
+from util import CONFIG
+
+
+class FieldService:
+    """Service class for storing how each field bundle should be displayed.
+
+    Decisions are kept in a JSON file keyed by field bundle, mapping to either
+    the field orientation or None for fields that are not supported, so that
+    each field only has to be classified once.
+    """
+
+    def __init__(self, store_path: Optional[str] = None) -> None:
+        """Initialize the FieldService, loading any stored decisions.
+
+        Args:
+            store_path: Path to the JSON file holding the decisions. Defaults
+                to the field_store of the configuration.
+        """
+        self.logger = logging.getLogger("FieldService")
+        self.store_path = store_path or CONFIG.field_store
+        self.decisions: Dict[str, Optional[Dict[str, bool]]] = {}
+
+        if isfile(self.store_path):
+            with open(self.store_path, "r", encoding="utf-8") as store_file:
+                self.decisions = json.load(store_file)
+
+    def is_classified(self, bundle: str) -> bool:
+        """Check whether a field has already been classified.
+
+        Args:
+            bundle: Field bundle name.
+
+        Returns:
+            True if a decision, supported or not, is stored for the field.
+        """
+        return bundle in self.decisions
+
+    def get_unclassified(self, bundles: Iterable[str]) -> List[str]:
+        """Get the fields that have never been classified.
+
+        Args:
+            bundles: Field bundle names.
+
+        Returns:
+            Sorted list of the unique bundles without a stored decision.
+        """
+        return sorted({bundle for bundle in bundles if not self.is_classified(bundle)})
+
+    def record(self, bundle: str, orientation: Optional[Dict[str, bool]]) -> None:
+        """Store the decision for a field and persist the store.
+
+        The store is saved after every decision, so answers given before an
+        interrupted run are not lost.
+
+        Args:
+            bundle: Field bundle name.
+            orientation: Dictionary with the "bottom" and "flipped" flags, or
+                None if the field is not supported.
+        """
+        self.decisions[bundle] = orientation
+        self.save()
+
+    def get_fields(self, bundles: Iterable[str]) -> Dict[str, Dict[str, bool]]:
+        """Get the orientation of the supported fields among the given bundles.
+
+        Args:
+            bundles: Field bundle names.
+
+        Returns:
+            Dictionary mapping each supported field bundle to its orientation.
+        """
+        return {
+            bundle: self.decisions[bundle]
+            for bundle in sorted(set(bundles))
+            if self.decisions.get(bundle) is not None
+        }
+
+    def save(self) -> None:
+        """Atomically write the decisions to the store file."""
+        directory = os.path.dirname(self.store_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{self.store_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as store_file:
+            json.dump(dict(sorted(self.decisions.items())), store_file, indent=2)
+            store_file.write("\n")
+        os.replace(temp_path, self.store_path)
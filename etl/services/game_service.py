@@ -3,12 +3,15 @@
 import os
 import re
 import logging
-from typing import Any, Dict
+import threading
+import time
+from typing import Any, Dict, List, Optional
 
-import UnityPy
-
-from util import STREAMING_PATH, GAME_PATH, get_data_wrapper
+from util import CONFIG, Install, Workspace
 
+from .bundle_cache_service import BundleCacheService, RecordingSink
+from .metrics_service import METRICS
+from .sink_service import RecordSink
 from .unity_service import UnityService
 
 
@@ -33,71 +36,191 @@ class GameService:
         "card_frame18": "Link",
         "card_frame19": "Ritual Pendulum",
     }
+    # Attempts at replacing a card data part while it is open for reading,
+    # which fails on Windows, and the seconds waited between them
+    replace_attempts: int = 50
+    replace_delay: float = 0.1
+
+    def __init__(
+        self,
+        workspace: Optional[Workspace] = None,
+        install: Optional[Install] = None,
+        bundle_cache: Optional[BundleCacheService] = None,
+    ) -> None:
+        """Initialize the GameService with a UnityService instance.
 
-    def __init__(self) -> None:
-        """Initialize the GameService with a UnityService instance."""
+        Args:
+            workspace: Workspace the card data parts are extracted to.
+            install: Install the game files are read from.
+            bundle_cache: Cache of bundles scanned by other installs, if any.
+        """
         self.logger = logging.getLogger("GameService")
-        self.unity_service = UnityService()
-
-    def get_dir_data(self, data_dir: str, is_streaming: bool) -> Dict[str, Any]:
-        """Get data from a directory in the game files.
+        self.workspace = workspace or Workspace()
+        self.install = install or CONFIG.installs[0]
+        self.bundle_cache = bundle_cache
+        self.unity_service = UnityService(self.install)
+        self.load_environment = self.unity_service.load_environment
+        # Objects read from the bundle each thread is scanning
+        self._local = threading.local()
+
+    def get_dir_data(
+        self, data_dir: str, is_streaming: bool, sink: RecordSink
+    ) -> List[str]:
+        """Extract data from a directory in the game files.
 
         Args:
             data_dir: Directory to extract data from.
             is_streaming: Whether to use streaming assets path.
+            sink: Sink the extracted records are emitted to.
 
         Returns:
-            Dictionary containing extracted data.
+            Names of the card data parts extracted to the workspace.
         """
-        ids = get_data_wrapper()
+        card_data_parts = []
         for _, _, files in os.walk(
-            os.path.join(STREAMING_PATH if is_streaming else GAME_PATH, data_dir)
+            os.path.join(
+                (
+                    self.install.streaming_path
+                    if is_streaming
+                    else self.install.game_path
+                ),
+                data_dir,
+            )
         ):
             for bundle in files:
-                env = UnityPy.load(
-                    self.unity_service.prepare_environment(is_streaming, bundle)
+                path = self.unity_service.prepare_environment(is_streaming, bundle)
+                with METRICS.timer("bundle", bundle):
+                    card_data_parts += self._scan_bundle(path, bundle, data_dir, sink)
+
+                METRICS.increment("bundles")
+                METRICS.increment("bytes_read", os.path.getsize(path))
+
+        return card_data_parts
+
+    def _scan_bundle(
+        self, path: str, bundle: str, data_dir: str, sink: RecordSink
+    ) -> List[str]:
+        """Extract data from a bundle, or replay it from the bundle cache.
+
+        Args:
+            path: Path to the bundle file.
+            bundle: Bundle name.
+            data_dir: Directory containing the bundle.
+            sink: Sink the extracted records are emitted to.
+
+        Returns:
+            Names of the card data parts extracted to the workspace.
+        """
+        if self.bundle_cache is None:
+            return self._parse_bundle(path, bundle, data_dir, sink)
+
+        key = self.bundle_cache.key(path)
+        cached = self.bundle_cache.get(key)
+        if cached is not None:
+            records, parts = cached
+            for category, values in records:
+                sink.emit(category, *values, bundle)
+            for part, part_path in parts.items():
+                with open(part_path, "rb") as f:
+                    self._write_part(part, f.read())
+            METRICS.increment("bundles_cached")
+            return list(parts)
+
+        recording_sink = RecordingSink(sink)
+        card_data_parts = self._parse_bundle(path, bundle, data_dir, recording_sink)
+        self.bundle_cache.put(
+            key,
+            recording_sink.records,
+            {part: self.workspace.path(part) for part in card_data_parts},
+        )
+        return card_data_parts
+
+    def _parse_bundle(
+        self, path: str, bundle: str, data_dir: str, sink: RecordSink
+    ) -> List[str]:
+        """Extract data from a bundle in the game files.
+
+        Args:
+            path: Path to the bundle file.
+            bundle: Bundle name.
+            data_dir: Directory containing the bundle.
+            sink: Sink the extracted records are emitted to.
+
+        Returns:
+            Names of the card data parts extracted to the workspace.
+        """
+        card_data_parts = []
+        self._local.read = set()
+
+        env = self._load_bundle(path)
+        for key in env.container.keys():
+            if data_dir.lower() == "c7":
+                pass
+            if "card/images/illust/common/" in key or "card/images/illust/tcg/" in key:
+                self._parse_card(sink, env, bundle)
+            elif "images/profileicon/" in key:
+                self._parse_icon(sink, env, bundle)
+            elif (
+                "assets/resourcesassetbundle/protector/common/" in key
+                or "assets/resourcesassetbundle/protector/tcg/" in key
+            ):
+                self._parse_sleeve(sink, env, bundle)
+            elif "assets/resourcesassetbundle/images/deckcase" in key:
+                self._parse_deck_box(sink, env, bundle)
+            elif re.search(re.compile(r"mat_0\d\d_near"), key.lower()):
+                self._parse_field(sink, env, bundle)
+            elif "card/data" in key and "en-us/card_" in key:
+                part = key.split("/")[-1]
+                if self._parse_card_data_part(env, part, sink, bundle):
+                    card_data_parts.append(part)
+            elif "assets/resourcesassetbundle/wallpaper/wallpaper" in key and (
+                "wallpapericon" in key
+                or re.search(re.compile(r"tcg/wallpaper\d\d\d\d_\d"), key.lower())
+            ):
+                self._parse_wallpaper(
+                    sink, env, bundle, re.search(r"\d{4}", key).group(0)
                 )
-                for key in env.container.keys():
-                    if data_dir.lower() == "c7":
-                        pass
-                    if (
-                        "card/images/illust/common/" in key
-                        or "card/images/illust/tcg/" in key
-                    ):
-                        self._parse_card(ids, env, bundle)
-                    elif "images/profileicon/" in key:
-                        self._parse_icon(ids, env, bundle)
-                    elif (
-                        "assets/resourcesassetbundle/protector/common/" in key
-                        or "assets/resourcesassetbundle/protector/tcg/" in key
-                    ):
-                        self._parse_sleeve(ids, env, bundle)
-                    elif "assets/resourcesassetbundle/images/deckcase" in key:
-                        self._parse_deck_box(ids, env, bundle)
-                    elif re.search(re.compile(r"mat_0\d\d_near"), key.lower()):
-                        self._parse_field(ids, env, bundle)
-                    elif "card/data" in key and "en-us/card_" in key:
-                        self._parse_card_data_part(env, key.split("/")[-1], ids, bundle)
-                    elif "assets/resourcesassetbundle/wallpaper/wallpaper" in key and (
-                        "wallpapericon" in key
-                        or re.search(
-                            re.compile(r"tcg/wallpaper\d\d\d\d_\d"), key.lower()
-                        )
-                    ):
-                        self._parse_wallpaper(
-                            ids, env, bundle, re.search(r"\d{4}", key).group(0)
-                        )
-                    elif (
-                        "assets/resourcesassetbundle/card/scriptableobjects/cardpicturesetting"
-                        in key.lower()
-                    ):
-                        self._parse_face(ids, env, bundle)
-                    elif re.search(re.compile(r"coin\d\dtex"), key.lower()) or (
-                        "cointoss" in key.lower() and "icon" not in key.lower()
-                    ):
-                        self._parse_coin(ids, env, bundle)
+            elif (
+                "assets/resourcesassetbundle/card/scriptableobjects/cardpicturesetting"
+                in key.lower()
+            ):
+                self._parse_face(sink, env, bundle)
+            elif re.search(re.compile(r"coin\d\dtex"), key.lower()) or (
+                "cointoss" in key.lower() and "icon" not in key.lower()
+            ):
+                self._parse_coin(sink, env, bundle)
 
-        return ids
+        objects = len(env.objects)
+        METRICS.increment("objects_read", len(self._local.read))
+        METRICS.increment("objects_skipped", objects - len(self._local.read))
+        self._local.read = None
+
+        return card_data_parts
+
+    def _load_bundle(self, path: str) -> Any:
+        """Load a bundle file.
+
+        Args:
+            path: Path to the bundle file.
+
+        Returns:
+            Unity environment of the bundle.
+        """
+        return self.load_environment(path)
+
+    def _read(self, obj: Any) -> Any:
+        """Read an object, counting it as read for the bundle being scanned.
+
+        Args:
+            obj: Unity object.
+
+        Returns:
+            Data of the object.
+        """
+        read = getattr(self._local, "read", None)
+        if read is not None:
+            read.add(obj.path_id)
+        return obj.read()
 
     def get_unity3d_data(self) -> Dict[str, Any]:
         """Get data from Unity3D files.
@@ -106,7 +229,7 @@ class GameService:
             Dictionary containing Unity3D data.
         """
         ids = {"card_id": {}, "card_icon": {}}
-        env = UnityPy.load(self.unity_service.prepare_unity3d_environment())
+        env = self.load_environment(self.unity_service.prepare_unity3d_environment())
 
         self.logger.info("Got env...")
 
@@ -136,55 +259,55 @@ class GameService:
 
         return ids
 
-    def _parse_card(self, ids: Dict[str, Any], env: Any, bundle: str) -> None:
+    def _parse_card(self, sink: RecordSink, env: Any, bundle: str) -> None:
         """Parse card data from Unity environment.
 
         Args:
-            ids: Dictionary to store parsed data.
+            sink: Sink the parsed records are emitted to.
             env: Unity environment.
             bundle: Bundle name.
         """
         for obj in env.objects:
             if obj.type.name == "Texture2D":
-                obj_data = obj.read()
-                ids["card_id"][obj_data.m_Name] = bundle
+                obj_data = self._read(obj)
+                sink.emit("card_id", obj_data.m_Name, bundle)
 
-    def _parse_icon(self, ids: Dict[str, Any], env: Any, bundle: str) -> None:
+    def _parse_icon(self, sink: RecordSink, env: Any, bundle: str) -> None:
         """Parse icon data from Unity environment.
 
         Args:
-            ids: Dictionary to store parsed data.
+            sink: Sink the parsed records are emitted to.
             env: Unity environment.
             bundle: Bundle name.
         """
         for obj in env.objects:
             if obj.type.name == "Texture2D":
-                obj_data = obj.read()
-                ids["icon"].setdefault(obj_data.m_Name[11:18], []).append(bundle)
+                obj_data = self._read(obj)
+                sink.emit("icon", obj_data.m_Name[11:18], bundle)
 
-    def _parse_sleeve(self, ids: Dict[str, Any], env: Any, bundle: str) -> None:
+    def _parse_sleeve(self, sink: RecordSink, env: Any, bundle: str) -> None:
         """Parse sleeve data from Unity environment.
 
         Args:
-            ids: Dictionary to store parsed data.
+            sink: Sink the parsed records are emitted to.
             env: Unity environment.
             bundle: Bundle name.
         """
         for obj in env.objects:
-            obj_data = obj.read()
+            obj_data = self._read(obj)
             if obj.type.name == "Texture2D" and "ProtectorIcon" in obj_data.m_Name:
-                ids["sleeve"].append(bundle)
+                sink.emit("sleeve", bundle)
 
-    def _parse_deck_box(self, ids: Dict[str, Any], env: Any, bundle: str) -> None:
+    def _parse_deck_box(self, sink: RecordSink, env: Any, bundle: str) -> None:
         """Parse deck box data from Unity environment.
 
         Args:
-            ids: Dictionary to store parsed data.
+            sink: Sink the parsed records are emitted to.
             env: Unity environment.
             bundle: Bundle name.
         """
         for obj in env.objects:
-            obj_data = obj.read()
+            obj_data = self._read(obj)
             if "DeckCase" in obj_data.m_Name and obj.type.name == "Texture2D":
                 deck_id = int("".join(ch for ch in obj_data.m_Name if ch.isdigit()))
                 match [
@@ -207,20 +330,18 @@ class GameService:
                         image_type = "o_large"
                     case _:
                         image_type = ""
-                if deck_id not in ids["deck_box"]:
-                    ids["deck_box"][deck_id] = {}
-                ids["deck_box"][deck_id][image_type] = bundle
+                sink.emit("deck_box", str(deck_id), image_type, bundle)
 
-    def _parse_field(self, ids: Dict[str, Any], env: Any, bundle: str) -> None:
+    def _parse_field(self, sink: RecordSink, env: Any, bundle: str) -> None:
         """Parse field data from Unity environment.
 
         Args:
-            ids: Dictionary to store parsed data.
+            sink: Sink the parsed records are emitted to.
             env: Unity environment.
             bundle: Bundle name.
         """
         for obj in env.objects:
-            obj_data = obj.read()
+            obj_data = self._read(obj)
             if (
                 hasattr(obj_data, "m_Name")
                 and re.search(
@@ -228,76 +349,111 @@ class GameService:
                 )
                 and obj.type.name == "Texture2D"
             ):
-                ids["field"].append(bundle)
+                sink.emit("field", bundle)
 
     def _parse_wallpaper(
-        self, ids: Dict[str, Any], env: Any, bundle: str, wallpaper: str
+        self, sink: RecordSink, env: Any, bundle: str, wallpaper: str
     ) -> None:
         """Parse wallpaper data from Unity environment.
 
         Args:
-            ids: Dictionary to store parsed data.
+            sink: Sink the parsed records are emitted to.
             env: Unity environment.
             bundle: Bundle name.
             wallpaper: Wallpaper identifier.
         """
         for obj in env.objects:
-            obj_data = obj.read()
+            obj_data = self._read(obj)
             if obj.type.name == "Texture2D":
-                if wallpaper not in ids["wallpaper"]:
-                    ids["wallpaper"][wallpaper] = {}
                 if "Icon" in obj_data.m_Name:
-                    ids["wallpaper"][wallpaper]["icon"] = bundle
+                    part = "icon"
                 elif "_1" in obj_data.m_Name:
-                    ids["wallpaper"][wallpaper]["front"] = bundle
+                    part = "front"
                 elif "_2" in obj_data.m_Name:
-                    ids["wallpaper"][wallpaper]["back"] = bundle
+                    part = "back"
+                else:
+                    part = None
+                sink.emit("wallpaper", wallpaper, part, bundle)
 
     def _parse_card_data_part(
-        self, env: Any, part: str, ids: Dict[str, Any], bundle: str
-    ) -> None:
+        self, env: Any, part: str, sink: RecordSink, bundle: str
+    ) -> bool:
         """Parse card data part from Unity environment.
 
         Args:
             env: Unity environment.
             part: Part identifier.
-            ids: Dictionary to store parsed data.
+            sink: Sink the parsed records are emitted to.
             bundle: Bundle name.
+
+        Returns:
+            True if the part was written to the workspace.
         """
+        extracted = False
         for obj in env.objects:
-            data = obj.read()
+            data = self._read(obj)
             if obj.type.name == "TextAsset":
-                with open(f"./etl/services/temp/{part}", "wb") as f:
-                    f.write(data.m_Script.encode("utf-8", "surrogateescape"))
-                ids["card_data"][part] = bundle
+                self._write_part(part, data.m_Script.encode("utf-8", "surrogateescape"))
+                sink.emit("card_data", part, bundle)
+                extracted = True
+        return extracted
+
+    def _write_part(self, part: str, content: bytes) -> None:
+        """Write a card data part to the workspace as a whole.
+
+        The part is written to a temporary file first, which then replaces
+        the part, so the decoders never read a partially written part when a
+        later bundle carries it again.
 
-    def _parse_coin(self, ids: Dict[str, Any], env: Any, bundle: str) -> None:
+        Args:
+            part: Name of the card data part.
+            content: Content of the part.
+        """
+        path = self.workspace.path(part)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(content)
+
+        for attempt in range(self.replace_attempts):
+            try:
+                os.replace(temp_path, path)
+                return
+            except PermissionError:
+                if attempt == self.replace_attempts - 1:
+                    os.remove(temp_path)
+                    raise
+                time.sleep(self.replace_delay)
+
+    def _parse_coin(self, sink: RecordSink, env: Any, bundle: str) -> None:
         """Parse coin data from Unity environment.
 
         Args:
-            ids: Dictionary to store parsed data.
+            sink: Sink the parsed records are emitted to.
             env: Unity environment.
             bundle: Bundle name.
         """
         for obj in env.objects:
-            obj_data = obj.read()
+            obj_data = self._read(obj)
             if obj.type.name == "Texture2D" and "coin" in obj_data.m_Name.lower():
-                ids["coin"].append(bundle)
+                sink.emit("coin", bundle)
 
-    def _parse_face(self, ids: Dict[str, Any], env: Any, bundle: str) -> None:
+    def _parse_face(self, sink: RecordSink, env: Any, bundle: str) -> None:
         """Parse face data from Unity environment.
 
         All faces are in the same bundle. Looks for the first face (card_frame00)
         to confirm this is the correct bundle, then collects all faces from it.
 
         Args:
-            ids: Dictionary to store parsed data.
+            sink: Sink the parsed records are emitted to.
             env: Unity environment.
             bundle: Bundle name.
         """
         found_first = False
         for obj in env.objects:
-            if obj.type.name == "Texture2D" and obj.read().m_Name == "card_frame00":
+            if (
+                obj.type.name == "Texture2D"
+                and self._read(obj).m_Name == "card_frame00"
+            ):
                 found_first = True
                 break
 
@@ -306,9 +462,8 @@ class GameService:
 
         for obj in env.objects:
             if obj.type.name == "Texture2D":
-                obj_data = obj.read()
+                obj_data = self._read(obj)
                 if obj_data.m_Name in self.face_names and obj_data.m_Width != 480:
-                    ids["face"][self.face_names[obj_data.m_Name]] = {
-                        "key": obj.path_id,
-                        "bundle": bundle,
-                    }
+                    sink.emit(
+                        "face", self.face_names[obj_data.m_Name], obj.path_id, bundle
+                    )
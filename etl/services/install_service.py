@@ -0,0 +1,181 @@
+"""Service for extracting the data of several game installs in one run."""
+
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from util import CONFIG, Install, Workspace
+
+from .bundle_cache_service import BundleCacheService
+from .metrics_service import METRICS
+from .pipeline_service import PipelineService, default_report_path
+
+# Stages reading the game files, run for every install at the same time
+EXTRACT_STAGES = ("get_ids", "get_unity3d_ids", "decode_card_data", "get_card_data")
+# Stages cleaning and publishing the data, run for one install at a time
+PUBLISH_STAGES = ("clean_data", "write_data")
+
+
+def extract_install(
+    install: Install,
+    workspace_dir: str,
+    cache_dir: str,
+    force: bool = False,
+    profile: bool = False,
+    memory: bool = False,
+    config_path: str = "config.json",
+    overrides: Optional[Dict[str, Any]] = None,
+    stages: Tuple[str, ...] = EXTRACT_STAGES,
+) -> Dict[str, Any]:
+    """Run the extraction stages of an install, in a process of its own.
+
+    Args:
+        install: Install to extract.
+        workspace_dir: Directory of the workspace of the install.
+        cache_dir: Directory of the bundle cache shared by all installs.
+        force: Whether to run the stages even if they already completed.
+        profile: Whether to profile the bundle scan.
+        memory: Whether to probe the memory used by each stage.
+        config_path: Configuration file of the run.
+        overrides: Settings overridden in the run, see Config.override.
+        stages: Extraction stages to run.
+
+    Returns:
+        Snapshot of the metrics of the extraction.
+    """
+    CONFIG.load(config_path)
+    CONFIG.override(**(overrides or {}))
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"[%(asctime)s|{install.name}|%(name)s|%(levelname)s]: %(message)s",
+        force=True,
+    )
+
+    workspace = Workspace(workspace_dir)
+    pipeline = PipelineService(
+        workspace=workspace,
+        report_path=default_report_path(install, "extract"),
+        profile=profile,
+        memory=memory,
+        install=install,
+        bundle_cache=BundleCacheService(cache_dir),
+    )
+    pipeline.run(stages, force=force)
+    return METRICS.snapshot()
+
+
+class InstallService:
+    """Service class for extracting several installs in one run.
+
+    Every install is extracted by its own pipeline, in its own workspace and
+    process, so the installs are scanned concurrently. Bundles are shared
+    through a cache keyed by their content, so a bundle found in several
+    installs is only parsed once. Cleaning asks for the new fields to be
+    sorted, so the installs are then cleaned and published one at a time,
+    each to its own output directory, with its run reports in the reports
+    directory of the install.
+    """
+
+    # Amount of installs extracted at the same time, all of them if None
+    max_workers: Optional[int] = None
+
+    def __init__(
+        self,
+        installs: List[Install],
+        workspace: Optional[Workspace] = None,
+        profile: bool = False,
+        memory: bool = False,
+    ) -> None:
+        """Initialize the InstallService.
+
+        Args:
+            installs: Installs to extract.
+            workspace: Workspace holding one workspace per install and the
+                bundle cache.
+            profile: Whether to profile the bundle scan of each install.
+            memory: Whether to probe the memory used by the extraction stages
+                of each install.
+        """
+        self.logger = logging.getLogger("InstallService")
+        self.installs = installs
+        self.workspace = workspace or Workspace()
+        self.profile = profile
+        self.memory = memory
+        self.workspaces = {
+            install.name: Workspace(self.workspace.path(install.name))
+            for install in installs
+        }
+        self.cache_dir = self.workspace.path("bundle_cache")
+
+    def run(
+        self,
+        names: Optional[Iterable[str]] = None,
+        force: bool = False,
+        params: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> Dict[str, Dict[str, bool]]:
+        """Extract all installs, then clean and publish each of them.
+
+        Installs whose extraction succeeded are published even if another
+        failed, the first error is raised once they are.
+
+        Args:
+            names: Names of the stages to run, all of them if None.
+            force: Whether to run the stages even if they already completed.
+            params: Dictionary mapping stage names to their keyword arguments,
+                passed to the publishing stages.
+
+        Returns:
+            Dictionary mapping each published install name to whether each
+            of its publishing stages was run or skipped.
+
+        Raises:
+            Exception: The first error raised while extracting an install.
+        """
+        selected = set(EXTRACT_STAGES + PUBLISH_STAGES if names is None else names)
+        extract_stages = tuple(name for name in EXTRACT_STAGES if name in selected)
+        publish_stages = tuple(name for name in PUBLISH_STAGES if name in selected)
+
+        futures: Dict[str, Future] = {}
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers or len(self.installs),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            for install in self.installs:
+                self.logger.info("Extracting %s...", install.name)
+                futures[install.name] = executor.submit(
+                    extract_install,
+                    install,
+                    self.workspaces[install.name].directory,
+                    self.cache_dir,
+                    force,
+                    self.profile,
+                    self.memory,
+                    CONFIG.path,
+                    dict(CONFIG.overrides),
+                    extract_stages,
+                )
+
+        results = {}
+        errors = []
+        for install in self.installs:
+            error = futures[install.name].exception()
+            if error is not None:
+                self.logger.error("Extracting %s failed: %s", install.name, error)
+                errors.append(error)
+                continue
+
+            self.logger.info("Publishing %s to %s...", install.name, install.output_dir)
+            pipeline = PipelineService(
+                workspace=self.workspaces[install.name], install=install
+            )
+            results[install.name] = pipeline.run(
+                publish_stages,
+                force=force,
+                params=params,
+                metrics=futures[install.name].result(),
+            )
+
+        if errors:
+            raise errors[0]
+        return results
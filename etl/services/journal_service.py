@@ -0,0 +1,139 @@
+"""Service for recording which ETL stages have completed."""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from os.path import isdir, isfile, join
+from typing import Any, Dict, List, Optional
+
+from util import TEMP_PATH
+
+
+class JournalService:
+    """Service class for the run journal.
+
+    The journal records, for each completed stage, a fingerprint of the files
+    it read, a fingerprint of the files it wrote and the parameters it was run
+    with. A stage is complete while all three still match, so an interrupted
+    run can resume from the first stage that did not complete.
+    """
+
+    def __init__(self, path: str = join(TEMP_PATH, "journal.json")) -> None:
+        """Initialize the JournalService, loading any existing journal.
+
+        Args:
+            path: Path to the journal file.
+        """
+        self.logger = logging.getLogger("JournalService")
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # Stages running concurrently record their completion from their threads
+        self.lock = threading.Lock()
+
+        if isfile(path):
+            with open(path, "r", encoding="utf-8") as journal_file:
+                self.entries = json.load(journal_file)
+
+    def fingerprint(self, paths: List[str]) -> str:
+        """Fingerprint files and directories by their names, sizes and times.
+
+        Directories are fingerprinted recursively. Missing paths are part of
+        the fingerprint, so creating them changes it.
+
+        Args:
+            paths: Paths of the files and directories.
+
+        Returns:
+            Hex digest identifying the current state of the paths.
+        """
+        digest = hashlib.sha256()
+
+        for path in paths:
+            digest.update(path.encode("utf-8"))
+            if isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for name in sorted(files):
+                        self._update_digest(digest, join(root, name))
+            elif isfile(path):
+                self._update_digest(digest, path)
+            else:
+                digest.update(b"\0missing")
+
+        return digest.hexdigest()
+
+    def _update_digest(self, digest: Any, file_path: str) -> None:
+        """Add the name, size and modification time of a file to a digest.
+
+        Args:
+            digest: Hash object to update.
+            file_path: Path of the file.
+        """
+        stat = os.stat(file_path)
+        digest.update(f"{file_path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+
+    def is_complete(
+        self,
+        stage: str,
+        inputs: List[str],
+        outputs: List[str],
+        params: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Check whether a stage completed with the current inputs.
+
+        Args:
+            stage: Name of the stage.
+            inputs: Paths the stage reads.
+            outputs: Paths the stage writes.
+            params: Parameters the stage is run with.
+
+        Returns:
+            True if the stage completed with the same inputs and parameters,
+            and its outputs were not changed since.
+        """
+        entry = self.entries.get(stage)
+        return (
+            entry is not None
+            and entry["params"] == (params or {})
+            and entry["inputs"] == self.fingerprint(inputs)
+            and entry["outputs"] == self.fingerprint(outputs)
+        )
+
+    def record(
+        self,
+        stage: str,
+        inputs_fingerprint: str,
+        outputs: List[str],
+        params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Record a completed stage and save the journal.
+
+        Args:
+            stage: Name of the stage.
+            inputs_fingerprint: Fingerprint of the inputs, taken before the
+                stage ran unless the stage also writes some of them.
+            outputs: Paths the stage wrote.
+            params: Parameters the stage was run with.
+        """
+        entry = {
+            "inputs": inputs_fingerprint,
+            "outputs": self.fingerprint(outputs),
+            "params": params or {},
+            "finished": datetime.now().isoformat(timespec="seconds"),
+        }
+
+        with self.lock:
+            self.entries[stage] = entry
+            self.save()
+
+    def save(self) -> None:
+        """Atomically write the journal file."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as journal_file:
+            json.dump(dict(self.entries), journal_file, indent=2)
+        os.replace(temp_path, self.path)
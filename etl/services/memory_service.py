@@ -0,0 +1,272 @@
+"""Service for probing the memory used by the ETL stages."""
+
+import functools
+import heapq
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from os.path import basename, getsize
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+
+from .checkpoint_service import CheckpointService
+from .data_service import DataService
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+MEBIBYTE = 1 << 20
+
+
+def current_rss_mb() -> Optional[float]:
+    """Get the resident memory of the current process.
+
+    Returns:
+        Resident memory in MiB, or None if it can't be measured.
+    """
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / MEBIBYTE, 1)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Get the peak resident memory of the current process.
+
+    Returns:
+        Peak resident memory in MiB, or None if it can't be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in KiB elsewhere
+    return round(peak / (MEBIBYTE if sys.platform == "darwin" else 1 << 10), 1)
+
+
+class MemoryService:
+    """Service class for probing the memory used by a run.
+
+    While probing, Python allocations are traced with tracemalloc. At the end
+    of each stage, the resident memory, the traced peak since the stage
+    started, the memory held by Arrow and the size of the tables kept by the
+    CheckpointService are recorded, along with the lines that allocated the
+    most memory. The same is recorded right after loading each of the largest
+    bundles. Tracing slows the run down, so services are only probed when
+    asked to.
+    """
+
+    # Amount of allocation sites listed per probe
+    top_count: int = 10
+    # Amount of largest bundles probed
+    bundle_count: int = 5
+    # Frames kept per traced allocation
+    frames: int = 1
+
+    def __init__(self) -> None:
+        """Initialize the MemoryService."""
+        self.logger = logging.getLogger("MemoryService")
+        self.lock = threading.Lock()
+        self.checkpoint_service: Optional[CheckpointService] = None
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.bundles: List[Tuple[int, str, Dict[str, Any]]] = []
+        self._started_tracing = False
+
+    def instrument(  # pylint: disable=protected-access
+        self, data_service: DataService
+    ) -> None:
+        """Install the bundle probe on a DataService and track its tables.
+
+        Args:
+            data_service: Service whose bundle scan and tables are probed.
+        """
+        game_service = data_service.game_service
+        game_service._load_bundle = self._wrap_load(game_service._load_bundle)
+        self.checkpoint_service = data_service.checkpoint_service
+
+    def start(self) -> None:
+        """Start tracing allocations and remove the probes of a previous run."""
+        with self.lock:
+            self.stages = {}
+            self.bundles = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        """Stop tracing allocations, unless tracing was already on."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Probe the memory used by a stage once it ends.
+
+        The traced peak includes the allocations of stages running at the same
+        time.
+
+        Args:
+            name: Name of the stage.
+
+        Yields:
+            None, the stage is probed when the block exits.
+        """
+        rss_before = current_rss_mb()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+        try:
+            yield
+        finally:
+            probe = {"rss_before_mb": rss_before, **self.probe()}
+            with self.lock:
+                self.stages[name] = probe
+            self.logger.info(
+                "Stage %s: %s MiB resident, %s MiB peak, %s MiB traced peak",
+                name,
+                probe["rss_mb"],
+                probe["peak_rss_mb"],
+                probe["traced_peak_mb"],
+            )
+
+    def probe(self) -> Dict[str, Any]:
+        """Measure the memory used by the process.
+
+        Returns:
+            Dictionary with the resident and traced memory, the memory held by
+            Arrow, the size of the checkpoint tables and the top allocation
+            sites.
+        """
+        traced, traced_peak = (
+            tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        )
+        tables = {}
+        if self.checkpoint_service is not None:
+            tables = {
+                stage: {
+                    category: round(table.nbytes / MEBIBYTE, 3)
+                    for category, table in stage_tables.items()
+                }
+                for stage, stage_tables in list(self.checkpoint_service.stages.items())
+            }
+
+        return {
+            "rss_mb": current_rss_mb(),
+            "peak_rss_mb": peak_rss_mb(),
+            "traced_mb": round(traced / MEBIBYTE, 1),
+            "traced_peak_mb": round(traced_peak / MEBIBYTE, 1),
+            "arrow_mb": round(pa.total_allocated_bytes() / MEBIBYTE, 1),
+            "tables_mb": tables,
+            "top_allocations": self._top_allocations(),
+        }
+
+    def _top_allocations(self) -> List[Dict[str, Any]]:
+        """List the lines holding the most traced memory.
+
+        Returns:
+            One entry per allocation site, largest first.
+        """
+        if not tracemalloc.is_tracing():
+            return []
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ]
+        )
+        return [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_mb": round(stat.size / MEBIBYTE, 3),
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[: self.top_count]
+        ]
+
+    def _wrap_load(self, method: Callable[[str], Any]) -> Callable[[str], Any]:
+        """Probe the memory after loading a bundle, if it is among the largest.
+
+        Args:
+            method: GameService._load_bundle.
+
+        Returns:
+            Wrapped method.
+        """
+
+        @functools.wraps(method)
+        def wrapper(path: str) -> Any:
+            env = method(path)
+
+            size = getsize(path)
+            with self.lock:
+                is_largest = (
+                    len(self.bundles) < self.bundle_count or size > self.bundles[0][0]
+                )
+            if is_largest:
+                probe = {
+                    "bundle": basename(path),
+                    "size_mb": round(size / MEBIBYTE, 3),
+                    **self.probe(),
+                }
+                with self.lock:
+                    entry = (size, probe["bundle"], probe)
+                    if len(self.bundles) < self.bundle_count:
+                        heapq.heappush(self.bundles, entry)
+                    else:
+                        heapq.heappushpop(self.bundles, entry)
+
+            return env
+
+        return wrapper
+
+    def report(self) -> Dict[str, Any]:
+        """Build the memory report.
+
+        Returns:
+            Dictionary with the probes of each stage and of the largest
+            bundles, and the peak resident memory of the process.
+        """
+        with self.lock:
+            return {
+                "peak_rss_mb": peak_rss_mb(),
+                "stages": dict(self.stages),
+                "bundles": [
+                    probe for _, _, probe in sorted(self.bundles, reverse=True)
+                ],
+            }
+
+    def log_report(self, report: Dict[str, Any]) -> None:
+        """Log a memory report.
+
+        Args:
+            report: Report returned by report.
+        """
+        self.logger.info("Peak resident memory: %s MiB", report["peak_rss_mb"])
+
+        self.logger.info("Largest bundles:")
+        for probe in report["bundles"]:
+            self.logger.info(
+                "  %8.3f MiB %s, %s MiB resident after loading",
+                probe["size_mb"],
+                probe["bundle"],
+                probe["rss_mb"],
+            )
+
+        for name, probe in report["stages"].items():
+            self.logger.info("Top allocations at the end of %s:", name)
+            for allocation in probe["top_allocations"]:
+                self.logger.info(
+                    "  %10.3f MiB %8d blocks %s",
+                    allocation["size_mb"],
+                    allocation["count"],
+                    allocation["site"],
+                )
@@ -0,0 +1,284 @@
+"""Service for collecting metrics about an ETL run."""
+
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from copy import deepcopy
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+Number = Union[int, float]
+
+
+class MetricsService:
+    """Service class for the metrics registry of a run.
+
+    Counters and timings can be updated from any thread. The registry state is
+    a plain dictionary, so registries filled in other processes can be merged
+    through their snapshots.
+
+    Running tasks, such as the workers of a stage, can also publish their
+    progress, which is left out of the run report and is polled with live by
+    views of the running stage.
+    """
+
+    # Amount of slowest labelled observations kept per timing
+    slowest_count: int = 10
+
+    def __init__(self) -> None:
+        """Initialize an empty MetricsService."""
+        self.logger = logging.getLogger("MetricsService")
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Number] = {}
+        self.timings: Dict[str, Dict[str, Number]] = {}
+        self.slowest: Dict[str, List[Tuple[float, str]]] = {}
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.sections: Dict[str, Any] = {}
+        self.progress: Dict[str, Dict[str, Any]] = {}
+        self.started = datetime.now().isoformat(timespec="seconds")
+
+    def reset(self) -> None:
+        """Remove all collected metrics."""
+        with self.lock:
+            self.counters = {}
+            self.timings = {}
+            self.slowest = {}
+            self.stages = {}
+            self.sections = {}
+            self.progress = {}
+            self.started = datetime.now().isoformat(timespec="seconds")
+
+    def increment(self, name: str, amount: Number = 1) -> None:
+        """Add an amount to a counter.
+
+        Args:
+            name: Name of the counter.
+            amount: Amount to add.
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float, label: Optional[str] = None) -> None:
+        """Add a duration to a timing.
+
+        Args:
+            name: Name of the timing.
+            seconds: Observed duration.
+            label: What was timed, kept if it is among the slowest observations.
+        """
+        with self.lock:
+            timing = self.timings.setdefault(
+                name, {"count": 0, "total": 0.0, "max": 0.0}
+            )
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+            if label is not None:
+                slowest = self.slowest.setdefault(name, [])
+                if len(slowest) < self.slowest_count:
+                    heapq.heappush(slowest, (seconds, label))
+                else:
+                    heapq.heappushpop(slowest, (seconds, label))
+
+    @contextmanager
+    def timer(self, name: str, label: Optional[str] = None) -> Iterator[None]:
+        """Time a block of code.
+
+        Args:
+            name: Name of the timing.
+            label: What is being timed.
+
+        Yields:
+            None, the duration is recorded when the block exits.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, label)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a stage and log the counters that changed while it ran.
+
+        Counters changed by stages running at the same time are included.
+
+        Args:
+            name: Name of the stage.
+
+        Yields:
+            None, the stage is recorded when the block exits.
+        """
+        with self.lock:
+            before = dict(self.counters)
+        start = time.perf_counter()
+        status = "failed"
+
+        try:
+            yield
+            status = "completed"
+        finally:
+            seconds = time.perf_counter() - start
+            with self.lock:
+                changed = {
+                    counter: value - before.get(counter, 0)
+                    for counter, value in self.counters.items()
+                    if value != before.get(counter, 0)
+                }
+                self.stages[name] = {
+                    "status": status,
+                    "seconds": round(seconds, 3),
+                    "counters": changed,
+                    "rates": {
+                        f"{counter}_per_second": round(value / seconds, 3)
+                        for counter, value in changed.items()
+                        if counter in ("bundles", "bytes_read") and seconds > 0
+                    },
+                }
+            self.logger.info(
+                "Stage %s %s in %.2fs %s", name, status, seconds, changed or ""
+            )
+
+    def skip_stage(self, name: str) -> None:
+        """Record a stage that was skipped.
+
+        Args:
+            name: Name of the stage.
+        """
+        with self.lock:
+            self.stages[name] = {"status": "skipped"}
+
+    def add_section(self, name: str, data: Any) -> None:
+        """Add a section to the run report, replacing any with the same name.
+
+        Args:
+            name: Name of the section.
+            data: JSON serializable content of the section.
+        """
+        with self.lock:
+            self.sections[name] = data
+
+    def set_progress(self, task: str, **values: Any) -> None:
+        """Update the progress of a running task.
+
+        The time of the update is kept as "updated", so views can tell stalled
+        tasks apart.
+
+        Args:
+            task: Name of the task.
+            **values: Values of the progress to replace.
+        """
+        with self.lock:
+            progress = self.progress.setdefault(task, {})
+            progress.update(deepcopy(values))
+            progress["updated"] = time.time()
+
+    def live(self) -> Dict[str, Any]:
+        """Get the counters and the progress of the running tasks.
+
+        Returns:
+            Dictionary with a copy of the "counters" and "progress" by task.
+        """
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "progress": deepcopy(self.progress),
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a copy of the collected metrics.
+
+        Returns:
+            Dictionary that can be passed to merge, also across processes.
+        """
+        with self.lock:
+            return deepcopy(
+                {
+                    "counters": self.counters,
+                    "timings": self.timings,
+                    "slowest": self.slowest,
+                    "stages": self.stages,
+                    "sections": self.sections,
+                }
+            )
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """Add the metrics of a snapshot to this registry.
+
+        Args:
+            snapshot: Metrics returned by snapshot.
+        """
+        for name, amount in snapshot["counters"].items():
+            self.increment(name, amount)
+
+        with self.lock:
+            for name, other in snapshot["timings"].items():
+                timing = self.timings.setdefault(
+                    name, {"count": 0, "total": 0.0, "max": 0.0}
+                )
+                timing["count"] += other["count"]
+                timing["total"] += other["total"]
+                timing["max"] = max(timing["max"], other["max"])
+            for name, observations in snapshot["slowest"].items():
+                self.slowest[name] = heapq.nlargest(
+                    self.slowest_count,
+                    self.slowest.get(name, []) + [tuple(o) for o in observations],
+                )
+                heapq.heapify(self.slowest[name])
+            self.stages.update(snapshot["stages"])
+            self.sections.update(snapshot.get("sections", {}))
+
+    def report(self) -> Dict[str, Any]:
+        """Build the run report.
+
+        Returns:
+            Dictionary with the stages, counters and timings of the run.
+        """
+        with self.lock:
+            timings = {
+                name: {
+                    "count": timing["count"],
+                    "total": round(timing["total"], 3),
+                    "mean": round(timing["total"] / timing["count"], 6),
+                    "max": round(timing["max"], 3),
+                    "slowest": [
+                        {"label": label, "seconds": round(seconds, 3)}
+                        for seconds, label in sorted(
+                            self.slowest.get(name, []), reverse=True
+                        )
+                    ],
+                }
+                for name, timing in self.timings.items()
+            }
+
+            return {
+                "started": self.started,
+                "finished": datetime.now().isoformat(timespec="seconds"),
+                "stages": deepcopy(self.stages),
+                "counters": dict(sorted(self.counters.items())),
+                "timings": timings,
+                **deepcopy(self.sections),
+            }
+
+    def write_report(self, path: str) -> None:
+        """Atomically write the run report as JSON.
+
+        Args:
+            path: Path of the report file.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+        os.replace(temp_path, path)
+        self.logger.info("Wrote run report to %s", path)
+
+
+# Registry shared by the services of a run
+METRICS = MetricsService()
@@ -0,0 +1,407 @@
+"""Service for running the ETL stages and resuming interrupted runs."""
+
+import logging
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join
+from queue import Queue
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from util import CONFIG, Install, Workspace
+
+from .bundle_cache_service import BundleCacheService
+from .data_service import DataService
+from .decode_service import DecodeService, crypto_key_path
+from .journal_service import JournalService
+from .memory_service import MemoryService
+from .metrics_service import METRICS
+from .profile_service import ProfileService
+
+CARD_DATA_PARTS = ("card_indx.bytes", "card_name.bytes", "card_desc.bytes")
+CARD_PROP_PART = "card_prop.bytes"
+DECODED_CARD_DATA = (
+    "card_name.bytes.dec.json",
+    "card_desc.bytes.dec.json",
+    "card_prop.bytes.Card_IDs.dec.json",
+)
+
+
+def default_report_path(install: Install, kind: str = "run") -> str:
+    """Get the path of a new report of an install, stamped with the time.
+
+    Reports are kept outside the workspace and the output directory, which
+    are cleared or replaced by every run, so runs can be compared later.
+
+    Args:
+        install: Install the report is about.
+        kind: Kind of report, added to its file name.
+
+    Returns:
+        Path of the report in the reports directory of the install.
+    """
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return join(CONFIG.reports_dir, install.name, f"{stamp}-{kind}.json")
+
+
+class Stage(NamedTuple):
+    """Step of the ETL process and the paths it reads and writes."""
+
+    name: str
+    message: str
+    run: Callable[..., Any]
+    inputs: List[str]
+    outputs: List[str]
+
+
+class PipelineService:
+    """Service class for running the ETL stages.
+
+    Stages form a graph through the paths they read and write, and each stage
+    is started as soon as the stages producing its inputs are done, so
+    independent stages run concurrently. The card data parts are reported as
+    they are extracted, so decoding starts while the bundles are still being
+    scanned. A part reported again, when a later bundle carries it too, is
+    only final once the scan finishes, and the stages that already read it
+    are run again then.
+
+    Every completed stage is recorded in the run journal of the workspace.
+    Unless forced, a stage is skipped when its inputs, outputs and parameters
+    match the journal, so a restarted run continues from the stage that
+    failed.
+    """
+
+    # Keyword arguments of the stages when not given, recorded in the journal
+    # like given ones, so runs started from the CLI and the GUI match
+    default_params: Dict[str, Dict[str, Any]] = {"clean_data": {"sort_fields": True}}
+
+    def __init__(
+        self,
+        data_service: Optional[DataService] = None,
+        decode_service: Optional[DecodeService] = None,
+        journal_service: Optional[JournalService] = None,
+        workspace: Optional[Workspace] = None,
+        report_path: Optional[str] = None,
+        profile: bool = False,
+        memory: bool = False,
+        install: Optional[Install] = None,
+        bundle_cache: Optional[BundleCacheService] = None,
+    ) -> None:
+        """Initialize the PipelineService.
+
+        Args:
+            data_service: Service running the data stages.
+            decode_service: Service decoding the card data.
+            journal_service: Journal the completed stages are recorded in.
+            workspace: Workspace holding the intermediate files, shared with
+                the services created by the pipeline. Defaults to the
+                workspace of the data service.
+            report_path: Path of the JSON run report written after each run.
+                Defaults to a new report per run, see default_report_path.
+            profile: Whether to profile the bundle scan, adding the slowest
+                bundles, categories and functions to the log and run report.
+            memory: Whether to probe the memory used by each stage and by the
+                largest bundles, adding it to the log and run report.
+            install: Install the data is extracted from, which must be the
+                install of the data service if one is given.
+            bundle_cache: Cache of bundles scanned by other installs, used by
+                the data service created by the pipeline.
+        """
+        self.logger = logging.getLogger("PipelineService")
+        if workspace is None:
+            workspace = data_service.workspace if data_service else Workspace()
+        self.workspace = workspace
+        self.install = install or CONFIG.installs[0]
+        self.data_service = data_service or DataService(
+            workspace, self.install, bundle_cache
+        )
+        self.decode_service = decode_service or DecodeService(
+            workspace, crypto_key_path(self.install)
+        )
+        self.journal_service = journal_service or JournalService(
+            workspace.path("journal.json")
+        )
+        self.report_path = report_path
+        self.profile_service: Optional[ProfileService] = None
+        if profile:
+            self.profile_service = ProfileService()
+            self.profile_service.instrument(self.data_service)
+        self.memory_service: Optional[MemoryService] = None
+        if memory:
+            self.memory_service = MemoryService()
+            self.memory_service.instrument(self.data_service)
+
+        card_data_parts = [
+            workspace.path(part) for part in CARD_DATA_PARTS + (CARD_PROP_PART,)
+        ]
+        decoded_card_data = [workspace.path(part) for part in DECODED_CARD_DATA]
+
+        self.stages: Dict[str, Stage] = {
+            stage.name: stage
+            for stage in [
+                Stage(
+                    "get_ids",
+                    "Getting ids...",
+                    self.data_service.get_ids,
+                    [self.install.game_path, self.install.streaming_path],
+                    [workspace.path("ids")] + card_data_parts,
+                ),
+                Stage(
+                    "get_unity3d_ids",
+                    "Getting card icons...",
+                    self.data_service.get_unity3d_ids,
+                    [self.install.unity3d_path],
+                    [workspace.path("unity3d_ids")],
+                ),
+                Stage(
+                    "decode_card_data",
+                    "Decoding card data...",
+                    self.decode_card_data,
+                    card_data_parts,
+                    decoded_card_data,
+                ),
+                Stage(
+                    "get_card_data",
+                    "Getting card names...",
+                    self.data_service.get_card_data,
+                    [workspace.path("ids"), workspace.path("unity3d_ids")]
+                    + decoded_card_data,
+                    [workspace.path("data_dirty")],
+                ),
+                Stage(
+                    "clean_data",
+                    "Cleaning data...",
+                    self.data_service.clean_data,
+                    # The field orientation answers given so far are kept in
+                    # the field store, which is also updated while sorting
+                    [workspace.path("data_dirty"), CONFIG.field_store],
+                    [workspace.path("data"), CONFIG.field_store],
+                ),
+                Stage(
+                    "write_data",
+                    "Writing data...",
+                    self.data_service.write_data,
+                    [workspace.path("data")],
+                    [self.install.output_dir],
+                ),
+            ]
+        }
+
+    def decode_card_data(self) -> None:
+        """Decode card data by decrypting description index names and IDs."""
+        self.decode_service.decrypt_desc_indx_name()
+        self.decode_service.decrypt_ids()
+
+    def run_stage(self, name: str, force: bool = False, **params: Any) -> bool:
+        """Run a stage unless it already completed with the same inputs.
+
+        Args:
+            name: Name of the stage.
+            force: Whether to run the stage even if it already completed.
+            **params: Keyword arguments passed to the stage, which are also
+                recorded in the journal, see default_params.
+
+        Returns:
+            True if the stage was run, False if it was skipped.
+
+        Raises:
+            KeyError: If there is no stage with the given name.
+        """
+        stage = self.stages[name]
+        params = {**self.default_params.get(name, {}), **params}
+
+        if not force and self.journal_service.is_complete(
+            stage.name, stage.inputs, stage.outputs, params
+        ):
+            self.logger.info("Skipping %s, already completed", stage.name)
+            METRICS.skip_stage(stage.name)
+            return False
+
+        self.logger.info(stage.message)
+        inputs_fingerprint = self.journal_service.fingerprint(stage.inputs)
+        memory_probe = (
+            nullcontext()
+            if self.memory_service is None
+            else self.memory_service.stage(stage.name)
+        )
+        with METRICS.stage(stage.name), memory_probe:
+            stage.run(**params)
+        if set(stage.inputs) & set(stage.outputs):
+            # The stage updated some of its inputs, which are recorded as written
+            inputs_fingerprint = self.journal_service.fingerprint(stage.inputs)
+        self.journal_service.record(
+            stage.name, inputs_fingerprint, stage.outputs, params
+        )
+        self.logger.info("Finished %s", stage.name)
+        return True
+
+    def run(
+        self,
+        names: Iterable[str],
+        force: bool = False,
+        params: Optional[Dict[str, Dict[str, Any]]] = None,
+        metrics: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, bool]:
+        """Run stages concurrently, each once the stages it depends on are done.
+
+        Only dependencies between the given stages are considered, the inputs
+        of the others are expected to exist from a previous run. If a stage
+        fails, no further stages are started and the error is raised once the
+        running ones finish. The metrics of the run are written to the run
+        report either way.
+
+        Args:
+            names: Names of the stages to run.
+            force: Whether to run the stages even if they already completed.
+            params: Dictionary mapping stage names to their keyword arguments.
+            metrics: Snapshot of the metrics of stages run before, such as in
+                another process, which are added to the run report.
+
+        Returns:
+            Dictionary mapping each stage name to whether it was run or skipped.
+
+        Raises:
+            KeyError: If there is no stage with one of the given names.
+            ValueError: If the stages depend on each other in a cycle.
+        """
+        selected = set(names)
+        stages = [self.stages[name] for name in self.stages if name in selected]
+        if len(stages) != len(selected):
+            raise KeyError(f"Unknown stages: {sorted(selected - set(self.stages))}")
+        params = params or {}
+        report_path = self.report_path or default_report_path(self.install)
+
+        producers = {path: stage.name for stage in stages for path in stage.outputs}
+        dependencies = {
+            stage.name: {
+                path
+                for path in stage.inputs
+                if producers.get(path, stage.name) != stage.name
+            }
+            for stage in stages
+        }
+        pending = dict(dependencies)
+        available: Set[str] = set()
+        running: Set[str] = set()
+        started: Set[str] = set()
+        # Paths reported as extracted, and the stages to run again because
+        # they read a path that was extracted again since
+        extracted: Set[str] = set()
+        stale: Set[str] = set()
+        results: Dict[str, bool] = {}
+        errors: List[Exception] = []
+        events: "Queue[Tuple[str, str, Optional[Exception]]]" = Queue()
+
+        METRICS.reset()
+        if metrics is not None:
+            METRICS.merge(metrics)
+        if self.memory_service is not None:
+            self.memory_service.start()
+        self.data_service.on_extracted = lambda path: events.put(
+            ("extracted", path, None)
+        )
+        try:
+            with ThreadPoolExecutor(max_workers=max(len(stages), 1)) as executor:
+                while pending or running:
+                    if not errors:
+                        for name in [
+                            name
+                            for name, inputs in pending.items()
+                            if inputs <= available
+                        ]:
+                            del pending[name]
+                            running.add(name)
+                            executor.submit(
+                                self._run_queued,
+                                name,
+                                force or name in started,
+                                params.get(name, {}),
+                                results,
+                                events,
+                            )
+                            started.add(name)
+
+                    if not running:
+                        if errors:
+                            break
+                        raise ValueError(
+                            f"Stages {sorted(pending)} depend on each other"
+                        )
+
+                    kind, value, error = events.get()
+                    if kind == "extracted":
+                        if value not in extracted:
+                            extracted.add(value)
+                            available.add(value)
+                        else:
+                            # Wait for the producer to finish, as it may be
+                            # extracted yet again
+                            available.discard(value)
+                            for name in started:
+                                if value not in self.stages[name].inputs:
+                                    continue
+                                available.difference_update(self.stages[name].outputs)
+                                if name in running:
+                                    stale.add(name)
+                                else:
+                                    pending[name] = dependencies[name]
+                    else:
+                        running.discard(value)
+                        if value in stale:
+                            # Errors reading a part being replaced are expected
+                            stale.discard(value)
+                            pending[value] = dependencies[value]
+                        elif error is None:
+                            available.update(self.stages[value].outputs)
+                        else:
+                            errors.append(error)
+        finally:
+            self.data_service.on_extracted = None
+            if self.profile_service is not None:
+                profile = self.profile_service.report()
+                self.profile_service.log_report(profile)
+                METRICS.add_section("profile", profile)
+            if self.memory_service is not None:
+                memory = self.memory_service.report()
+                self.memory_service.stop()
+                self.memory_service.log_report(memory)
+                METRICS.add_section("memory", memory)
+            METRICS.write_report(report_path)
+            self.logger.info("Run report written to %s", report_path)
+
+        if errors:
+            raise errors[0]
+        return results
+
+    def _run_queued(
+        self,
+        name: str,
+        force: bool,
+        params: Dict[str, Any],
+        results: Dict[str, bool],
+        events: "Queue[Tuple[str, str, Optional[Exception]]]",
+    ) -> None:
+        """Run a stage and report its completion to the run loop.
+
+        Args:
+            name: Name of the stage.
+            force: Whether to run the stage even if it already completed.
+            params: Keyword arguments passed to the stage.
+            results: Dictionary the stage result is stored in.
+            events: Queue the completion, or the error raised, is put in.
+        """
+        try:
+            results[name] = self.run_stage(name, force, **params)
+            events.put(("finished", name, None))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            events.put(("finished", name, error))
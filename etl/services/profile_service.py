@@ -0,0 +1,222 @@
+"""Service for profiling the scan of the game files."""
+
+import cProfile
+import functools
+import logging
+import pstats
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .data_service import DataService
+from .metrics_service import METRICS
+
+# Bundle parsers of GameService, named after the category they extract
+PARSERS = (
+    "card",
+    "icon",
+    "sleeve",
+    "deck_box",
+    "field",
+    "wallpaper",
+    "card_data_part",
+    "coin",
+    "face",
+)
+
+
+class ProfileService:
+    """Service class for profiling the bundle scan of a DataService.
+
+    Profiling hooks are only installed on the instrumented services, so runs
+    without profiling are not slowed down. Bundle loading and every parser
+    call are timed per category and per bundle, and each scan thread is run
+    under cProfile to find the functions taking the most time.
+    """
+
+    # Amount of bundles, categories and functions listed in the report
+    top_count: int = 20
+
+    def __init__(self) -> None:
+        """Initialize the ProfileService."""
+        self.logger = logging.getLogger("ProfileService")
+        self.lock = threading.Lock()
+        self.stats: Optional[pstats.Stats] = None
+        # Bundle each scan thread is parsing
+        self._local = threading.local()
+
+    def instrument(  # pylint: disable=protected-access
+        self, data_service: DataService
+    ) -> None:
+        """Install the profiling hooks on a DataService and its GameService.
+
+        Args:
+            data_service: Service whose bundle scan is profiled.
+        """
+        game_service = data_service.game_service
+
+        game_service._parse_bundle = self._wrap_bundle(game_service._parse_bundle)
+        game_service._load_bundle = self._wrap_timer("load", game_service._load_bundle)
+        for parser in PARSERS:
+            method = getattr(game_service, f"_parse_{parser}")
+            setattr(
+                game_service,
+                f"_parse_{parser}",
+                self._wrap_timer(f"parse.{parser}", method),
+            )
+
+        data_service.process_dirs = self._wrap_profile(data_service.process_dirs)
+
+    def _wrap_bundle(self, method: Callable[..., Any]) -> Callable[..., Any]:
+        """Remember the bundle being parsed by the current thread.
+
+        Args:
+            method: GameService._parse_bundle.
+
+        Returns:
+            Wrapped method.
+        """
+
+        @functools.wraps(method)
+        def wrapper(path: str, bundle: str, *args: Any, **kwargs: Any) -> Any:
+            self._local.bundle = bundle
+            try:
+                return method(path, bundle, *args, **kwargs)
+            finally:
+                self._local.bundle = None
+
+        return wrapper
+
+    def _wrap_timer(self, name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        """Time every call of a method, labelled with the current bundle.
+
+        Args:
+            name: Name of the timing.
+            method: Method to time.
+
+        Returns:
+            Wrapped method.
+        """
+
+        @functools.wraps(method)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                METRICS.observe(
+                    name,
+                    time.perf_counter() - start,
+                    getattr(self._local, "bundle", None),
+                )
+
+        return wrapper
+
+    def _wrap_profile(self, method: Callable[..., Any]) -> Callable[..., Any]:
+        """Run every call of a method under cProfile and collect the stats.
+
+        Args:
+            method: Method to profile, run on its own thread.
+
+        Returns:
+            Wrapped method.
+        """
+
+        @functools.wraps(method)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ only allows one active cProfile at a time
+                return method(*args, **kwargs)
+
+            try:
+                return method(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self.lock:
+                    if self.stats is None:
+                        self.stats = pstats.Stats(profile)
+                    else:
+                        self.stats.add(profile)
+
+        return wrapper
+
+    def report(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Build the profile report.
+
+        Returns:
+            Dictionary with the slowest bundles, the time spent per category
+            and the functions with the highest own time.
+        """
+        metrics = METRICS.report()["timings"]
+        categories = sorted(
+            (
+                {"category": name.split(".", 1)[1], **timing}
+                for name, timing in metrics.items()
+                if name.startswith("parse.")
+            ),
+            key=lambda timing: timing["total"],
+            reverse=True,
+        )
+
+        functions = []
+        with self.lock:
+            if self.stats is not None:
+                entries = sorted(
+                    self.stats.stats.items(),  # pylint: disable=no-member
+                    key=lambda entry: entry[1][2],
+                    reverse=True,
+                )
+                functions = [
+                    {
+                        "function": f"{file_name}:{line}({function})",
+                        "calls": calls,
+                        "own_seconds": round(own_time, 3),
+                        "cumulative_seconds": round(cumulative_time, 3),
+                    }
+                    for (file_name, line, function), (
+                        _,
+                        calls,
+                        own_time,
+                        cumulative_time,
+                        _,
+                    ) in entries[: self.top_count]
+                ]
+
+        return {
+            "bundles": metrics.get("bundle", {}).get("slowest", [])[: self.top_count],
+            "load": [metrics["load"]] if "load" in metrics else [],
+            "categories": categories[: self.top_count],
+            "functions": functions,
+        }
+
+    def log_report(self, report: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Log a profile report.
+
+        Args:
+            report: Report returned by report.
+        """
+        self.logger.info("Slowest bundles:")
+        for entry in report["bundles"]:
+            self.logger.info("  %8.3fs %s", entry["seconds"], entry["label"])
+
+        self.logger.info("Time per category:")
+        for entry in report["load"] + report["categories"]:
+            self.logger.info(
+                "  %8.3fs %6d calls %s",
+                entry["total"],
+                entry["count"],
+                entry.get("category", "load"),
+            )
+
+        self.logger.info("Hottest functions:")
+        for entry in report["functions"]:
+            self.logger.info(
+                "  %8.3fs own %8.3fs cumulative %8d calls %s",
+                entry["own_seconds"],
+                entry["cumulative_seconds"],
+                entry["calls"],
+                entry["function"],
+            )
@@ -0,0 +1,159 @@
+"""Service for streaming the records extracted from the game files to disk."""
+
+import logging
+import os
+import shutil
+from os.path import isdir, join
+from typing import Any, Dict, List, Tuple
+
+import pyarrow as pa
+
+from tables import RECORD_SCHEMAS, records_to_tables
+from util import TEMP_PATH
+
+from .metrics_service import METRICS
+
+
+class RecordSink:
+    """Sink for the records emitted by one producer.
+
+    Records are buffered per category and written as Arrow record batches
+    once a buffer is full, so the memory used by a producer is bounded by the
+    batch size instead of by the amount of bundles it scans.
+    """
+
+    def __init__(self, directory: str, part: int, batch_size: int) -> None:
+        """Initialize the RecordSink.
+
+        Args:
+            directory: Directory holding one subdirectory of files per category.
+            part: Index of the producer, used to order the files of all
+                producers.
+            batch_size: Number of records of a category written per batch.
+        """
+        self.directory = directory
+        self.part = part
+        self.batch_size = batch_size
+        self.buffers: Dict[str, List[Tuple[Any, ...]]] = {
+            category: [] for category in RECORD_SCHEMAS
+        }
+        self.counts: Dict[str, int] = dict.fromkeys(RECORD_SCHEMAS, 0)
+        self.files: Dict[str, pa.NativeFile] = {}
+        self.writers: Dict[str, pa.ipc.RecordBatchFileWriter] = {}
+
+    def emit(self, category: str, *values: Any) -> None:
+        """Add a record to a category.
+
+        Args:
+            category: Category of the record.
+            *values: Values of the record, in the order of the category schema.
+        """
+        buffer = self.buffers[category]
+        buffer.append(values)
+        self.counts[category] += 1
+        if len(buffer) >= self.batch_size:
+            self.flush(category)
+
+    def flush(self, category: str) -> None:
+        """Write the buffered records of a category as a record batch.
+
+        Args:
+            category: Category to flush.
+        """
+        rows = self.buffers[category]
+        if not rows:
+            return
+
+        schema = RECORD_SCHEMAS[category]
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(column, field.type) for column, field in zip(zip(*rows), schema)],
+            schema=schema,
+        )
+
+        if category not in self.writers:
+            category_dir = join(self.directory, category)
+            os.makedirs(category_dir, exist_ok=True)
+            self.files[category] = pa.OSFile(
+                join(category_dir, f"{self.part:05d}.arrow"), "wb"
+            )
+            self.writers[category] = pa.ipc.new_file(self.files[category], schema)
+
+        self.writers[category].write_batch(batch)
+        rows.clear()
+
+    def close(self) -> None:
+        """Flush all buffered records, close the files and count the records."""
+        for category in self.buffers:
+            self.flush(category)
+            if self.counts[category]:
+                METRICS.increment(f"records.{category}", self.counts[category])
+                self.counts[category] = 0
+        for category, writer in self.writers.items():
+            writer.close()
+            self.files[category].close()
+        self.writers.clear()
+        self.files.clear()
+
+    def __enter__(self) -> "RecordSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class SinkService:
+    """Service class for the records extracted by the bundle scan.
+
+    Each producer writes to its own RecordSink, so no locking is needed, and
+    the records of all producers are read back in producer order once the
+    scan is done.
+    """
+
+    batch_size: int = 4096
+
+    def __init__(self, directory: str = join(TEMP_PATH, "records")) -> None:
+        """Initialize the SinkService.
+
+        Args:
+            directory: Directory where the record files are written.
+        """
+        self.logger = logging.getLogger("SinkService")
+        self.directory = directory
+
+    def reset(self) -> None:
+        """Remove the records of a previous scan."""
+        if isdir(self.directory):
+            shutil.rmtree(self.directory)
+        os.makedirs(self.directory)
+
+    def open(self, part: int) -> RecordSink:
+        """Open a sink for a producer.
+
+        Args:
+            part: Index of the producer. Records of lower indexes are
+                considered to be found first.
+
+        Returns:
+            Sink the producer emits its records to.
+        """
+        return RecordSink(self.directory, part, self.batch_size)
+
+    def collect(self) -> Dict[str, pa.Table]:
+        """Read the records of all producers and reduce them per category.
+
+        Returns:
+            Dictionary mapping each category to its table, in the schemas of
+            ID_SCHEMAS.
+        """
+        records = {}
+        for category, schema in RECORD_SCHEMAS.items():
+            category_dir = join(self.directory, category)
+            tables = [schema.empty_table()]
+            if isdir(category_dir):
+                for entry in sorted(os.listdir(category_dir)):
+                    with pa.memory_map(join(category_dir, entry), "r") as source:
+                        tables.append(pa.ipc.open_file(source).read_all())
+            records[category] = pa.concat_tables(tables)
+            self.logger.info("%d %s records", records[category].num_rows, category)
+
+        return records_to_tables(records)
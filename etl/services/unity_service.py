@@ -2,17 +2,31 @@
 
 import re
 from os.path import join
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List, Optional
 
-from PIL import Image
-from UnityPy import load as unity_load
+from util import CONFIG, Install
 
-from util import GAME_PATH, STREAMING_PATH
+if TYPE_CHECKING:
+    from PIL import Image
 
 
 class UnityService:
     """Service class for handling Unity asset operations."""
 
+    def __init__(self, install: Optional[Install] = None) -> None:
+        """Initialize the UnityService.
+
+        Args:
+            install: Install the asset bundles are read from.
+        """
+        self.install = install or CONFIG.installs[0]
+
+        # UnityPy takes a while to import, so it is only imported once a
+        # service reading bundles is created
+        from UnityPy import load  # pylint: disable=import-outside-toplevel
+
+        self.load_environment = load
+
     def prepare_environment(self, miss: bool, bundle: str) -> str:
         """Prepare the UnityPy environment path for a given bundle.
 
@@ -25,12 +39,12 @@ class UnityService:
         """
         return (
             join(
-                STREAMING_PATH,
+                self.install.streaming_path,
                 bundle[:2],
                 bundle,
             )
             if miss
-            else join(GAME_PATH, bundle[:2], bundle)
+            else join(self.install.game_path, bundle[:2], bundle)
         )
 
     def prepare_unity3d_environment(self) -> str:
@@ -39,23 +53,28 @@ class UnityService:
         Returns:
             Path to the Unity3D data file.
         """
-        return join(GAME_PATH[:-23], "masterduel_Data", "data.unity3d")
+        return self.install.unity3d_path
 
     def fetch_image(
-        self, bundle: str, img_type: str, miss: bool = False
-    ) -> Image.Image:
+        self,
+        bundle: str,
+        img_type: str,
+        miss: bool = False,
+        max_size: Optional[int] = None,
+    ) -> "Image.Image":
         """Fetch an image from a Unity asset bundle.
 
         Args:
             bundle: Name of the asset bundle.
             type: Type of image to fetch.
             miss: Whether a previous fetch attempt failed.
+            max_size: If set, downscale the image so neither side exceeds it.
 
         Returns:
             PIL Image object representing the fetched image.
         """
         env_path = self.prepare_environment(miss, bundle)
-        env = unity_load(env_path)
+        env = self.load_environment(env_path)
 
         found: bool = False
 
@@ -77,11 +96,18 @@ class UnityService:
 
                 if found:
                     img = data.image
+                    if max_size is not None:
+                        # Reducing by an integer factor first is much cheaper
+                        # than resampling the full resolution texture
+                        factor = max(img.width, img.height) // max_size
+                        if factor > 1:
+                            img = img.reduce(factor)
+                        img.thumbnail((max_size, max_size))
                     img.convert("RGB")
                     img.name = "image.jpg"
                     return img
 
-        return self.fetch_image(bundle, True)
+        return self.fetch_image(bundle, img_type, True, max_size)
 
     def sort_sprite_list(self, sprite_list: List[str]) -> Dict[str, str]:
         """Sort a list of sprites by image size.
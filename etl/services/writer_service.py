@@ -0,0 +1,302 @@
+"""Service for writing the output Parquet files."""
+
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from os.path import isdir, isfile, join
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tables import (
+    CHANGELOG_SCHEMA,
+    DERIVED_TABLES,
+    OUTPUT_BUNDLE_COLUMNS,
+    OUTPUT_KEYS,
+    OUTPUT_SCHEMAS,
+    OUTPUT_SORT_KEYS,
+)
+from util import CONFIG, DATA_PATH
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+
+class WriterService:
+    """Service class for publishing the output tables.
+
+    All tables are written concurrently into a staging directory next to the
+    output directory, which then replaces the output directory as a whole, so
+    an interrupted write never leaves a partially updated dataset behind.
+
+    Tables are sorted by their lookup keys and written with small row groups,
+    statistics, page indexes and Bloom filters on the name and bundle columns,
+    so readers can skip most of a file when filtering on those columns.
+
+    Files whose rows did not change are left untouched, and the rows that
+    were added, removed, rebundled or otherwise changed are listed in
+    changelog.parquet.
+    """
+
+    compression: str = "zstd"
+    compression_level: int = 9
+    row_group_size: int = 4096
+    bloom_filter_columns: Tuple[str, ...] = ("name", "bundle")
+    bloom_filter_fpp: float = 0.01
+
+    def __init__(self, output_dir: str = DATA_PATH) -> None:
+        """Initialize the WriterService.
+
+        Args:
+            output_dir: Directory the tables are published to.
+        """
+        self.logger = logging.getLogger("WriterService")
+        self.output_dir = os.path.normpath(output_dir)
+        self.staging_dir = f"{self.output_dir}.staging"
+        self.previous_dir = f"{self.output_dir}.previous"
+
+    def write(self, tables: Dict[str, pa.Table], version: str) -> bool:
+        """Write and publish the output tables.
+
+        Tables whose rows are identical to the published ones are not
+        rewritten. If no row of any table changed, nothing is published and
+        the version is kept.
+
+        Args:
+            tables: Dictionary mapping each output file name, without
+                extension, to its table.
+            version: Content of the version.txt file.
+
+        Returns:
+            True if a new version was published.
+
+        Raises:
+            KeyError: If a table has no declared output schema.
+        """
+        self._recover()
+
+        if isdir(self.staging_dir):
+            shutil.rmtree(self.staging_dir)
+        os.makedirs(self.staging_dir)
+
+        new_tables = [
+            name
+            for name in tables
+            if not isfile(join(self.output_dir, f"{name}.parquet"))
+        ]
+        with ThreadPoolExecutor(max_workers=CONFIG.num_threads) as executor:
+            changes = [
+                change
+                for change in executor.map(self._write_table, tables.items())
+                if change is not None
+            ]
+
+        if not new_tables and not any(change.num_rows for change in changes):
+            self.logger.info("No table changed, keeping the published version")
+            shutil.rmtree(self.staging_dir)
+            return False
+
+        changelog = pa.concat_tables(changes)
+        changelog = changelog.append_column(
+            "version", pa.array([version] * changelog.num_rows, pa.string())
+        )
+        pq.write_table(
+            changelog.select(CHANGELOG_SCHEMA.names).cast(CHANGELOG_SCHEMA),
+            join(self.staging_dir, "changelog.parquet"),
+            compression=self.compression,
+        )
+        self.logger.info("%d rows changed", changelog.num_rows)
+
+        with open(join(self.staging_dir, "version.txt"), "w", encoding="utf-8") as f:
+            f.write(version)
+
+        self._publish()
+        return True
+
+    def _write_table(self, item: Tuple[str, pa.Table]) -> Optional[pa.Table]:
+        """Cast a table to its declared schema and write it to the staging directory.
+
+        The table is only written if its rows differ from the published
+        ones. Tables derived from others are written whenever their file
+        differs, as their rows are not compared.
+
+        Args:
+            item: Output file name, without extension, and its table.
+
+        Returns:
+            The changed rows compared to the published table, or None if the
+            table was not written.
+        """
+        name, table = item
+        schema = OUTPUT_SCHEMAS[name]
+        sort_order = [(key, "ascending") for key in OUTPUT_SORT_KEYS[name]]
+        table = table.select(schema.names).cast(schema).sort_by(sort_order)
+
+        buffer = pa.BufferOutputStream()
+        pq.write_table(
+            table,
+            buffer,
+            row_group_size=self.row_group_size,
+            compression=self.compression,
+            compression_level=self.compression_level,
+            use_dictionary=True,
+            write_statistics=True,
+            write_page_index=True,
+            sorting_columns=pq.SortingColumn.from_ordering(schema, sort_order),
+            bloom_filter_options={
+                column: {"ndv": max(table.num_rows, 1), "fpp": self.bloom_filter_fpp}
+                for column in self.bloom_filter_columns
+                if column in schema.names
+            },
+        )
+        content = buffer.getvalue().to_pybytes()
+
+        published_path = join(self.output_dir, f"{name}.parquet")
+        previous = None
+        if isfile(published_path):
+            with open(published_path, "rb") as f:
+                if f.read() == content:
+                    self.logger.info("%s unchanged", name)
+                    return None
+            previous = pq.read_table(published_path)
+
+        changes = self._diff(name, previous, table)
+        if previous is not None and not changes.num_rows and name not in DERIVED_TABLES:
+            # Such as a file written with different writer settings
+            self.logger.info("%s rows unchanged", name)
+            return None
+
+        with open(join(self.staging_dir, f"{name}.parquet"), "wb") as f:
+            f.write(content)
+        self.logger.info("Wrote %s", name)
+
+        return changes
+
+    def _diff(
+        self, name: str, previous: Optional[pa.Table], current: pa.Table
+    ) -> pa.Table:
+        """Compare the rows of a table with its published version.
+
+        Rows are matched by the table key and compared by a hash of all their
+        values, and by a hash of their bundle columns to tell rebundled rows
+        from otherwise changed ones.
+
+        Args:
+            name: Output file name, without extension.
+            previous: Published table, or None if there is none.
+            current: Table being written.
+
+        Returns:
+            Table with the table name, change type and key of each added,
+            removed, rebundled or changed row, empty for tables derived from
+            others.
+        """
+        if name in DERIVED_TABLES:
+            return pa.Table.from_pydict(
+                {
+                    column: pa.array([], pa.string())
+                    for column in ("table", "change", "key")
+                }
+            )
+
+        key = OUTPUT_KEYS[name]
+        current_hashes = self._row_hashes(name, current, key)
+
+        if previous is None or key not in previous.column_names:
+            previous_hashes = current_hashes.iloc[0:0]
+        else:
+            previous_hashes = self._row_hashes(name, previous, key)
+
+        merged = previous_hashes.merge(
+            current_hashes,
+            on="key",
+            how="outer",
+            suffixes=("_previous", "_current"),
+            indicator=True,
+        )
+        change = np.select(
+            [
+                merged["_merge"] == "left_only",
+                merged["_merge"] == "right_only",
+                merged["bundle_hash_previous"] != merged["bundle_hash_current"],
+                merged["hash_previous"] != merged["hash_current"],
+            ],
+            ["removed", "added", "rebundled", "changed"],
+            "",
+        )
+        changed = merged[change != ""]
+
+        return pa.Table.from_pydict(
+            {
+                "table": pa.array([name] * len(changed), pa.string()),
+                "change": pa.array(change[change != ""].tolist(), pa.string()),
+                "key": pa.array(changed["key"].tolist(), pa.string()),
+            }
+        )
+
+    def _row_hashes(self, name: str, table: pa.Table, key: str) -> "DataFrame":
+        """Hash the values of every row of a table.
+
+        Args:
+            name: Output file name, without extension.
+            table: Table to hash.
+            key: Column identifying each row.
+
+        Returns:
+            DataFrame with the unique key, row hash and bundle columns hash
+            of the rows of the table.
+        """
+        # pylint: disable=import-outside-toplevel
+        from pandas import DataFrame
+        from pandas.util import hash_pandas_object
+
+        frame = table.to_pandas()
+        bundle_columns = [
+            column
+            for column in OUTPUT_BUNDLE_COLUMNS.get(name, ())
+            if column in frame.columns
+        ]
+        return DataFrame(
+            {
+                "key": frame[key].astype(str),
+                "hash": hash_pandas_object(frame, index=False).to_numpy(),
+                "bundle_hash": (
+                    hash_pandas_object(frame[bundle_columns], index=False).to_numpy()
+                    if bundle_columns
+                    else 0
+                ),
+            }
+        ).drop_duplicates()
+
+    def _publish(self) -> None:
+        """Replace the output directory with the staging directory."""
+        if isdir(self.output_dir):
+            # Keep files that are not produced by the pipeline
+            for entry in os.listdir(self.output_dir):
+                staged_path = join(self.staging_dir, entry)
+                # Decoded table caches, which are no longer kept in the output
+                if os.path.exists(staged_path) or entry.endswith(".arrow"):
+                    continue
+                if isdir(join(self.output_dir, entry)):
+                    # Such as the output directories of other installs
+                    shutil.copytree(join(self.output_dir, entry), staged_path)
+                else:
+                    shutil.copy2(join(self.output_dir, entry), staged_path)
+
+            os.rename(self.output_dir, self.previous_dir)
+
+        os.rename(self.staging_dir, self.output_dir)
+
+        if isdir(self.previous_dir):
+            shutil.rmtree(self.previous_dir)
+
+    def _recover(self) -> None:
+        """Restore the previous output if a publish was interrupted midway."""
+        if not isdir(self.output_dir) and isdir(self.previous_dir):
+            self.logger.warning("Restoring output from interrupted publish")
+            os.rename(self.previous_dir, self.output_dir)
+        elif isdir(self.previous_dir):
+            shutil.rmtree(self.previous_dir)
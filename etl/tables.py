@@ -0,0 +1,400 @@
+"""Typed Arrow tables used to pass data between the ETL stages."""
+
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+DECK_BOX_SIZES = (
+    "small",
+    "medium",
+    "o_medium",
+    "r_medium",
+    "large",
+    "o_large",
+    "r_large",
+)
+ICON_SIZES = ("large", "medium", "small")
+WALLPAPER_PARTS = ("front", "back", "icon")
+
+# One schema per category of the scanned ids, keyed like the ETL outputs
+ID_SCHEMAS: Dict[str, pa.Schema] = {
+    "card_id": pa.schema([("name", pa.string()), ("bundle", pa.string())]),
+    "sleeve": pa.schema([("bundle", pa.string())]),
+    "icon": pa.schema([("name", pa.string()), ("bundles", pa.list_(pa.string()))]),
+    # Textures that could not be matched to a size are kept in "unknown"
+    "deck_box": pa.schema(
+        [(size, pa.string()) for size in DECK_BOX_SIZES]
+        + [("name", pa.string()), ("unknown", pa.string())]
+    ),
+    "field": pa.schema([("bundle", pa.string())]),
+    "wallpaper": pa.schema(
+        [(part, pa.string()) for part in WALLPAPER_PARTS] + [("name", pa.string())]
+    ),
+    "card_data": pa.schema([("bundle", pa.string()), ("name", pa.string())]),
+    "face": pa.schema(
+        [("name", pa.string()), ("key", pa.int64()), ("bundle", pa.string())]
+    ),
+    "coin": pa.schema([("bundle", pa.string())]),
+    "card_icon": pa.schema(
+        [
+            ("name", pa.string()),
+            ("x", pa.float64()),
+            ("y", pa.float64()),
+            ("width", pa.float64()),
+            ("height", pa.float64()),
+        ]
+    ),
+}
+
+# One row per record emitted by the bundle parsers, in the order they were found
+RECORD_SCHEMAS: Dict[str, pa.Schema] = {
+    "card_id": ID_SCHEMAS["card_id"],
+    "sleeve": ID_SCHEMAS["sleeve"],
+    "icon": pa.schema([("name", pa.string()), ("bundle", pa.string())]),
+    # Sizes that could not be determined are recorded as ""
+    "deck_box": pa.schema(
+        [("name", pa.string()), ("size", pa.string()), ("bundle", pa.string())]
+    ),
+    "field": ID_SCHEMAS["field"],
+    # Textures that are not a wallpaper part are recorded with a null part
+    "wallpaper": pa.schema(
+        [("name", pa.string()), ("part", pa.string()), ("bundle", pa.string())]
+    ),
+    "card_data": pa.schema([("name", pa.string()), ("bundle", pa.string())]),
+    "face": ID_SCHEMAS["face"],
+    "coin": ID_SCHEMAS["coin"],
+    "card_icon": ID_SCHEMAS["card_icon"],
+}
+
+CARD_NAMES_SCHEMA = pa.schema(
+    [
+        ("data_index", pa.int64()),
+        ("description", pa.string()),
+        ("bundle", pa.string()),
+        ("name", pa.string()),
+    ]
+)
+
+# Categories whose shape changes once the data is cleaned
+CLEAN_SCHEMAS: Dict[str, pa.Schema] = {
+    "icon": pa.schema(
+        [("name", pa.string())] + [(size, pa.string()) for size in ICON_SIZES]
+    ),
+    "field": pa.schema(
+        [("bottom", pa.bool_()), ("flipped", pa.bool_()), ("bundle", pa.string())]
+    ),
+}
+
+
+# Output Parquet files, without extension, and the category each is built from
+OUTPUT_TABLES: Dict[str, str] = {
+    "sleeves": "sleeve",
+    "cards": "card_names",
+    "fields": "field",
+    "wallpapers": "wallpaper",
+    "faces": "face",
+    "deck_boxes": "deck_box",
+    "icons": "icon",
+    "metadata": "card_data",
+    "coins": "coin",
+    "card_icons": "card_icon",
+}
+
+# Text columns of the cards table covered by the trigram index
+TEXT_INDEX_FIELDS = ("name", "description")
+
+# Posting lists of the data_index of the cards containing each trigram, per field
+TEXT_INDEX_SCHEMA = pa.schema(
+    [("trigram", pa.string())]
+    + [(f"{field}_postings", pa.list_(pa.uint32())) for field in TEXT_INDEX_FIELDS]
+)
+
+# Output tables built from other output tables, whose changes are not listed
+DERIVED_TABLES: Tuple[str, ...] = ("card_text_index",)
+
+OUTPUT_SCHEMAS: Dict[str, pa.Schema] = {
+    "sleeves": ID_SCHEMAS["sleeve"],
+    "cards": CARD_NAMES_SCHEMA,
+    "fields": CLEAN_SCHEMAS["field"],
+    "wallpapers": ID_SCHEMAS["wallpaper"],
+    "faces": ID_SCHEMAS["face"],
+    "deck_boxes": pa.schema(
+        [(size, pa.string()) for size in DECK_BOX_SIZES] + [("name", pa.string())]
+    ),
+    "icons": CLEAN_SCHEMAS["icon"],
+    "metadata": ID_SCHEMAS["card_data"],
+    "coins": ID_SCHEMAS["coin"],
+    "card_icons": ID_SCHEMAS["card_icon"],
+    "card_text_index": TEXT_INDEX_SCHEMA,
+}
+
+
+# Columns each output table is sorted by, which are also its lookup keys
+OUTPUT_SORT_KEYS: Dict[str, Tuple[str, ...]] = {
+    "sleeves": ("bundle",),
+    "cards": ("name", "bundle"),
+    "fields": ("bundle",),
+    "wallpapers": ("name",),
+    "faces": ("name",),
+    "deck_boxes": ("name",),
+    "icons": ("name",),
+    "metadata": ("name",),
+    "coins": ("bundle",),
+    "card_icons": ("name",),
+    "card_text_index": ("trigram",),
+}
+
+
+# Column identifying each row of the output tables
+OUTPUT_KEYS: Dict[str, str] = {name: keys[0] for name, keys in OUTPUT_SORT_KEYS.items()}
+
+# Columns of each output table holding bundle names
+OUTPUT_BUNDLE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "sleeves": ("bundle",),
+    "cards": ("bundle",),
+    "fields": ("bundle",),
+    "wallpapers": WALLPAPER_PARTS,
+    "faces": ("bundle",),
+    "deck_boxes": DECK_BOX_SIZES,
+    "icons": ICON_SIZES,
+    "metadata": ("bundle",),
+    "coins": ("bundle",),
+    "card_icons": (),
+    "card_text_index": (),
+}
+
+# Bundle names are the 8 hex digit names of the asset bundle files
+BUNDLE_PATTERN = r"^[0-9a-f]{8}$"
+NUMERIC_PATTERN = r"^[0-9]+$"
+
+
+class TableRules(NamedTuple):
+    """Checks on the content of an output table, besides its schema.
+
+    Every column must be non-null and every column listed in
+    OUTPUT_BUNDLE_COLUMNS must hold bundle names.
+    """
+
+    # Least amount of rows of a complete table
+    min_rows: int = 1
+    # Columns whose values must be distinct
+    unique: Tuple[str, ...] = ()
+    # Columns holding numbers stored as strings, such as item IDs
+    numeric: Tuple[str, ...] = ()
+    non_negative: Tuple[str, ...] = ()
+    positive: Tuple[str, ...] = ()
+    # Values of the name column that must be present
+    required_names: Tuple[str, ...] = ()
+
+
+OUTPUT_RULES: Dict[str, TableRules] = {
+    "sleeves": TableRules(unique=("bundle",)),
+    "cards": TableRules(unique=("name",), non_negative=("data_index",)),
+    "fields": TableRules(min_rows=0),
+    "wallpapers": TableRules(unique=("name",)),
+    "faces": TableRules(unique=("name",)),
+    "deck_boxes": TableRules(unique=("name",), numeric=("name",)),
+    "icons": TableRules(unique=("name",), numeric=("name",)),
+    "metadata": TableRules(
+        unique=("name",),
+        required_names=(
+            "card_name.bytes",
+            "card_desc.bytes",
+            "card_prop.bytes",
+            "card_same.bytes",
+            "card_indx.bytes",
+            "card_intid.bytes",
+        ),
+    ),
+    # The same coin can be found in several bundles
+    "coins": TableRules(),
+    "card_icons": TableRules(
+        unique=("name",), non_negative=("x", "y"), positive=("width", "height")
+    ),
+    "card_text_index": TableRules(min_rows=0, unique=("trigram",)),
+}
+
+CHANGELOG_SCHEMA = pa.schema(
+    [
+        ("version", pa.string()),
+        ("table", pa.string()),
+        ("change", pa.string()),
+        ("key", pa.string()),
+    ]
+)
+
+
+def _examples(values: pa.ChunkedArray, mask: pa.ChunkedArray) -> List[Any]:
+    """Get a few of the values failing a check, for error messages.
+
+    Args:
+        values: Checked column.
+        mask: True for the values failing the check.
+
+    Returns:
+        Up to 3 failing values.
+    """
+    return values.filter(mask).slice(0, 3).to_pylist()
+
+
+def validate_table(name: str, table: pa.Table) -> List[str]:
+    """Check an output table against its schema and rules.
+
+    Every check runs on whole columns with Arrow compute functions.
+
+    Args:
+        name: Output file name, without extension.
+        table: Table to check.
+
+    Returns:
+        Description of each failed check, empty if the table is valid.
+    """
+    schema = OUTPUT_SCHEMAS[name]
+    rules = OUTPUT_RULES[name]
+    errors = []
+
+    if table.num_rows < rules.min_rows:
+        errors.append(f"{name}: {table.num_rows} rows, expected {rules.min_rows}+")
+
+    columns: Dict[str, pa.ChunkedArray] = {}
+    for field in schema:
+        if field.name not in table.column_names:
+            errors.append(f"{name}.{field.name}: missing")
+            continue
+        try:
+            columns[field.name] = table[field.name].cast(field.type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            errors.append(
+                f"{name}.{field.name}: {table[field.name].type} is not {field.type}"
+            )
+
+    for column, values in columns.items():
+        if values.null_count:
+            errors.append(f"{name}.{column}: {values.null_count} nulls")
+
+    patterns = [(column, BUNDLE_PATTERN) for column in OUTPUT_BUNDLE_COLUMNS[name]]
+    patterns += [(column, NUMERIC_PATTERN) for column in rules.numeric]
+    for column, pattern in patterns:
+        if column in columns:
+            mismatches = pc.invert(pc.match_substring_regex(columns[column], pattern))
+            if pc.any(mismatches).as_py():
+                errors.append(
+                    f"{name}.{column}: values not matching {pattern}, such as "
+                    f"{_examples(columns[column], mismatches)}"
+                )
+
+    for column in rules.unique:
+        if column in columns:
+            counts = columns[column].value_counts()
+            duplicates = counts.field("values").filter(
+                pc.greater(counts.field("counts"), 1)
+            )
+            if len(duplicates):
+                errors.append(
+                    f"{name}.{column}: {len(duplicates)} duplicated values, such as "
+                    f"{duplicates.slice(0, 3).to_pylist()}"
+                )
+
+    bounds = [(column, pc.less, "negative") for column in rules.non_negative]
+    bounds += [(column, pc.less_equal, "non-positive") for column in rules.positive]
+    for column, compare, description in bounds:
+        if column in columns:
+            out_of_bounds = compare(columns[column], 0)
+            if pc.any(out_of_bounds).as_py():
+                errors.append(
+                    f"{name}.{column}: {description} values, such as "
+                    f"{_examples(columns[column], out_of_bounds)}"
+                )
+
+    if rules.required_names and "name" in columns:
+        required = pa.array(rules.required_names, pa.string())
+        missing = required.filter(
+            pc.invert(pc.is_in(required, value_set=columns["name"].combine_chunks()))
+        )
+        if len(missing):
+            errors.append(f"{name}.name: missing {missing.to_pylist()}")
+
+    return errors
+
+
+def validate_tables(tables: Dict[str, pa.Table]) -> None:
+    """Check the output tables before they are published.
+
+    Args:
+        tables: Dictionary mapping each output file name, without extension,
+            to its table.
+
+    Raises:
+        ValueError: Listing every failed check, if any table is invalid.
+    """
+    errors = [
+        error for name, table in tables.items() for error in validate_table(name, table)
+    ]
+    if errors:
+        raise ValueError("Invalid output tables:\n" + "\n".join(errors))
+
+
+def records_to_tables(records: Dict[str, pa.Table]) -> Dict[str, pa.Table]:
+    """Reduce the records emitted by the bundle parsers to one table per category.
+
+    Later records replace earlier ones with the same key, and keys keep the
+    position where they were first found.
+
+    Args:
+        records: Dictionary mapping each category to its records, in the
+            schemas of RECORD_SCHEMAS.
+
+    Returns:
+        Dictionary mapping each category to its table.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from pandas import DataFrame
+
+    frames = {category: table.to_pandas() for category, table in records.items()}
+
+    def last_by_name(category: str) -> DataFrame:
+        return frames[category].groupby("name", sort=False, as_index=False).last()
+
+    def pivot(category: str, column: str) -> DataFrame:
+        frame = frames[category]
+        latest = frame.dropna(subset=[column]).drop_duplicates(
+            ["name", column], keep="last"
+        )
+        return (
+            latest.pivot(index="name", columns=column, values="bundle")
+            .reindex(frame["name"].drop_duplicates())
+            .reset_index()
+        )
+
+    deck_boxes = pivot("deck_box", "size").rename(columns={"": "unknown"})
+    icons = frames["icon"].drop_duplicates()
+    reduced = {
+        "card_id": last_by_name("card_id"),
+        "icon": DataFrame(
+            {
+                "name": icons["name"].drop_duplicates(),
+                "bundles": icons.groupby("name", sort=False)["bundle"]
+                .agg(list)
+                .to_numpy(),
+            }
+        ),
+        "deck_box": deck_boxes,
+        "wallpaper": pivot("wallpaper", "part"),
+        "card_data": last_by_name("card_data"),
+        "face": last_by_name("face"),
+        "card_icon": last_by_name("card_icon"),
+        **{
+            category: frames[category].drop_duplicates()
+            for category in ("sleeve", "field", "coin")
+        },
+    }
+
+    return {
+        category: pa.Table.from_pandas(
+            reduced[category].reindex(columns=schema.names),
+            schema=schema,
+            preserve_index=False,
+        )
+        for category, schema in ID_SCHEMAS.items()
+    }
@@ -0,0 +1,149 @@
+"""Trigram index over the text of the cards."""
+
+from typing import Dict, List, Sequence, Set
+
+import numpy as np
+import pyarrow as pa
+
+from tables import TEXT_INDEX_FIELDS, TEXT_INDEX_SCHEMA
+
+
+def trigrams(text: str) -> Set[str]:
+    """Get the distinct trigrams of a text, ignoring case.
+
+    Args:
+        text: Text to split.
+
+    Returns:
+        Set of every three character substring of the casefolded text.
+    """
+    text = text.casefold()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def build_text_index(cards: pa.Table) -> pa.Table:
+    """Build the trigram index of the cards table.
+
+    Args:
+        cards: Table with the data_index column and the TEXT_INDEX_FIELDS
+            columns of the cards.
+
+    Returns:
+        Table in TEXT_INDEX_SCHEMA, with one row per trigram and, for each
+        field, the sorted and distinct data_index of the cards whose text
+        contains it.
+    """
+    data_indexes = cards["data_index"].to_pylist()
+    # Sets, as the posting lists are intersected assuming distinct values
+    postings: Dict[str, Dict[str, Set[int]]] = {}
+    for field in TEXT_INDEX_FIELDS:
+        field_postings = postings[field] = {}
+        for data_index, text in zip(data_indexes, cards[field].to_pylist()):
+            for trigram in trigrams(text or ""):
+                field_postings.setdefault(trigram, set()).add(data_index)
+
+    keys = sorted(set().union(*postings.values()))
+    return pa.Table.from_pydict(
+        {
+            "trigram": keys,
+            **{
+                f"{field}_postings": [
+                    sorted(postings[field].get(trigram, [])) for trigram in keys
+                ]
+                for field in TEXT_INDEX_FIELDS
+            },
+        },
+        schema=TEXT_INDEX_SCHEMA,
+    )
+
+
+class TextIndex:
+    """Substring search over the text of the cards.
+
+    The posting lists of every trigram of the searched text are intersected to
+    find the cards that may contain it, and the text of those candidates is
+    then checked, so only cards containing the whole text are returned.
+    Searches shorter than a trigram check the text of every card.
+    """
+
+    def __init__(self, index: pa.Table, cards: pa.Table) -> None:
+        """Initialize the TextIndex.
+
+        Args:
+            index: Table built by build_text_index.
+            cards: Cards table the index was built from.
+        """
+        self.rows = {
+            trigram: row for row, trigram in enumerate(index["trigram"].to_pylist())
+        }
+        self.offsets: Dict[str, np.ndarray] = {}
+        self.postings: Dict[str, np.ndarray] = {}
+        for field in TEXT_INDEX_FIELDS:
+            column = index[f"{field}_postings"].combine_chunks()
+            self.offsets[field] = column.offsets.to_numpy()
+            self.postings[field] = column.values.to_numpy()
+
+        data_indexes = cards["data_index"].to_pylist()
+        self.all_cards = np.unique(np.array(data_indexes, dtype=np.uint32))
+        self.texts = {
+            field: {
+                data_index: (text or "").casefold()
+                for data_index, text in zip(data_indexes, cards[field].to_pylist())
+            }
+            for field in TEXT_INDEX_FIELDS
+        }
+
+    def _candidates(self, field: str, keys: Set[str]) -> np.ndarray:
+        """Intersect the posting lists of trigrams.
+
+        Args:
+            field: Field whose posting lists are intersected.
+            keys: Trigrams that must all be present.
+
+        Returns:
+            Sorted data_index of the cards containing every trigram.
+        """
+        if not keys:
+            return self.all_cards
+
+        lists = []
+        for trigram in keys:
+            row = self.rows.get(trigram)
+            if row is None:
+                return self.all_cards[:0]
+            offsets = self.offsets[field]
+            lists.append(self.postings[field][offsets[row] : offsets[row + 1]])
+
+        # Start from the shortest list, so every intersection is small
+        lists.sort(key=len)
+        candidates = lists[0]
+        for postings in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, postings, assume_unique=True)
+        return candidates
+
+    def search(self, text: str, fields: Sequence[str] = TEXT_INDEX_FIELDS) -> List[int]:
+        """Find the cards containing a text, ignoring case.
+
+        Args:
+            text: Text to find.
+            fields: Fields to look in, any of TEXT_INDEX_FIELDS.
+
+        Returns:
+            Sorted data_index of the cards with the text in any of the fields.
+
+        Raises:
+            KeyError: If a field is not indexed.
+        """
+        needle = text.casefold()
+        keys = trigrams(needle)
+        matches: Set[int] = set()
+        for field in fields:
+            texts = self.texts[field]
+            matches.update(
+                data_index
+                for data_index in self._candidates(field, keys).tolist()
+                if needle in texts[data_index]
+            )
+        return sorted(matches)
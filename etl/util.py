@@ -1,10 +1,13 @@
 """Utility module containing helper functions and classes for the ETL process."""
 
 import json
+import logging
 import os
 import shutil
-from os.path import join
-from typing import Any, Dict, List
+import tempfile
+import threading
+from os.path import isdir, join
+from typing import Any, Dict, List, Optional
 
 
 def load_config(config_path: str = "config.json") -> Dict[str, Any]:
@@ -20,53 +23,10 @@ def load_config(config_path: str = "config.json") -> Dict[str, Any]:
         return json.load(file)
 
 
-config = load_config()
-
-GAME_PATH = config["game_path"]
-EXCLUDED_SLEEVES = config["excluded_sleeves"]
-NUM_THREADS = config["num_threads"]
-
-STREAMING_PATH = join(
-    GAME_PATH[:-23], "masterduel_Data", "StreamingAssets", "AssetBundle"
-)
-
-
-def merge_nested_dict_lists(dict1: Dict[str, Any], dict2: Dict[str, Any]) -> None:
-    """Merge nested dictionary lists, handling duplicate values.
-
-    Args:
-        dict1: First dictionary to merge into.
-        dict2: Second dictionary to merge from.
-    """
-    for key, value in dict2["icon"].items():
-        if key in dict1["icon"]:
-            dict1["icon"][key].extend(value)
-            dict1["icon"][key] = list(dict.fromkeys(dict1["icon"][key]))
-        else:
-            dict1["icon"][key] = value
-
-
-def merge_nested_dicts(dict1: Dict[str, Any], dict2: Dict[str, Any]) -> Dict[str, Any]:
-    """Recursively merge two nested dictionaries.
-
-    For overlapping keys, the values from dict2 are added to dict1.
-
-    Args:
-        dict1: First dictionary to merge into.
-        dict2: Second dictionary to merge from.
-
-    Returns:
-        Merged dictionary.
-    """
-    for key, value in dict2.items():
-        if key in dict1:
-            if isinstance(value, dict) and isinstance(dict1[key], dict):
-                merge_nested_dicts(dict1[key], value)
-            else:
-                dict1[key] = value
-        else:
-            dict1[key] = value
-    return dict1
+TEMP_PATH = "./etl/services/temp"
+DATA_PATH = "./data"
+# Memory backed file system used by in-memory workspaces, where available
+SHM_PATH = "/dev/shm"
 
 
 def chunkify(lst: List[Any], n: int) -> List[List[Any]]:
@@ -119,30 +79,226 @@ def clear_directory(directory_path: str) -> None:
             shutil.rmtree(entry_path)
 
 
-def get_data_wrapper() -> Dict[str, Any]:
+class Workspace:
+    """Directory holding the intermediate files of a run.
+
+    Every service of a run reads and writes its intermediate files through the
+    same workspace, so runs given different workspaces don't share any files
+    and can run side by side. The default workspace is kept between runs, so
+    interrupted runs can be resumed from it.
+    """
+
+    def __init__(self, directory: str = TEMP_PATH) -> None:
+        """Initialize the Workspace, creating its directory if missing.
+
+        Args:
+            directory: Directory of the workspace.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def temporary(cls, in_memory: bool = False) -> "Workspace":
+        """Create a workspace in a new directory, for a single run.
+
+        Args:
+            in_memory: Whether to create the directory on a memory backed file
+                system, so intermediate files are never written to disk. Falls
+                back to the system temporary directory where there is none.
+
+        Returns:
+            Workspace in a new directory, to be removed with remove.
+        """
+        parent = None
+        if in_memory:
+            if isdir(SHM_PATH):
+                parent = SHM_PATH
+            else:
+                logging.getLogger("Workspace").warning(
+                    "No memory backed file system found, using %s",
+                    tempfile.gettempdir(),
+                )
+        return cls(tempfile.mkdtemp(prefix="floowandereeze-", dir=parent))
+
+    def path(self, *parts: str) -> str:
+        """Get the path of a file in the workspace.
+
+        Args:
+            *parts: Path of the file relative to the workspace.
+
+        Returns:
+            Path of the file.
+        """
+        return join(self.directory, *parts)
+
+    def clear(self) -> None:
+        """Delete all files in the workspace."""
+        clear_directory(self.directory)
+
+    def remove(self) -> None:
+        """Delete the workspace and its directory."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __repr__(self) -> str:
+        return f"Workspace({self.directory!r})"
+
+
+class Install:
+    """Game install the data is extracted from.
+
+    The asset bundles are found under the LocalData directory of the install,
+    given as its game path, and under the StreamingAssets directory of the
+    game files.
     """
-    Get a data wrapper for the ETL process.
+
+    def __init__(
+        self, game_path: str, name: str = "default", output_dir: str = DATA_PATH
+    ) -> None:
+        """Initialize the Install.
+
+        Args:
+            game_path: Path to the LocalData/<id>/0000 directory of the install.
+            name: Name of the install, used for its files in shared directories.
+            output_dir: Directory the tables of the install are published to.
+        """
+        self.game_path = game_path
+        self.name = name
+        self.output_dir = output_dir
+
+        # Strip LocalData/<id>/0000 to get the game directory
+        game_dir = game_path[:-23]
+        self.streaming_path = join(
+            game_dir, "masterduel_Data", "StreamingAssets", "AssetBundle"
+        )
+        self.unity3d_path = join(game_dir, "masterduel_Data", "data.unity3d")
+
+    def __repr__(self) -> str:
+        return f"Install({self.name!r}, {self.game_path!r})"
+
+
+def load_installs(config_data: Dict[str, Any]) -> List[Install]:
+    """Get the installs to extract from the configuration.
+
+    Each entry of the "installs" list needs a name and a game_path, and may
+    set its output_dir, which defaults to a directory named after the install
+    in the data directory. Without a list, the single install at "game_path"
+    is published to the data directory.
+
+    Args:
+        config_data: Configuration loaded by load_config.
 
     Returns:
-        A dictionary with the following keys:
-        - card_id: A dictionary for card IDs.
-        - sleeve: A list of sleeve IDs.
-        - icon: A dictionary for icons.
-        - deck_box: A dictionary for deck boxes.
-        - field: A list of field IDs.
-        - wallpaper: A dictionary for wallpapers.
-        - card_data: A dictionary for card data.
-        - face: A dictionary for face data.
+        List of installs, in configuration order.
+
+    Raises:
+        ValueError: If the list is empty or two installs share a name.
     """
-    return {
-        "card_id": {},
-        "sleeve": [],
-        "icon": {},
-        "deck_box": {},
-        "field": [],
-        "wallpaper": {},
-        "card_data": {},
-        "face": {},
-        "coin": [],
-        "card_icon": {},
-    }
+    if "installs" not in config_data:
+        return [Install(config_data["game_path"])]
+
+    installs = [
+        Install(
+            entry["game_path"],
+            entry["name"],
+            entry.get("output_dir", join(DATA_PATH, entry["name"])),
+        )
+        for entry in config_data["installs"]
+    ]
+    names = [install.name for install in installs]
+    if not installs or len(set(names)) != len(names):
+        raise ValueError(f"Installs need unique names, got {names}")
+    return installs
+
+
+class Config:
+    """Settings of the ETL, read from the configuration file on first use.
+
+    Nothing is read when the module is imported, so tools and tests that
+    don't need the settings work from any directory, and the file or single
+    settings can be replaced before they are first used.
+    """
+
+    def __init__(self, path: str = "config.json") -> None:
+        """Initialize the Config.
+
+        Args:
+            path: Path to the configuration file.
+        """
+        self.path = path
+        self.overrides: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._installs: Optional[List[Install]] = None
+
+    def load(self, path: str) -> None:
+        """Read the settings from another configuration file from now on.
+
+        Args:
+            path: Path to the configuration file.
+        """
+        with self._lock:
+            self.path = path
+            self._data = None
+            self._installs = None
+
+    def override(self, **settings: Any) -> None:
+        """Replace settings of the configuration file, such as num_threads.
+
+        Args:
+            **settings: Settings to replace, by their configuration key.
+        """
+        with self._lock:
+            self.overrides.update(settings)
+            self._installs = None
+
+    def reset(self) -> None:
+        """Drop the overrides and read the configuration file again."""
+        with self._lock:
+            self.overrides.clear()
+            self._data = None
+            self._installs = None
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """Content of the configuration file, with the overrides applied."""
+        with self._lock:
+            if self._data is None:
+                self._data = load_config(self.path)
+            return {**self._data, **self.overrides}
+
+    @property
+    def num_threads(self) -> int:
+        """Number of threads used by the concurrent steps."""
+        return self.data["num_threads"]
+
+    @property
+    def excluded_sleeves(self) -> List[str]:
+        """Bundles of sleeves left out of the output."""
+        return self.data["excluded_sleeves"]
+
+    @property
+    def field_store(self) -> str:
+        """Path of the file keeping the field sorting decisions."""
+        return self.data.get("field_store", "./etl/res/fields.json")
+
+    @property
+    def reports_dir(self) -> str:
+        """Directory the run reports are kept in, one directory per install."""
+        return self.data.get("reports_dir", "./reports")
+
+    @property
+    def installs(self) -> List[Install]:
+        """Installs to extract, see load_installs."""
+        data = self.data
+        with self._lock:
+            if self._installs is None:
+                self._installs = load_installs(data)
+            return self._installs
+
+    @property
+    def game_path(self) -> str:
+        """Game path of the first install, shown by the interfaces."""
+        return self.installs[0].game_path
+
+
+CONFIG = Config()
@@ -3,6 +3,38 @@
 import os
 import sys
 
+import pyarrow as pa
+import pytest
+
 # Add etl/ to sys.path so 'util' and 'services' are importable as top-level modules.
 # This mirrors how main.py is executed: `python etl/main.py` adds etl/ to sys.path.
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "etl"))
+
+# pylint: disable=wrong-import-position
+from tables import RECORD_SCHEMAS, records_to_tables
+from util import CONFIG
+
+
+@pytest.fixture
+def config():
+    """Configuration of the services, with the test overrides dropped after."""
+    yield CONFIG
+    CONFIG.reset()
+
+
+@pytest.fixture
+def id_tables():
+    """Reduce records, given as lists of rows per category, to the id tables."""
+
+    def reduce(**records):
+        return records_to_tables(
+            {
+                category: pa.Table.from_pylist(
+                    [dict(zip(schema.names, row)) for row in records.get(category, [])],
+                    schema=schema,
+                )
+                for category, schema in RECORD_SCHEMAS.items()
+            }
+        )
+
+    return reduce
@@ -0,0 +1,56 @@
+"""Tests for BundleCacheService and RecordingSink."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.bundle_cache_service import BundleCacheService, RecordingSink
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return BundleCacheService(str(tmp_path / "cache"))
+
+
+class TestRecordingSink:
+    def test_records_without_bundle_name(self):
+        sink = MagicMock()
+        recording_sink = RecordingSink(sink)
+
+        recording_sink.emit("deck_box", "1", "large", "ab12")
+
+        sink.emit.assert_called_once_with("deck_box", "1", "large", "ab12")
+        assert recording_sink.records == [("deck_box", ["1", "large"])]
+
+
+class TestBundleCacheService:
+    def test_same_content_same_key(self, cache, tmp_path):
+        (tmp_path / "a").write_bytes(b"bundle")
+        (tmp_path / "b").write_bytes(b"bundle")
+        (tmp_path / "c").write_bytes(b"other")
+        assert cache.key(str(tmp_path / "a")) == cache.key(str(tmp_path / "b"))
+        assert cache.key(str(tmp_path / "a")) != cache.key(str(tmp_path / "c"))
+
+    def test_missing_entry(self, cache):
+        assert cache.get("00" * 32) is None
+
+    def test_put_then_get(self, cache, tmp_path):
+        part = tmp_path / "card_name.bytes"
+        part.write_bytes(b"names")
+
+        cache.put(
+            "ab" * 32, [("card_data", ["card_name.bytes"])], {part.name: str(part)}
+        )
+        part.unlink()
+
+        records, parts = cache.get("ab" * 32)
+        assert records == [("card_data", ["card_name.bytes"])]
+        with open(parts["card_name.bytes"], "rb") as cached_part:
+            assert cached_part.read() == b"names"
+
+    def test_first_put_is_kept(self, cache):
+        cache.put("cd" * 32, [("sleeve", [])], {})
+        cache.put("cd" * 32, [("coin", [])], {})
+        assert cache.get("cd" * 32) == ([("sleeve", [])], {})
@@ -0,0 +1,54 @@
+"""Tests for CheckpointService storage of stage tables."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import pyarrow as pa
+import pytest
+
+from services.checkpoint_service import CheckpointService
+
+
+@pytest.fixture
+def tables():
+    return {
+        "sleeve": pa.Table.from_pydict({"bundle": ["a", "b"]}),
+        "icon": pa.Table.from_pydict({"name": ["1"], "bundles": [["x", "y", "z"]]}),
+    }
+
+
+class TestCheckpointService:
+    def test_get_returns_tables_from_same_run(self, tmp_path, tables):
+        service = CheckpointService(str(tmp_path))
+        service.put("ids", tables)
+        assert service.get("ids")["sleeve"] is tables["sleeve"]
+
+    def test_get_loads_checkpoint_from_previous_run(self, tmp_path, tables):
+        CheckpointService(str(tmp_path)).put("ids", tables)
+        loaded = CheckpointService(str(tmp_path)).get("ids")
+        assert set(loaded) == {"sleeve", "icon"}
+        assert loaded["sleeve"].equals(tables["sleeve"])
+        assert loaded["icon"].equals(tables["icon"])
+
+    def test_checkpoint_files_written(self, tmp_path, tables):
+        CheckpointService(str(tmp_path)).put("ids", tables)
+        assert sorted(path.name for path in (tmp_path / "ids").iterdir()) == [
+            "icon.arrow",
+            "sleeve.arrow",
+        ]
+
+    def test_get_returns_independent_dict(self, tmp_path, tables):
+        service = CheckpointService(str(tmp_path))
+        service.put("ids", tables)
+        service.get("ids")["sleeve"] = None
+        assert service.get("ids")["sleeve"] is tables["sleeve"]
+
+    def test_missing_stage_raises(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            CheckpointService(str(tmp_path)).get("ids")
+
+    def test_has(self, tmp_path, tables):
+        service = CheckpointService(str(tmp_path))
+        assert not service.has("ids")
+        service.put("ids", tables)
+        assert service.has("ids")
+        assert CheckpointService(str(tmp_path)).has("ids")
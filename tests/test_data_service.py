@@ -2,18 +2,28 @@
 
 # pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name,duplicate-code
 
+import json
 from unittest.mock import patch
 
+import pandas as pd
+import pyarrow as pa
 import pytest
 
 from services.data_service import DataService
+from services.field_service import FieldService
+from services.sink_service import SinkService
+from services.writer_service import WriterService
+from tables import DECK_BOX_SIZES, OUTPUT_RULES, WALLPAPER_PARTS
+from util import Install, Workspace
 
 
 @pytest.fixture
-def data_service():
+def data_service(tmp_path):
     """DataService instance with GameService dependency mocked out."""
     with patch("services.data_service.GameService"):
-        svc = DataService()
+        svc = DataService(Workspace(str(tmp_path / "temp")))
+    # Keep field decisions away from the real files
+    svc.field_service = FieldService(str(tmp_path / "fields.json"))
     # Configure sort_sprite_list to return a valid 3-size mapping by default
     svc.game_service.unity_service.sort_sprite_list.return_value = {
         "small": "s",
@@ -88,103 +98,43 @@ class TestRemoveExtraSuffix:
         assert result["Card"] == ["bundle_id", "desc", 42]
 
 
-class TestMergeData:
-    def _wrapper(self, **overrides):
-        base = {
-            "card_id": {},
-            "sleeve": [],
-            "icon": {},
-            "deck_box": {},
-            "field": [],
-            "wallpaper": {},
-            "card_data": {},
-            "face": {},
-            "coin": [],
-            "card_icon": {},
-        }
-        base.update(overrides)
-        return base
-
-    def test_merges_card_ids(self, data_service):
-        ids = self._wrapper(card_id={"a": 1})
-        data_service.merge_data(ids, self._wrapper(card_id={"b": 2}))
-        assert ids["card_id"] == {"a": 1, "b": 2}
-
-    def test_extends_sleeve_list(self, data_service):
-        ids = self._wrapper(sleeve=["s1"])
-        data_service.merge_data(ids, self._wrapper(sleeve=["s2"]))
-        assert ids["sleeve"] == ["s1", "s2"]
-
-    def test_extends_field_list(self, data_service):
-        ids = self._wrapper(field=["f1"])
-        data_service.merge_data(ids, self._wrapper(field=["f2"]))
-        assert ids["field"] == ["f1", "f2"]
-
-    def test_extends_coin_list(self, data_service):
-        ids = self._wrapper(coin=["c1"])
-        data_service.merge_data(ids, self._wrapper(coin=["c2"]))
-        assert ids["coin"] == ["c1", "c2"]
-
-    def test_merges_card_data(self, data_service):
-        ids = self._wrapper(card_data={"part_a": "bundle_1"})
-        data_service.merge_data(ids, self._wrapper(card_data={"part_b": "bundle_2"}))
-        assert ids["card_data"] == {"part_a": "bundle_1", "part_b": "bundle_2"}
-
-    def test_merges_face_data(self, data_service):
-        ids = self._wrapper(face={"Normal": {"key": 0, "bundle": "b1"}})
-        data_service.merge_data(
-            ids, self._wrapper(face={"Effect": {"key": 1, "bundle": "b2"}})
-        )
-        assert "Normal" in ids["face"]
-        assert "Effect" in ids["face"]
-
-    def test_icon_deduplication_via_nested_dict_lists(self, data_service):
-        ids = self._wrapper(icon={"100": ["bundle_a"]})
-        data_service.merge_data(
-            ids, self._wrapper(icon={"100": ["bundle_a", "bundle_b"]})
-        )
-        assert ids["icon"]["100"].count("bundle_a") == 1
-        assert "bundle_b" in ids["icon"]["100"]
-
-
 class TestCleanData:
     """Tests for data validation rules applied in clean_data()."""
 
-    def _make_dirty_data(self, **overrides):
-        base = {
-            "icon": {},
-            "deck_box": {},
-            "sleeve": [],
-            "wallpaper": {},
-            "field": [],
+    @pytest.fixture(autouse=True)
+    def _id_tables(self, id_tables):
+        self.id_tables = id_tables
+
+    def _run_clean(self, data_service, records, sort_fields=False):
+        """Run clean_data on the given records, return the cleaned tables as dicts."""
+        data_service.checkpoint_service.put("data_dirty", self.id_tables(**records))
+        data_service.clean_data(sort_fields=sort_fields)
+        return {
+            category: table.to_pydict()
+            for category, table in data_service.checkpoint_service.get("data").items()
         }
-        base.update(overrides)
-        return base
-
-    def _run_clean(self, data_service, dirty_data):
-        """Run clean_data with mocked file I/O, return the saved data dict."""
-        with (
-            patch("builtins.open"),
-            patch("json.load", return_value=dirty_data),
-            patch("json.dump") as mock_dump,
-            patch("services.data_service.isfile", return_value=False),
-        ):
-            data_service.clean_data(sort_fields=False)
-        return mock_dump.call_args[0][0]
 
     def test_removes_icon_with_fewer_than_3_bundles(self, data_service):
-        dirty = self._make_dirty_data(icon={"123": ["a", "b"], "456": ["a", "b", "c"]})
+        dirty = {
+            "icon": [
+                ("123", "a"),
+                ("123", "b"),
+                ("456", "a"),
+                ("456", "b"),
+                ("456", "c"),
+            ]
+        }
         result = self._run_clean(data_service, dirty)
-        assert "123" not in result["icon"]
-        assert "456" in result["icon"]
+        assert "123" not in result["icon"]["name"]
+        assert "456" in result["icon"]["name"]
 
     def test_removes_icon_with_non_numeric_id(self, data_service):
-        dirty = self._make_dirty_data(
-            icon={"abc": ["a", "b", "c"], "789": ["a", "b", "c"]}
-        )
+        dirty = {
+            "icon": [(name, bundle) for name in ("abc", "789") for bundle in "abc"]
+        }
         result = self._run_clean(data_service, dirty)
-        assert "abc" not in result["icon"]
-        assert "789" in result["icon"]
+        assert "abc" not in result["icon"]["name"]
+        assert "789" in result["icon"]["name"]
 
     def test_removes_icon_when_sort_returns_wrong_size(self, data_service):
         # Simulate sort_sprite_list returning incomplete mapping
@@ -192,9 +142,19 @@ class TestCleanData:
             "small": "s",
             "medium": "m",
         }
-        dirty = self._make_dirty_data(icon={"100": ["a", "b", "c"]})
+        dirty = {"icon": [("100", bundle) for bundle in "abc"]}
         result = self._run_clean(data_service, dirty)
-        assert "100" not in result["icon"]
+        assert "100" not in result["icon"]["name"]
+
+    def test_icons_stored_by_size(self, data_service):
+        dirty = {"icon": [("100", bundle) for bundle in "abc"]}
+        result = self._run_clean(data_service, dirty)
+        assert result["icon"] == {
+            "name": ["100"],
+            "large": ["l"],
+            "medium": ["m"],
+            "small": ["s"],
+        }
 
     def test_removes_deck_box_with_missing_size_keys(self, data_service):
         valid_keys = {
@@ -206,15 +166,31 @@ class TestCleanData:
             "medium",
             "small",
         }
-        dirty = self._make_dirty_data(
-            deck_box={
-                "1": {k: f"b_{k}" for k in valid_keys},
-                "2": {"large": "b", "small": "b"},  # missing keys
-            }
-        )
+        dirty = {
+            "deck_box": [("1", k, f"b_{k}") for k in valid_keys]
+            + [("2", "large", "b"), ("2", "small", "b")]  # missing keys
+        }
         result = self._run_clean(data_service, dirty)
-        assert "1" in result["deck_box"]
-        assert "2" not in result["deck_box"]
+        assert "1" in result["deck_box"]["name"]
+        assert "2" not in result["deck_box"]["name"]
+
+    def test_removes_deck_box_with_unknown_size(self, data_service):
+        valid_keys = {
+            "large",
+            "o_large",
+            "r_large",
+            "o_medium",
+            "r_medium",
+            "medium",
+            "small",
+        }
+        dirty = {
+            "deck_box": [(name, k, "b") for name in ("1", "2") for k in valid_keys]
+            + [("1", "", "b")]
+        }
+        result = self._run_clean(data_service, dirty)
+        assert result["deck_box"]["name"] == ["2"]
+        assert "unknown" not in result["deck_box"]
 
     def test_removes_deck_box_with_non_numeric_id(self, data_service):
         valid_keys = {
@@ -226,39 +202,262 @@ class TestCleanData:
             "medium",
             "small",
         }
-        dirty = self._make_dirty_data(deck_box={"xyz": {k: "b" for k in valid_keys}})
+        dirty = {"deck_box": [("xyz", k, "b") for k in valid_keys]}
         result = self._run_clean(data_service, dirty)
-        assert "xyz" not in result["deck_box"]
+        assert "xyz" not in result["deck_box"]["name"]
 
-    def test_removes_excluded_sleeves(self, data_service):
-        with patch("services.data_service.EXCLUDED_SLEEVES", ["bad_sleeve"]):
-            dirty = self._make_dirty_data(sleeve=["good_sleeve", "bad_sleeve"])
-            result = self._run_clean(data_service, dirty)
-        assert "good_sleeve" in result["sleeve"]
-        assert "bad_sleeve" not in result["sleeve"]
+    def test_removes_excluded_sleeves(self, data_service, config):
+        config.override(excluded_sleeves=["bad_sleeve"])
+        dirty = {"sleeve": [("good_sleeve",), ("bad_sleeve",)]}
+        result = self._run_clean(data_service, dirty)
+        assert "good_sleeve" in result["sleeve"]["bundle"]
+        assert "bad_sleeve" not in result["sleeve"]["bundle"]
 
     def test_removes_wallpaper_without_3_files(self, data_service):
-        dirty = self._make_dirty_data(
-            wallpaper={
-                "wp1": {"icon": "i", "front": "f", "back": "b"},  # valid
-                "wp2": {"icon": "i", "front": "f"},  # missing back
-            }
-        )
+        dirty = {
+            "wallpaper": [
+                ("wp1", "icon", "i"),
+                ("wp1", "front", "f"),
+                ("wp1", "back", "b"),  # valid
+                ("wp2", "icon", "i"),
+                ("wp2", "front", "f"),  # missing back
+            ]
+        }
         result = self._run_clean(data_service, dirty)
-        assert "wp1" in result["wallpaper"]
-        assert "wp2" not in result["wallpaper"]
+        assert "wp1" in result["wallpaper"]["name"]
+        assert "wp2" not in result["wallpaper"]["name"]
+
+    def test_field_data_preserved_from_store(self, data_service):
+        data_service.field_service.decisions = {
+            "bundle_x": {"bottom": True, "flipped": False},
+            "bundle_y": None,
+            "bundle_z": {"bottom": False, "flipped": False},
+        }
+        dirty = {"field": [("bundle_x",), ("bundle_y",)]}
+        result = self._run_clean(data_service, dirty)
+        assert result["field"] == {
+            "bottom": [True],
+            "flipped": [False],
+            "bundle": ["bundle_x"],
+        }
+
+    def test_sort_fields_shows_downscaled_previews_in_order(self, data_service):
+        dirty = {"field": [("f3",), ("f1",), ("f2",)]}
+        fetch_image = data_service.game_service.unity_service.fetch_image
 
-    def test_field_data_preserved_from_existing_file(self, data_service):
-        existing_clean = {"field": {"bundle_x": {"bottom": True, "flipped": False}}}
-        dirty = self._make_dirty_data()
+        with (
+            patch("builtins.input", side_effect=["2", "1", "3", "1", "2"]),
+            patch("builtins.print"),
+        ):
+            result = self._run_clean(data_service, dirty, sort_fields=True)
+
+        fetched = [call.args[0] for call in fetch_image.call_args_list]
+        assert fetched == ["f1", "f2", "f3"]
+        for call in fetch_image.call_args_list:
+            assert call.kwargs["max_size"] == data_service.field_preview_size
+        assert result["field"] == {
+            "bottom": [True, False],
+            "flipped": [False, True],
+            "bundle": ["f1", "f3"],
+        }
+        assert data_service.field_service.decisions["f2"] is None
+
+    def test_sort_fields_only_prompts_new_fields(self, data_service):
+        data_service.field_service.decisions = {
+            "old": {"bottom": True, "flipped": True},
+            "unsupported": None,
+        }
+        dirty = {"field": [("old",), ("new",), ("unsupported",), ("new",)]}
+        fetch_image = data_service.game_service.unity_service.fetch_image
 
         with (
-            patch("builtins.open"),
-            patch("json.load", side_effect=[dirty, existing_clean]),
-            patch("json.dump") as mock_dump,
-            patch("services.data_service.isfile", return_value=True),
+            patch("builtins.input", side_effect=["1", "1"]) as mock_input,
+            patch("builtins.print"),
         ):
-            data_service.clean_data(sort_fields=False)
+            result = self._run_clean(data_service, dirty, sort_fields=True)
+
+        assert [call.args[0] for call in fetch_image.call_args_list] == ["new"]
+        assert mock_input.call_count == 2
+        assert result["field"]["bundle"] == ["new", "old"]
+
+
+class TestGetIds:
+    def test_process_dirs_reports_extracted_card_data(self, data_service, tmp_path):
+        data_service.game_service.get_dir_data.return_value = ["card_name.bytes"]
+        extracted = []
+        data_service.on_extracted = extracted.append
+
+        data_service.process_dirs([["0a", False], ["root", False]])
+
+        assert extracted == [str(tmp_path / "temp" / "card_name.bytes")]
+
+    def test_get_ids_stores_records_of_all_chunks(self, data_service, tmp_path):
+        data_service.sink_service = SinkService(str(tmp_path / "records"))
+
+        def get_dir_data(data_dir, _, sink):
+            sink.emit("card_id", data_dir, f"bundle_{data_dir}")
+            return []
+
+        data_service.game_service.get_dir_data.side_effect = get_dir_data
+        (tmp_path / "game" / "0a").mkdir(parents=True)
+        (tmp_path / "game" / "0b").mkdir()
+
+        data_service.install = Install(str(tmp_path / "game"))
+        data_service.get_ids()
+
+        card_ids = data_service.checkpoint_service.get("ids")["card_id"]
+        assert sorted(card_ids.to_pylist(), key=lambda row: row["name"]) == [
+            {"name": "0a", "bundle": "bundle_0a"},
+            {"name": "0b", "bundle": "bundle_0b"},
+        ]
+
+    def test_get_unity3d_ids_stores_card_icons(self, data_service):
+        data_service.game_service.get_unity3d_data.return_value = {
+            "card_id": {},
+            "card_icon": {"4007": {"x": 1, "y": 2, "width": 3, "height": 4}},
+        }
 
-        result = mock_dump.call_args[0][0]
-        assert result["field"] == {"bundle_x": {"bottom": True, "flipped": False}}
+        data_service.get_unity3d_ids()
+
+        card_icons = data_service.checkpoint_service.get("unity3d_ids")["card_icon"]
+        assert card_icons.to_pylist() == [
+            {"name": "4007", "x": 1.0, "y": 2.0, "width": 3.0, "height": 4.0}
+        ]
+
+
+@pytest.fixture
+def clean_data(id_tables):
+    """Cleaned tables with one valid row per category."""
+    tables = id_tables(
+        sleeve=[("0a1b2c3d",)],
+        deck_box=[("1", size, "0b1b2c3d") for size in DECK_BOX_SIZES],
+        wallpaper=[("w", part, "0c1b2c3d") for part in WALLPAPER_PARTS],
+        card_data=[
+            (name, "0d1b2c3d") for name in OUTPUT_RULES["metadata"].required_names
+        ],
+        face=[("Normal", 1, "0e1b2c3d")],
+        coin=[("0f1b2c3d",)],
+        card_icon=[("x", 0.0, 0.0, 1.0, 1.0)],
+    )
+    tables["icon"] = pa.Table.from_pydict(
+        {
+            "name": ["1"],
+            "large": ["1a1b2c3d"],
+            "medium": ["2a1b2c3d"],
+            "small": ["3a1b2c3d"],
+        }
+    )
+    tables["field"] = pa.Table.from_pydict(
+        {"bottom": [True], "flipped": [False], "bundle": ["4a1b2c3d"]}
+    )
+    tables["card_names"] = pa.Table.from_pydict(
+        {"data_index": [0], "description": ["d"], "bundle": ["5a1b2c3d"], "name": ["n"]}
+    )
+    return tables
+
+
+class TestWriteData:
+    def test_writes_every_table_and_version(self, data_service, tmp_path, clean_data):
+        data_service.checkpoint_service.put("data", clean_data)
+
+        data_service.writer_service = WriterService(str(tmp_path / "data"))
+        data_service.write_data()
+
+        written = {path.name for path in (tmp_path / "data").iterdir()}
+        assert written == {
+            "sleeves.parquet",
+            "cards.parquet",
+            "fields.parquet",
+            "wallpapers.parquet",
+            "faces.parquet",
+            "deck_boxes.parquet",
+            "icons.parquet",
+            "metadata.parquet",
+            "coins.parquet",
+            "card_icons.parquet",
+            "card_text_index.parquet",
+            "changelog.parquet",
+            "version.txt",
+        }
+        cards = pd.read_parquet(tmp_path / "data" / "cards.parquet")
+        assert list(cards.columns) == ["data_index", "description", "bundle", "name"]
+        assert pd.read_parquet(tmp_path / "data" / "sleeves.parquet")[
+            "bundle"
+        ].tolist() == ["0a1b2c3d"]
+
+    def test_invalid_tables_are_not_published(self, data_service, tmp_path, clean_data):
+        clean_data["sleeve"] = pa.Table.from_pydict({"bundle": ["0a1b2c3d", "bad"]})
+        data_service.checkpoint_service.put("data", clean_data)
+
+        data_service.writer_service = WriterService(str(tmp_path / "data"))
+        with pytest.raises(ValueError, match="sleeves.bundle"):
+            data_service.write_data()
+        assert not (tmp_path / "data").exists()
+
+
+class TestGetCardData:
+    def _write_decoded(self, temp_dir, ids, descs, names):
+        for filename, content in [
+            ("card_prop.bytes.Card_IDs.dec.json", ids),
+            ("card_desc.bytes.dec.json", descs),
+            ("card_name.bytes.dec.json", names),
+        ]:
+            (temp_dir / filename).write_text(json.dumps(content), encoding="utf-8")
+
+    def test_joins_arts_with_card_data(self, data_service, tmp_path, id_tables):
+        temp_dir = tmp_path / "temp"
+        self._write_decoded(
+            temp_dir,
+            [4007, 30001, 4008, 4009],
+            ["desc a", "desc dup", "desc b", "desc c"],
+            ["Alpha", "Alpha", "Beta", "Beta"],
+        )
+        ids = id_tables(
+            card_id=[("4007", "aaaaaaaa"), ("4008", "bbbbbbbb"), ("4009", "cccccccc")]
+        )
+        data_service.checkpoint_service.put("ids", ids)
+        data_service.checkpoint_service.put(
+            "unity3d_ids", {"card_icon": ids["card_icon"]}
+        )
+
+        data_service.get_card_data()
+
+        cards = data_service.checkpoint_service.get("data_dirty")["card_names"]
+        assert cards.to_pylist() == [
+            {
+                "data_index": 0,
+                "description": "desc a",
+                "bundle": "aaaaaaaa",
+                "name": "Alpha",
+            },
+            {
+                "data_index": 2,
+                "description": "desc b",
+                "bundle": "bbbbbbbb",
+                "name": "Beta (alt 1)",
+            },
+            {
+                "data_index": 3,
+                "description": "desc c",
+                "bundle": "cccccccc",
+                "name": "Beta",
+            },
+        ]
+
+    def test_last_entry_wins_for_repeated_ids(self, data_service, tmp_path, id_tables):
+        temp_dir = tmp_path / "temp"
+        self._write_decoded(
+            temp_dir, [4007, 30099, 4007], ["old", "dup", "new"], ["A", "B", "C"]
+        )
+        ids = id_tables(card_id=[("4007", "aaaaaaaa"), ("30099", "bbbbbbbb")])
+        data_service.checkpoint_service.put("ids", ids)
+        data_service.checkpoint_service.put(
+            "unity3d_ids", {"card_icon": ids["card_icon"]}
+        )
+
+        data_service.get_card_data()
+
+        cards = data_service.checkpoint_service.get("data_dirty")["card_names"]
+        assert cards.to_pylist() == [
+            {"data_index": 2, "description": "new", "bundle": "aaaaaaaa", "name": "C"}
+        ]
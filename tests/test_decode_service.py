@@ -0,0 +1,87 @@
+"""Tests for DecodeService decryption of the card data in a workspace."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring
+
+import json
+import struct
+import zlib
+
+from services.decode_service import DecodeService, crypto_key_path
+from util import Install, Workspace
+
+
+def write_card_prop(workspace, card_ids, key=0):
+    """Write a card_prop part encrypted with a crypto key."""
+    data = bytes(8) + b"".join(
+        struct.pack("<H", card_id) + bytes(6) for card_id in card_ids
+    )
+    compressed = zlib.compress(data)
+    encrypted = bytes(
+        byte ^ ((((i + key + 0x23D) * key) ^ (i % 7)) & 0xFF)
+        for i, byte in enumerate(compressed)
+    )
+    with open(workspace.path("card_prop.bytes"), "wb") as part:
+        part.write(encrypted)
+
+
+class TestDecodeService:
+    def test_runs_decrypt_ids_in_separate_workspaces(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        first = Workspace(str(tmp_path / "first"))
+        second = Workspace(str(tmp_path / "second"))
+        write_card_prop(first, [4007, 4008])
+        write_card_prop(second, [5000])
+
+        DecodeService(first).decrypt_ids()
+        DecodeService(second).decrypt_ids()
+
+        for workspace, card_ids in [(first, [4007, 4008]), (second, [5000])]:
+            with open(
+                workspace.path("card_prop.bytes.Card_IDs.dec.json"), encoding="utf-8"
+            ) as ids_json:
+                assert json.load(ids_json) == card_ids
+
+    def test_crypto_key_kept_per_install(self, tmp_path, config):
+        config.override(field_store=str(tmp_path / "res" / "fields.json"))
+        first = Workspace(str(tmp_path / "first"))
+        second = Workspace(str(tmp_path / "second"))
+        write_card_prop(first, [4007], key=3)
+        write_card_prop(second, [5000], key=5)
+
+        DecodeService(first, crypto_key_path(Install("", "live"))).decrypt_ids()
+        DecodeService(second, crypto_key_path(Install("", "prepatch"))).decrypt_ids()
+
+        assert (tmp_path / "res" / "live.CryptoKey.txt").read_text() == "0x3"
+        assert (tmp_path / "res" / "prepatch.CryptoKey.txt").read_text() == "0x5"
+        assert not (tmp_path / "first" / "!CryptoKey.txt").exists()
+
+    def test_crypto_key_survives_clearing_workspace(self, tmp_path, capsys):
+        workspace = Workspace(str(tmp_path / "workspace"))
+        key_path = str(tmp_path / "live.CryptoKey.txt")
+        write_card_prop(workspace, [4007], key=3)
+        DecodeService(workspace, key_path).decrypt_ids()
+
+        workspace.clear()
+        write_card_prop(workspace, [4008], key=3)
+        capsys.readouterr()
+        DecodeService(workspace, key_path).decrypt_ids()
+
+        assert 'Read crypto key "0x3"' in capsys.readouterr().out
+        with open(
+            workspace.path("card_prop.bytes.Card_IDs.dec.json"), encoding="utf-8"
+        ) as ids_json:
+            assert json.load(ids_json) == [4008]
+
+    def test_half_written_crypto_key_searched_again(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        workspace = Workspace(str(tmp_path / "workspace"))
+        write_card_prop(workspace, [4007], key=3)
+        (tmp_path / "workspace" / "!CryptoKey.txt").write_text("0x")
+
+        DecodeService(workspace).decrypt_ids()
+
+        assert (tmp_path / "workspace" / "!CryptoKey.txt").read_text() == "0x3"
+        with open(
+            workspace.path("card_prop.bytes.Card_IDs.dec.json"), encoding="utf-8"
+        ) as ids_json:
+            assert json.load(ids_json) == [4007]
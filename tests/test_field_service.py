@@ -0,0 +1,55 @@
+"""Tests for FieldService persistence of field orientation decisions."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import json
+
+import pytest
+
+from services.field_service import FieldService
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "fields.json")
+
+
+class TestFieldService:
+    def test_missing_store_starts_empty(self, store_path):
+        assert FieldService(store_path).decisions == {}
+
+    def test_record_persists_decisions(self, store_path):
+        service = FieldService(store_path)
+        service.record("b", {"bottom": True, "flipped": False})
+        service.record("a", None)
+
+        with open(store_path, "r", encoding="utf-8") as store_file:
+            assert json.load(store_file) == {
+                "a": None,
+                "b": {"bottom": True, "flipped": False},
+            }
+        assert FieldService(store_path).decisions == service.decisions
+
+    def test_unsupported_fields_count_as_classified(self, store_path):
+        service = FieldService(store_path)
+        service.record("a", None)
+        assert service.is_classified("a")
+        assert not service.is_classified("b")
+
+    def test_get_unclassified_sorted_and_unique(self, store_path):
+        service = FieldService(store_path)
+        service.record("b", {"bottom": False, "flipped": False})
+        assert service.get_unclassified(["c", "b", "a", "c"]) == ["a", "c"]
+
+    def test_get_fields_skips_unsupported_and_unknown(self, store_path):
+        service = FieldService(store_path)
+        service.record("a", {"bottom": False, "flipped": True})
+        service.record("b", None)
+        assert service.get_fields(["a", "b", "c"]) == {
+            "a": {"bottom": False, "flipped": True}
+        }
+
+    def test_repository_store_is_valid(self):
+        service = FieldService()
+        for orientation in service.decisions.values():
+            assert orientation is None or set(orientation) == {"bottom", "flipped"}
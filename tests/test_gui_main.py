@@ -0,0 +1,174 @@
+"""Tests for the log rendering and progress panel of the GUI."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import logging
+import queue
+from logging.handlers import QueueHandler
+
+import pytest
+
+from gui_main import LogBatcher, create_pipeline, describe_progress
+from services.install_service import InstallService
+from services.pipeline_service import PipelineService
+from util import Install, Workspace
+
+
+@pytest.fixture
+def log():
+    records = queue.Queue()
+    logger = logging.getLogger("test_gui_main")
+    logger.propagate = False
+    handler = QueueHandler(records)
+    logger.addHandler(handler)
+    yield logger, LogBatcher(records, logging.Formatter("%(levelname)s %(message)s"), 4)
+    logger.removeHandler(handler)
+
+
+class TestLogBatcher:
+    def test_empty_queue(self, log):
+        _, batcher = log
+        assert batcher.drain() == ""
+
+    def test_batch_rendered_at_once(self, log):
+        logger, batcher = log
+        logger.warning("Scanning %s", "0a")
+        logger.error("Failed")
+
+        assert batcher.drain() == "WARNING Scanning 0a\nERROR Failed\n"
+        assert batcher.drain() == ""
+
+    def test_repeated_messages_coalesced(self, log):
+        logger, batcher = log
+        for _ in range(3):
+            logger.warning("Skipped bundle")
+        logger.error("Skipped bundle")
+        logger.warning("Skipped bundle")
+        logger.warning("Skipped bundle")
+
+        assert batcher.drain() == (
+            "WARNING Skipped bundle (x3)\n"
+            "ERROR Skipped bundle\n"
+            "WARNING Skipped bundle (x2)\n"
+        )
+
+    def test_only_newest_lines_kept(self, log):
+        logger, batcher = log
+        for index in range(10):
+            logger.warning("Line %d", index)
+
+        assert batcher.drain() == (
+            "... 7 lines skipped\nWARNING Line 7\nWARNING Line 8\nWARNING Line 9\n"
+        )
+
+    def test_single_line_keeps_only_the_skip_note(self, log):
+        logger, batcher = log
+        batcher.max_lines = 1
+        for index in range(3):
+            logger.warning("Line %d", index)
+
+        assert batcher.drain() == "... 3 lines skipped\n"
+
+    def test_batch_size_bounded(self, log):
+        logger, batcher = log
+        batcher.max_batch = 2
+        for index in range(3):
+            logger.warning("Line %d", index)
+
+        assert batcher.drain() == "WARNING Line 0\nWARNING Line 1\n"
+        assert batcher.drain() == "WARNING Line 2\n"
+
+
+class TestDescribeProgress:
+    @staticmethod
+    def live(bundles, **workers):
+        return {
+            "counters": {"bundles": bundles},
+            "progress": {
+                "scan": {"bundles": 100, "started": 1000.0, "updated": 1000.0},
+                **workers,
+            },
+        }
+
+    def test_no_scan(self):
+        assert describe_progress({"counters": {}, "progress": {}}, 0, 30) is None
+
+    def test_throughput_and_eta(self):
+        progress = describe_progress(self.live(25), 1010.0, 30)
+        assert (progress["done"], progress["total"]) == (25, 100)
+        assert progress["summary"] == "25/100 bundles, 2.5 bundles/s, 0:30 left"
+        assert progress["workers"] == progress["records"] == ""
+
+    def test_workers_and_records(self):
+        worker = {"directories": 4, "updated": 1000.0}
+        progress = describe_progress(
+            self.live(
+                100,
+                **{
+                    "worker 10": {
+                        **worker,
+                        "updated": 1040.0,
+                        "directory": None,
+                        "done": 4,
+                        "records": {"card_id": 3, "sleeve": 0},
+                    },
+                    "worker 2": {
+                        **worker,
+                        "directory": "0a",
+                        "done": 1,
+                        "records": {"card_id": 2, "sleeve": 1},
+                    },
+                },
+            ),
+            1040.0,
+            30,
+        )
+        assert progress["summary"] == "100/100 bundles, 2.5 bundles/s"
+        assert progress["workers"] == (
+            "Worker 2: 1/4 folders, in 0a, no progress for 40s\n"
+            "Worker 10: 4/4 folders, done"
+        )
+        assert progress["records"] == "card_id 5, sleeve 1"
+
+    def test_rate_frozen_once_scan_is_done(self):
+        live = self.live(
+            100,
+            **{
+                "worker 0": {
+                    "directory": None,
+                    "done": 4,
+                    "directories": 4,
+                    "records": {},
+                    "updated": 1040.0,
+                }
+            },
+        )
+        assert describe_progress(live, 1040.0, 30)["summary"] == (
+            describe_progress(live, 5000.0, 30)["summary"]
+        )
+
+    def test_rate_frozen_and_eta_hidden_once_scan_finished(self):
+        live = self.live(50)
+        live["progress"]["scan"]["finished"] = 1020.0
+        assert describe_progress(live, 5000.0, 30)["summary"] == (
+            "50/100 bundles, 2.5 bundles/s"
+        )
+
+
+class TestCreatePipeline:
+    def test_single_install_runs_pipeline(self, tmp_path, config):
+        config.override(field_store=str(tmp_path / "fields.json"))
+        install = Install(str(tmp_path / "live"), "live")
+        pipeline = create_pipeline([install], Workspace(str(tmp_path / "temp")))
+
+        assert isinstance(pipeline, PipelineService)
+        assert pipeline.install is install
+
+    def test_several_installs_run_install_service(self, tmp_path):
+        installs = [
+            Install(str(tmp_path / name), name) for name in ("live", "prepatch")
+        ]
+        pipeline = create_pipeline(installs, Workspace(str(tmp_path / "temp")))
+
+        assert isinstance(pipeline, InstallService)
+        assert pipeline.installs == installs
@@ -0,0 +1,101 @@
+"""Tests for InstallService extraction and publishing order."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from services import install_service
+from services.install_service import EXTRACT_STAGES, PUBLISH_STAGES, InstallService
+from util import Install, Workspace
+
+
+@pytest.fixture
+def installs(tmp_path):
+    return [
+        Install(str(tmp_path / name), name, str(tmp_path / "data" / name))
+        for name in ("live", "snapshot")
+    ]
+
+
+@pytest.fixture
+def service(installs, tmp_path, monkeypatch):
+    # Extract in threads, so the stand-in extraction needs no pickling
+    monkeypatch.setattr(
+        install_service,
+        "ProcessPoolExecutor",
+        lambda max_workers, mp_context: ThreadPoolExecutor(max_workers),
+    )
+    extracted = []
+
+    def extract_install(install, workspace_dir, cache_dir, *args):
+        if install.name == "broken":
+            raise RuntimeError("no bundles")
+        extracted.append((install.name, workspace_dir, cache_dir, args[-1]))
+        return {"counters": {"bundles": len(install.name)}}
+
+    monkeypatch.setattr(install_service, "extract_install", extract_install)
+    pipeline_service = MagicMock()
+    pipeline_service.return_value.run.return_value = {"write_data": True}
+    monkeypatch.setattr(install_service, "PipelineService", pipeline_service)
+
+    service = InstallService(installs, Workspace(str(tmp_path / "temp")))
+    service.extracted = extracted
+    service.pipeline_service = pipeline_service
+    return service
+
+
+class TestRun:
+    def test_extracts_every_install_in_its_workspace(self, service, tmp_path):
+        service.run()
+        assert sorted(service.extracted) == [
+            (
+                name,
+                str(tmp_path / "temp" / name),
+                str(tmp_path / "temp" / "bundle_cache"),
+                EXTRACT_STAGES,
+            )
+            for name in ("live", "snapshot")
+        ]
+
+    def test_publishes_each_install_with_its_metrics(self, service, installs):
+        assert service.run() == {
+            "live": {"write_data": True},
+            "snapshot": {"write_data": True},
+        }
+        published = [
+            call.kwargs["install"] for call in service.pipeline_service.call_args_list
+        ]
+        assert published == installs
+        assert [
+            call.kwargs["metrics"]
+            for call in service.pipeline_service.return_value.run.call_args_list
+        ] == [{"counters": {"bundles": 4}}, {"counters": {"bundles": 8}}]
+        service.pipeline_service.return_value.run.assert_called_with(
+            PUBLISH_STAGES,
+            force=False,
+            params=None,
+            metrics={"counters": {"bundles": 8}},
+        )
+
+    def test_runs_only_selected_stages(self, service):
+        params = {"clean_data": {"sort_fields": False}}
+        service.run(["get_ids", "clean_data"], params=params)
+
+        assert {stages for *_, stages in service.extracted} == {("get_ids",)}
+        service.pipeline_service.return_value.run.assert_called_with(
+            ("clean_data",),
+            force=False,
+            params=params,
+            metrics={"counters": {"bundles": 8}},
+        )
+
+    def test_failed_install_is_raised_after_others_publish(self, service, tmp_path):
+        service.installs.insert(0, Install(str(tmp_path / "broken"), "broken"))
+        service.workspaces["broken"] = Workspace(str(tmp_path / "temp" / "broken"))
+
+        with pytest.raises(RuntimeError, match="no bundles"):
+            service.run()
+        assert service.pipeline_service.call_count == 2
@@ -0,0 +1,79 @@
+"""Tests for JournalService stage fingerprints and completion records."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import os
+
+import pytest
+
+from services.journal_service import JournalService
+
+
+@pytest.fixture
+def paths(tmp_path):
+    (tmp_path / "input").mkdir()
+    (tmp_path / "input" / "a.bytes").write_bytes(b"a")
+    (tmp_path / "output.arrow").write_bytes(b"out")
+    return [str(tmp_path / "input")], [str(tmp_path / "output.arrow")]
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return JournalService(str(tmp_path / "temp" / "journal.json"))
+
+
+class TestFingerprint:
+    def test_stable_for_unchanged_files(self, journal, paths):
+        inputs, _ = paths
+        assert journal.fingerprint(inputs) == journal.fingerprint(inputs)
+
+    def test_changes_when_file_added(self, tmp_path, journal, paths):
+        inputs, _ = paths
+        before = journal.fingerprint(inputs)
+        (tmp_path / "input" / "b.bytes").write_bytes(b"b")
+        assert journal.fingerprint(inputs) != before
+
+    def test_changes_when_file_modified(self, tmp_path, journal, paths):
+        inputs, _ = paths
+        before = journal.fingerprint(inputs)
+        (tmp_path / "input" / "a.bytes").write_bytes(b"changed")
+        assert journal.fingerprint(inputs) != before
+
+    def test_changes_when_missing_path_created(self, tmp_path, journal):
+        missing = [str(tmp_path / "missing.json")]
+        before = journal.fingerprint(missing)
+        (tmp_path / "missing.json").write_text("{}")
+        assert journal.fingerprint(missing) != before
+
+
+class TestIsComplete:
+    def test_false_without_record(self, journal, paths):
+        assert not journal.is_complete("ids", *paths)
+
+    def test_true_after_record(self, journal, paths):
+        inputs, outputs = paths
+        journal.record("ids", journal.fingerprint(inputs), outputs)
+        assert journal.is_complete("ids", inputs, outputs)
+
+    def test_false_when_inputs_changed(self, tmp_path, journal, paths):
+        inputs, outputs = paths
+        journal.record("ids", journal.fingerprint(inputs), outputs)
+        (tmp_path / "input" / "a.bytes").write_bytes(b"changed")
+        assert not journal.is_complete("ids", inputs, outputs)
+
+    def test_false_when_outputs_removed(self, journal, paths):
+        inputs, outputs = paths
+        journal.record("ids", journal.fingerprint(inputs), outputs)
+        os.remove(outputs[0])
+        assert not journal.is_complete("ids", inputs, outputs)
+
+    def test_false_when_params_changed(self, journal, paths):
+        inputs, outputs = paths
+        journal.record("clean", journal.fingerprint(inputs), outputs, {"sort": False})
+        assert journal.is_complete("clean", inputs, outputs, {"sort": False})
+        assert not journal.is_complete("clean", inputs, outputs, {"sort": True})
+
+    def test_record_persists_between_instances(self, journal, paths):
+        inputs, outputs = paths
+        journal.record("ids", journal.fingerprint(inputs), outputs)
+        assert JournalService(journal.path).is_complete("ids", inputs, outputs)
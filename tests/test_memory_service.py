@@ -0,0 +1,72 @@
+"""Tests for MemoryService stage and bundle probes."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name,protected-access
+
+import tracemalloc
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pytest
+
+from services.checkpoint_service import CheckpointService
+from services.memory_service import MemoryService
+
+
+@pytest.fixture
+def data_service(tmp_path):
+    """Stand-in for a DataService holding an ids checkpoint in memory."""
+    checkpoint_service = CheckpointService(str(tmp_path))
+    checkpoint_service.stages["ids"] = {
+        "sleeve": pa.table({"bundle": ["a" * 1024] * 1024})
+    }
+    game_service = SimpleNamespace(_load_bundle=lambda path: path)
+    return SimpleNamespace(
+        game_service=game_service, checkpoint_service=checkpoint_service
+    )
+
+
+@pytest.fixture
+def memory(data_service):
+    service = MemoryService()
+    service.instrument(data_service)
+    service.start()
+    yield service
+    service.stop()
+
+
+class TestMemoryService:
+    def test_stops_tracing_it_started(self):
+        service = MemoryService()
+        service.start()
+        assert tracemalloc.is_tracing()
+        service.stop()
+        assert not tracemalloc.is_tracing()
+
+    def test_stage_probe_includes_ids_size(self, memory):
+        with memory.stage("get_ids"):
+            allocated = [bytearray(1 << 20) for _ in range(4)]
+
+        probe = memory.report()["stages"]["get_ids"]
+        assert probe["traced_peak_mb"] >= 4
+        assert probe["tables_mb"]["ids"]["sleeve"] >= 1
+        assert len(probe["top_allocations"]) <= memory.top_count
+        assert probe["top_allocations"][0]["size_mb"] >= 4
+        del allocated
+
+    def test_failed_stage_is_probed(self, memory):
+        with pytest.raises(RuntimeError):
+            with memory.stage("write_data"):
+                raise RuntimeError("out of memory")
+
+        assert "write_data" in memory.report()["stages"]
+
+    def test_probes_largest_bundles(self, memory, data_service, tmp_path):
+        memory.bundle_count = 2
+        for name, size in [("a", 10), ("b", 30), ("c", 20), ("d", 5)]:
+            path = tmp_path / name
+            path.write_bytes(bytes(size))
+            data_service.game_service._load_bundle(str(path))
+
+        bundles = memory.report()["bundles"]
+        assert [probe["bundle"] for probe in bundles] == ["b", "c"]
+        assert "top_allocations" in bundles[0]
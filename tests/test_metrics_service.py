@@ -0,0 +1,103 @@
+"""Tests for MetricsService counters, timings and run reports."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import json
+import threading
+
+import pytest
+
+from services.metrics_service import MetricsService
+
+
+@pytest.fixture
+def metrics():
+    return MetricsService()
+
+
+class TestMetricsService:
+    def test_increment_from_threads(self, metrics):
+        def work():
+            for _ in range(1000):
+                metrics.increment("bundles")
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert metrics.counters["bundles"] == 8000
+
+    def test_observe_keeps_slowest_labels(self, metrics):
+        metrics.slowest_count = 2
+        for seconds, bundle in [(0.1, "a"), (0.5, "b"), (0.3, "c"), (0.2, "d")]:
+            metrics.observe("bundle", seconds, bundle)
+
+        timing = metrics.report()["timings"]["bundle"]
+        assert timing["count"] == 4
+        assert timing["max"] == 0.5
+        assert [entry["label"] for entry in timing["slowest"]] == ["b", "c"]
+
+    def test_stage_records_changed_counters(self, metrics):
+        metrics.increment("bundles", 5)
+        with metrics.stage("get_ids"):
+            metrics.increment("bundles", 3)
+            metrics.increment("bytes_read", 100)
+
+        stage = metrics.stages["get_ids"]
+        assert stage["status"] == "completed"
+        assert stage["counters"] == {"bundles": 3, "bytes_read": 100}
+        assert set(stage["rates"]) == {"bundles_per_second", "bytes_read_per_second"}
+
+    def test_stage_records_failure(self, metrics):
+        with pytest.raises(ValueError):
+            with metrics.stage("decode_card_data"):
+                raise ValueError("corrupt")
+        assert metrics.stages["decode_card_data"]["status"] == "failed"
+
+    def test_merge_snapshot(self, metrics):
+        other = MetricsService()
+        other.increment("records.card_id", 2)
+        other.observe("bundle", 1.0, "slow")
+        metrics.increment("records.card_id", 1)
+        metrics.observe("bundle", 0.5, "fast")
+
+        # Snapshots are sent between processes as plain data
+        metrics.merge(json.loads(json.dumps(other.snapshot())))
+
+        report = metrics.report()
+        assert report["counters"] == {"records.card_id": 3}
+        assert report["timings"]["bundle"]["count"] == 2
+        assert report["timings"]["bundle"]["slowest"][0]["label"] == "slow"
+
+    def test_write_report(self, metrics, tmp_path):
+        metrics.increment("bundles")
+        path = tmp_path / "data" / "run_report.json"
+        metrics.write_report(str(path))
+        assert json.loads(path.read_text())["counters"] == {"bundles": 1}
+
+    def test_progress_is_live_only(self, metrics):
+        records = {"card_id": 1}
+        metrics.increment("bundles")
+        metrics.set_progress("worker 0", directory="0a", records=records)
+        metrics.set_progress("worker 0", directory="0b")
+        records["card_id"] = 2
+
+        live = metrics.live()
+        assert live["counters"] == {"bundles": 1}
+        progress = live["progress"]["worker 0"]
+        assert progress["directory"] == "0b"
+        assert progress["records"] == {"card_id": 1}
+        assert progress["updated"] > 0
+        assert "progress" not in metrics.snapshot()
+        assert "worker 0" not in json.dumps(metrics.report())
+
+    def test_reset(self, metrics):
+        metrics.increment("bundles")
+        metrics.skip_stage("get_ids")
+        metrics.set_progress("scan", bundles=1)
+        metrics.reset()
+        assert metrics.report()["counters"] == {}
+        assert metrics.report()["stages"] == {}
+        assert metrics.live()["progress"] == {}
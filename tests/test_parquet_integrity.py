@@ -2,22 +2,31 @@
 
 # pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
 
-import re
 from pathlib import Path
 
 import pandas as pd
+import pyarrow.parquet as pq
 import pytest
 
+from tables import BUNDLE_PATTERN, OUTPUT_RULES, validate_table
+
 DATA_DIR = Path(__file__).parent.parent / "data"
-BUNDLE_HEX_RE = re.compile(r"^[0-9a-f]{8}$")
 
 
 def _load(filename):
     return pd.read_parquet(DATA_DIR / filename)
 
 
-def _is_bundle(val):
-    return bool(BUNDLE_HEX_RE.match(str(val)))
+def _is_bundle(values):
+    return values.astype(str).str.fullmatch(BUNDLE_PATTERN)
+
+
+@pytest.mark.parametrize(
+    "name",
+    [name for name in OUTPUT_RULES if (DATA_DIR / f"{name}.parquet").is_file()],
+)
+def test_matches_output_rules(name):
+    assert not validate_table(name, pq.read_table(DATA_DIR / f"{name}.parquet"))
 
 
 @pytest.fixture(scope="module")
@@ -84,7 +93,7 @@ class TestCards:
         assert not cards["name"].duplicated().any()
 
     def test_bundle_format(self, cards):
-        assert cards["bundle"].apply(_is_bundle).all()
+        assert _is_bundle(cards["bundle"]).all()
 
     def test_data_index_non_negative(self, cards):
         assert (cards["data_index"] >= 0).all()
@@ -108,7 +117,7 @@ class TestIcons:
     def test_bundle_format(self, icons):
         for col in self.BUNDLE_COLS:
             assert (
-                icons[col].apply(_is_bundle).all()
+                _is_bundle(icons[col]).all()
             ), f"Invalid bundle in column '{col}'"
 
     def test_unique_names(self, icons):
@@ -138,7 +147,7 @@ class TestDeckBoxes:
     def test_all_size_bundles_valid(self, deck_boxes):
         for col in self.SIZE_COLS:
             assert (
-                deck_boxes[col].apply(_is_bundle).all()
+                _is_bundle(deck_boxes[col]).all()
             ), f"Invalid bundle in column '{col}'"
 
     def test_name_is_numeric(self, deck_boxes):
@@ -159,7 +168,7 @@ class TestSleeves:
         assert not sleeves.isna().any().any()
 
     def test_bundle_format(self, sleeves):
-        assert sleeves["bundle"].apply(_is_bundle).all()
+        assert _is_bundle(sleeves["bundle"]).all()
 
     def test_no_duplicates(self, sleeves):
         assert not sleeves["bundle"].duplicated().any()
@@ -180,7 +189,7 @@ class TestWallpapers:
     def test_bundle_format(self, wallpapers):
         for col in self.BUNDLE_COLS:
             assert (
-                wallpapers[col].apply(_is_bundle).all()
+                _is_bundle(wallpapers[col]).all()
             ), f"Invalid bundle in column '{col}'"
 
     def test_unique_names(self, wallpapers):
@@ -198,7 +207,7 @@ class TestFaces:
         assert not faces.isna().any().any()
 
     def test_bundle_format(self, faces):
-        assert faces["bundle"].apply(_is_bundle).all()
+        assert _is_bundle(faces["bundle"]).all()
 
     def test_unique_names(self, faces):
         assert not faces["name"].duplicated().any()
@@ -215,7 +224,7 @@ class TestCoins:
         assert not coins.isna().any().any()
 
     def test_bundle_format(self, coins):
-        assert coins["bundle"].apply(_is_bundle).all()
+        assert _is_bundle(coins["bundle"]).all()
     #
     # def test_no_duplicates(self, coins):
     #     assert not coins["bundle"].duplicated().any()
@@ -263,7 +272,7 @@ class TestMetadata:
         assert not metadata.isna().any().any()
 
     def test_bundle_format(self, metadata):
-        assert metadata["bundle"].apply(_is_bundle).all()
+        assert _is_bundle(metadata["bundle"]).all()
 
     def test_unique_names(self, metadata):
         assert not metadata["name"].duplicated().any()
@@ -0,0 +1,219 @@
+"""Tests for PipelineService stage skipping and resuming."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import json
+import os
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.pipeline_service import CARD_DATA_PARTS, CARD_PROP_PART, PipelineService
+from util import Workspace
+
+
+@pytest.fixture
+def pipeline(tmp_path, config):
+    config.override(
+        field_store=str(tmp_path / "fields.json"),
+        reports_dir=str(tmp_path / "reports"),
+    )
+    temp_dir = tmp_path / "temp"
+    temp_dir.mkdir()
+    (temp_dir / "data_dirty").mkdir()
+    (temp_dir / "data_dirty" / "sleeve.arrow").write_bytes(b"dirty")
+
+    data_service = MagicMock()
+    data_service.clean_data.side_effect = lambda **_: (temp_dir / "data").mkdir(
+        exist_ok=True
+    )
+    return PipelineService(
+        data_service,
+        MagicMock(),
+        workspace=Workspace(str(temp_dir)),
+    )
+
+
+class TestRunStage:
+    def test_runs_stage_without_journal(self, pipeline):
+        assert pipeline.run_stage("clean_data", sort_fields=False)
+        pipeline.data_service.clean_data.assert_called_once_with(sort_fields=False)
+
+    def test_skips_completed_stage(self, pipeline):
+        pipeline.run_stage("clean_data", sort_fields=False)
+        assert not pipeline.run_stage("clean_data", sort_fields=False)
+        assert pipeline.data_service.clean_data.call_count == 1
+
+    def test_force_reruns_completed_stage(self, pipeline):
+        pipeline.run_stage("clean_data", sort_fields=False)
+        assert pipeline.run_stage("clean_data", force=True, sort_fields=False)
+        assert pipeline.data_service.clean_data.call_count == 2
+
+    def test_reruns_when_params_changed(self, pipeline):
+        pipeline.run_stage("clean_data", sort_fields=False)
+        assert pipeline.run_stage("clean_data", sort_fields=True)
+
+    def test_reruns_when_upstream_output_changed(self, tmp_path, pipeline):
+        pipeline.run_stage("clean_data", sort_fields=False)
+        (tmp_path / "temp" / "data_dirty" / "icon.arrow").write_bytes(b"new")
+        assert pipeline.run_stage("clean_data", sort_fields=False)
+
+    def test_reruns_when_field_store_changed(self, tmp_path, pipeline):
+        pipeline.run_stage("clean_data", sort_fields=False)
+        (tmp_path / "fields.json").write_text('{"0a1b2c3d": null}', encoding="utf-8")
+        assert pipeline.run_stage("clean_data", sort_fields=False)
+
+    def test_field_answers_given_while_cleaning_are_recorded(self, tmp_path, pipeline):
+        pipeline.data_service.clean_data.side_effect = lambda **_: (
+            tmp_path / "fields.json"
+        ).write_text('{"0a1b2c3d": null}', encoding="utf-8")
+        pipeline.run_stage("clean_data", sort_fields=True)
+        assert not pipeline.run_stage("clean_data", sort_fields=True)
+
+    def test_default_params_match_given_ones(self, pipeline):
+        pipeline.run_stage("clean_data")
+        pipeline.data_service.clean_data.assert_called_once_with(sort_fields=True)
+        assert not pipeline.run_stage("clean_data", sort_fields=True)
+
+    def test_failed_stage_is_not_recorded(self, pipeline):
+        pipeline.data_service.clean_data.side_effect = RuntimeError("interrupted")
+        with pytest.raises(RuntimeError):
+            pipeline.run_stage("clean_data", sort_fields=False)
+        assert "clean_data" not in pipeline.journal_service.entries
+
+    def test_resumes_from_journal_of_previous_run(self, tmp_path, pipeline):
+        pipeline.run_stage("clean_data", sort_fields=False)
+        restarted = PipelineService(
+            MagicMock(),
+            MagicMock(),
+            workspace=Workspace(str(tmp_path / "temp")),
+        )
+        assert not restarted.run_stage("clean_data", sort_fields=False)
+        restarted.data_service.clean_data.assert_not_called()
+
+
+class TestRun:
+    def test_runs_independent_stages_concurrently(self, pipeline):
+        barrier = threading.Barrier(2, timeout=5)
+        pipeline.data_service.get_ids.side_effect = barrier.wait
+        pipeline.data_service.get_unity3d_ids.side_effect = barrier.wait
+
+        assert pipeline.run(["get_ids", "get_unity3d_ids"]) == {
+            "get_ids": True,
+            "get_unity3d_ids": True,
+        }
+
+    def test_runs_stage_after_its_dependencies(self, pipeline):
+        order = []
+        pipeline.data_service.get_ids.side_effect = lambda: order.append("ids")
+        pipeline.data_service.get_unity3d_ids.side_effect = lambda: order.append(
+            "unity3d"
+        )
+        pipeline.data_service.get_card_data.side_effect = lambda: order.append(
+            "card_data"
+        )
+
+        pipeline.run(["get_card_data", "get_ids", "get_unity3d_ids"])
+        assert order[-1] == "card_data"
+
+    def test_decoding_starts_once_card_data_is_extracted(self, tmp_path, pipeline):
+        decoding = threading.Event()
+        pipeline.decode_service.decrypt_ids.side_effect = decoding.set
+
+        def get_ids():
+            for part in CARD_DATA_PARTS + (CARD_PROP_PART,):
+                pipeline.data_service.on_extracted(
+                    os.path.join(str(tmp_path / "temp"), part)
+                )
+            # The scan only finishes once decoding has started
+            assert decoding.wait(timeout=5)
+
+        pipeline.data_service.get_ids.side_effect = get_ids
+
+        pipeline.run(["get_ids", "decode_card_data"])
+        assert pipeline.data_service.on_extracted is None
+
+    def test_decoding_reruns_when_a_part_is_extracted_again(self, tmp_path, pipeline):
+        order = []
+        decoded = threading.Event()
+
+        def decrypt_ids():
+            order.append("decode")
+            decoded.set()
+
+        def get_ids():
+            for part in CARD_DATA_PARTS + (CARD_PROP_PART,):
+                pipeline.data_service.on_extracted(
+                    os.path.join(str(tmp_path / "temp"), part)
+                )
+            assert decoded.wait(timeout=5)
+            # A later bundle carries the card_prop part too
+            pipeline.data_service.on_extracted(
+                os.path.join(str(tmp_path / "temp"), CARD_PROP_PART)
+            )
+            order.append("ids")
+
+        pipeline.decode_service.decrypt_ids.side_effect = decrypt_ids
+        pipeline.data_service.get_ids.side_effect = get_ids
+        pipeline.data_service.get_card_data.side_effect = lambda: order.append(
+            "card_data"
+        )
+
+        pipeline.run(["get_ids", "decode_card_data", "get_card_data"])
+        assert order == ["decode", "ids", "decode", "card_data"]
+
+    def test_failure_stops_dependent_stages(self, pipeline):
+        pipeline.decode_service.decrypt_ids.side_effect = RuntimeError("corrupt")
+
+        with pytest.raises(RuntimeError):
+            pipeline.run(["decode_card_data", "get_card_data"])
+        pipeline.data_service.get_card_data.assert_not_called()
+
+    def test_passes_params_to_stage(self, pipeline):
+        pipeline.run(["clean_data"], params={"clean_data": {"sort_fields": False}})
+        pipeline.data_service.clean_data.assert_called_once_with(sort_fields=False)
+
+    def test_unknown_stage_raises(self, pipeline):
+        with pytest.raises(KeyError):
+            pipeline.run(["get_everything"])
+
+    def test_writes_run_report(self, tmp_path, pipeline):
+        pipeline.report_path = str(tmp_path / "run_report.json")
+        pipeline.run(["clean_data"])
+        pipeline.run(["clean_data"])
+
+        report = json.loads((tmp_path / "run_report.json").read_text())
+        assert report["stages"] == {"clean_data": {"status": "skipped"}}
+
+    def test_run_report_survives_clearing_workspace(self, tmp_path, pipeline):
+        pipeline.run(["clean_data"])
+        pipeline.workspace.clear()
+
+        (report_path,) = (tmp_path / "reports" / "default").glob("*-run.json")
+        report = json.loads(report_path.read_text())
+        assert report["stages"]["clean_data"]["status"] == "completed"
+
+    def test_writes_run_report_of_failed_run(self, tmp_path, pipeline):
+        pipeline.data_service.clean_data.side_effect = RuntimeError("interrupted")
+
+        with pytest.raises(RuntimeError):
+            pipeline.run(["clean_data"])
+
+        (report_path,) = (tmp_path / "reports" / "default").glob("*-run.json")
+        report = json.loads(report_path.read_text())
+        assert report["stages"]["clean_data"]["status"] == "failed"
+
+    def test_memory_probe_adds_report_section(self, tmp_path, pipeline):
+        probed = PipelineService(
+            pipeline.data_service,
+            MagicMock(),
+            workspace=Workspace(str(tmp_path / "temp")),
+            report_path=str(tmp_path / "run_report.json"),
+            memory=True,
+        )
+        probed.run(["clean_data"], force=True)
+
+        report = json.loads((tmp_path / "run_report.json").read_text())
+        assert set(report["memory"]["stages"]) == {"clean_data"}
+        assert "peak_rss_mb" in report["memory"]
@@ -0,0 +1,58 @@
+"""Tests for ProfileService timing hooks and profile reports."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name,protected-access
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.game_service import GameService
+from services.metrics_service import METRICS
+from services.profile_service import ProfileService
+
+
+@pytest.fixture
+def data_service():
+    """Stand-in for a DataService whose scan only runs a bundle parse."""
+    game_service = GameService()
+    game_service._load_bundle = MagicMock(
+        return_value=SimpleNamespace(
+            container={"assets/resourcesassetbundle/protector/common/p1": None},
+            objects=[],
+        )
+    )
+
+    def process_dirs():
+        return game_service._parse_bundle("path", "0a1b2c3d", "0a", MagicMock())
+
+    return SimpleNamespace(game_service=game_service, process_dirs=process_dirs)
+
+
+class TestProfileService:
+    def test_uninstrumented_service_has_no_hooks(self):
+        assert "_parse_card" not in vars(GameService())
+
+    def test_times_load_and_parsers_per_bundle(self, data_service):
+        METRICS.reset()
+        ProfileService().instrument(data_service)
+
+        data_service.process_dirs()
+
+        timings = METRICS.report()["timings"]
+        assert timings["load"]["count"] == 1
+        assert timings["parse.sleeve"]["slowest"][0]["label"] == "0a1b2c3d"
+        assert "parse.card" not in timings
+
+    def test_report_lists_categories_and_functions(self, data_service):
+        METRICS.reset()
+        profiler = ProfileService()
+        profiler.instrument(data_service)
+
+        data_service.process_dirs()
+        report = profiler.report()
+
+        assert [entry["category"] for entry in report["categories"]] == ["sleeve"]
+        assert report["load"][0]["count"] == 1
+        assert len(report["functions"]) <= profiler.top_count
+        assert all(entry["calls"] >= 1 for entry in report["functions"])
@@ -0,0 +1,127 @@
+"""Tests for DataQuery lookups on published tables."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from query import DataQuery, default_cache_dir
+from services.writer_service import WriterService
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    directory = tmp_path / "data"
+    WriterService(str(directory)).write(
+        {
+            "cards": pa.Table.from_pydict(
+                {
+                    "name": ["Dark Magician", "Dark Hole", "Blue-Eyes", "dark ruler"],
+                    "bundle": ["0a0a0a0a", "0b0b0b0b", "0c0c0c0c", "0d0d0d0d"],
+                    "description": ["a", "b", "c", "d"],
+                    "data_index": [10, 11, 12, 13],
+                }
+            ),
+            "sleeves": pa.Table.from_pydict({"bundle": ["0a0a0a0a"]}),
+            "icons": pa.Table.from_pydict(
+                {
+                    "name": ["1000001"],
+                    "large": ["1a1a1a1a"],
+                    "medium": ["0a0a0a0a"],
+                    "small": [None],
+                }
+            ),
+        },
+        "2026-01-01",
+    )
+    return directory
+
+
+@pytest.fixture
+def query(data_dir):
+    return DataQuery(str(data_dir))
+
+
+class TestDataQuery:
+    def test_version(self, query):
+        assert query.version == "2026-01-01"
+
+    def test_table_is_memory_mapped_from_cache(self, query, data_dir):
+        cards = query.table("cards")
+        assert cards.num_rows == 4
+        assert query.table("cards") is cards
+        cache_dir = data_dir.parent / "data.arrow"
+        assert [path.name[:6] for path in cache_dir.iterdir()] == ["cards-"]
+
+    def test_republished_table_is_decoded_again(self, query, data_dir):
+        query.table("sleeves")
+        WriterService(str(data_dir)).write(
+            {"sleeves": pa.Table.from_pydict({"bundle": ["0e0e0e0e", "0f0f0f0f"]})},
+            "2026-01-02",
+        )
+
+        assert DataQuery(str(data_dir)).table("sleeves").num_rows == 2
+        assert len(list((data_dir.parent / "data.arrow").glob("sleeves-*"))) == 1
+
+    def test_cache_kept_outside_published_directories(self, data_dir):
+        assert default_cache_dir(str(data_dir)) == f"{data_dir}.arrow"
+        assert default_cache_dir("data/live") == str(Path.cwd() / "data.arrow" / "live")
+
+    def test_unwritable_cache_reads_parquet(self, data_dir, tmp_path):
+        (tmp_path / "file").write_text("", encoding="utf-8")
+        query = DataQuery(str(data_dir), cache_dir=str(tmp_path / "file"))
+        assert query.table("cards").num_rows == 4
+
+    def test_missing_table_raises(self, query):
+        with pytest.raises(FileNotFoundError):
+            query.table("coins")
+
+    def test_name_to_bundle(self, query):
+        assert query.name_to_bundle("Dark Hole") == "0b0b0b0b"
+        assert query.name_to_bundle("Pot of Greed") is None
+
+    def test_bundle_to_categories(self, query):
+        assert query.bundle_to_categories("0a0a0a0a") == ["sleeves", "cards", "icons"]
+        assert query.bundle_to_categories("1a1a1a1a") == ["icons"]
+        assert query.bundle_to_categories("ffffffff") == []
+
+    def test_card_by_data_index(self, query):
+        assert query.card(12) == {
+            "data_index": 12,
+            "description": "c",
+            "bundle": "0c0c0c0c",
+            "name": "Blue-Eyes",
+        }
+        assert query.card(99) is None
+
+    def test_search_ignores_case(self, query):
+        assert query.search("dark") == ["Dark Hole", "Dark Magician", "dark ruler"]
+        assert query.search("DARK M") == ["Dark Magician"]
+        assert query.search("dark", limit=1) == ["Dark Hole"]
+        assert query.search("x") == []
+
+    def test_text_search_builds_missing_index(self, query):
+        assert [card["name"] for card in query.text_search("DARK")] == [
+            "Dark Magician",
+            "Dark Hole",
+            "dark ruler",
+        ]
+        assert query.text_search("dark", limit=1)[0]["data_index"] == 10
+        assert query.text_search("dark", fields=("description",)) == []
+
+
+class TestPublishedData:
+    def test_lookups_match_full_read(self, tmp_path):
+        query = DataQuery(str(DATA_DIR), cache_dir=str(tmp_path / "cache"))
+        cards = pd.read_parquet(DATA_DIR / "cards.parquet")
+        card = cards.iloc[len(cards) // 2]
+
+        assert query.name_to_bundle(card["name"]) == card["bundle"]
+        assert query.card(int(card["data_index"]))["name"] == card["name"]
+        assert card["name"] in query.search(card["name"], limit=None)
+        assert "cards" in query.bundle_to_categories(card["bundle"])
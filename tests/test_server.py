@@ -0,0 +1,115 @@
+"""Tests for the LookupServer and its client."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import json
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pyarrow as pa
+import pytest
+
+from server import LookupClient, LookupServer
+from services.writer_service import WriterService
+
+
+def publish(directory, names, version):
+    WriterService(str(directory)).write(
+        {
+            "cards": pa.Table.from_pydict(
+                {
+                    "name": names,
+                    "bundle": [f"{index:08x}" for index in range(len(names))],
+                    "description": ["desc"] * len(names),
+                    "data_index": list(range(len(names))),
+                }
+            )
+        },
+        version,
+    )
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    publish(tmp_path / "data", ["Dark Magician", "Dark Hole"], "2026-01-01")
+    return tmp_path / "data"
+
+
+@pytest.fixture
+def server(data_dir):
+    server = LookupServer(str(data_dir), port=0)
+    server.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def client(server):
+    return LookupClient("http://%s:%d" % server.address)
+
+
+class TestLookupServer:
+    def test_version(self, client):
+        assert client.version() == "2026-01-01"
+
+    def test_batched_lookup(self, client):
+        response = client.lookup(
+            names=["Dark Hole", "Pot of Greed"],
+            bundles=["00000000"],
+            ids=[0, 5],
+            prefixes=["dark"],
+        )
+        assert response == {
+            "version": "2026-01-01",
+            "names": {"Dark Hole": "00000001", "Pot of Greed": None},
+            "bundles": {"00000000": ["cards"]},
+            "ids": {
+                "0": {
+                    "data_index": 0,
+                    "description": "desc",
+                    "bundle": "00000000",
+                    "name": "Dark Magician",
+                },
+                "5": None,
+            },
+            "prefixes": {"dark": ["Dark Hole", "Dark Magician"]},
+        }
+
+    def test_search(self, client):
+        with urlopen(client.url + "/search?prefix=dark+m&limit=5") as response:
+            assert json.load(response)["names"] == ["Dark Magician"]
+
+    @pytest.mark.parametrize(
+        "body",
+        [b"[]", b"{not json", b'{"ids": ["1"]}', b'{"ids": [true]}', b'{"cards": []}'],
+    )
+    def test_invalid_lookup_is_rejected(self, client, body):
+        with pytest.raises(HTTPError) as error:
+            urlopen(Request(client.url + "/lookup", body))
+        assert error.value.code == 400
+
+    @pytest.mark.parametrize("limit", ["-1", "10001", "x"])
+    def test_invalid_search_limit_is_rejected(self, client, limit):
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{client.url}/search?prefix=dark&limit={limit}")
+        assert error.value.code == 400
+
+    def test_batch_size_is_limited(self, server, client):
+        server.max_batch = 1
+        with pytest.raises(HTTPError) as error:
+            client.lookup(names=["a", "b"])
+        assert error.value.code == 400
+
+    def test_reloads_new_version(self, server, client, data_dir):
+        assert not server.reload_if_changed()
+
+        publish(data_dir, ["Dark Magician", "Dark Hole", "Raigeki"], "2026-01-02")
+        assert server.reload_if_changed()
+
+        assert client.version() == "2026-01-02"
+        assert client.lookup(names=["Raigeki"])["names"] == {"Raigeki": "00000002"}
+
+    def test_missing_version_keeps_loaded_data(self, server, client, data_dir):
+        (data_dir / "version.txt").unlink()
+        assert not server.reload_if_changed()
+        assert client.version() == "2026-01-01"
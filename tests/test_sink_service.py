@@ -0,0 +1,126 @@
+"""Tests for SinkService streaming and reduction of extracted records."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import pytest
+
+from services.metrics_service import METRICS
+from services.sink_service import SinkService
+from tables import ID_SCHEMAS
+
+
+@pytest.fixture
+def sink_service(tmp_path):
+    service = SinkService(str(tmp_path / "records"))
+    service.batch_size = 2
+    service.reset()
+    return service
+
+
+def collect(sink_service, *parts):
+    """Emit the records of each part through its own sink and collect them."""
+    for index, records in enumerate(parts):
+        with sink_service.open(index) as sink:
+            for record in records:
+                sink.emit(*record)
+    return {
+        category: table.to_pylist()
+        for category, table in sink_service.collect().items()
+    }
+
+
+class TestSinkService:
+    def test_empty_scan_has_empty_tables(self, sink_service):
+        tables = sink_service.collect()
+        assert set(tables) == set(ID_SCHEMAS)
+        for category, table in tables.items():
+            assert table.schema == ID_SCHEMAS[category]
+            assert table.num_rows == 0
+
+    def test_records_written_in_batches(self, sink_service):
+        with sink_service.open(0) as sink:
+            for bundle in ["a", "b", "c"]:
+                sink.emit("sleeve", bundle)
+            # Two records fill a batch, the third is still buffered
+            assert len(sink.buffers["sleeve"]) == 1
+            assert "sleeve" in sink.writers
+
+    def test_later_card_id_wins(self, sink_service):
+        ids = collect(
+            sink_service,
+            [("card_id", "a", "1"), ("card_id", "b", "2")],
+            [("card_id", "a", "3")],
+        )
+        assert ids["card_id"] == [
+            {"name": "a", "bundle": "3"},
+            {"name": "b", "bundle": "2"},
+        ]
+
+    def test_later_part_wins_regardless_of_write_order(self, sink_service):
+        with sink_service.open(1) as sink:
+            sink.emit("card_data", "card_name.bytes", "new")
+        with sink_service.open(0) as sink:
+            sink.emit("card_data", "card_name.bytes", "old")
+        assert sink_service.collect()["card_data"].to_pylist() == [
+            {"bundle": "new", "name": "card_name.bytes"}
+        ]
+
+    def test_list_categories_deduplicated_in_order(self, sink_service):
+        ids = collect(
+            sink_service,
+            [("sleeve", "s2"), ("sleeve", "s1"), ("coin", "c1")],
+            [("sleeve", "s1"), ("sleeve", "s3"), ("field", "f1")],
+        )
+        assert [row["bundle"] for row in ids["sleeve"]] == ["s2", "s1", "s3"]
+        assert ids["coin"] == [{"bundle": "c1"}]
+        assert ids["field"] == [{"bundle": "f1"}]
+
+    def test_icon_bundles_deduplicated(self, sink_service):
+        ids = collect(
+            sink_service,
+            [("icon", "100", "bundle_a")],
+            [("icon", "100", "bundle_a"), ("icon", "100", "bundle_b")],
+        )
+        assert ids["icon"] == [{"name": "100", "bundles": ["bundle_a", "bundle_b"]}]
+
+    def test_faces_keep_key_and_bundle(self, sink_service):
+        ids = collect(
+            sink_service, [("face", "Normal", 0, "b1"), ("face", "Effect", 1, "b2")]
+        )
+        assert ids["face"] == [
+            {"name": "Normal", "key": 0, "bundle": "b1"},
+            {"name": "Effect", "key": 1, "bundle": "b2"},
+        ]
+
+    def test_deck_box_sizes_merged_by_name(self, sink_service):
+        ids = collect(
+            sink_service,
+            [("deck_box", "1", "small", "a"), ("deck_box", "2", "", "u")],
+            [("deck_box", "1", "large", "b")],
+        )
+        first, second = ids["deck_box"]
+        assert (first["name"], first["small"], first["large"]) == ("1", "a", "b")
+        assert first["unknown"] is None
+        assert (second["name"], second["unknown"]) == ("2", "u")
+
+    def test_wallpaper_parts_merged_by_name(self, sink_service):
+        ids = collect(
+            sink_service,
+            [("wallpaper", "0001", "icon", "i"), ("wallpaper", "0002", None, "x")],
+            [("wallpaper", "0001", "front", "f")],
+        )
+        assert ids["wallpaper"] == [
+            {"front": "f", "back": None, "icon": "i", "name": "0001"},
+            {"front": None, "back": None, "icon": None, "name": "0002"},
+        ]
+
+    def test_records_counted_in_metrics(self, sink_service):
+        METRICS.reset()
+        collect(sink_service, [("coin", "c1"), ("coin", "c1")], [("coin", "c2")])
+        assert METRICS.counters["records.coin"] == 3
+
+    def test_reset_removes_previous_records(self, sink_service):
+        with sink_service.open(0) as sink:
+            sink.emit("coin", "c1")
+        sink_service.reset()
+        assert sink_service.collect()["coin"].num_rows == 0
@@ -0,0 +1,153 @@
+"""Tests for the synthetic installs scanned by the benchmark."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import os
+
+import pytest
+import UnityPy
+
+from bench.synthetic import SyntheticGame, build_bundle
+from services import game_service
+from services.bundle_cache_service import BundleCacheService
+from services.data_service import DataService
+from services.metrics_service import METRICS
+from util import Install, Workspace
+
+
+@pytest.fixture
+def synthetic_game(tmp_path):
+    game = SyntheticGame(str(tmp_path / "game"), seed=1)
+    game.counts = game.generate(40)
+    return game
+
+
+class TestBuildBundle:
+    def test_bundle_is_readable(self, tmp_path):
+        path = tmp_path / "bundle"
+        path.write_bytes(
+            build_bundle(
+                "0a1b2c3d",
+                [
+                    ("assets/a.png", 28, {"m_Name": "A", "m_Width": 512}),
+                    (None, 49, {"m_Name": "B", "m_Script": "text"}),
+                ],
+            )
+        )
+
+        env = UnityPy.load(str(path))
+        assert list(env.container.keys()) == ["assets/a.png"]
+        objects = {obj.read().m_Name: obj.read() for obj in env.objects}
+        assert objects["A"].m_Width == 512
+        assert objects["B"].m_Script == "text"
+
+
+class TestSyntheticGame:
+    def test_same_seed_gives_same_bundles(self, synthetic_game, tmp_path):
+        other = SyntheticGame(str(tmp_path / "other"), seed=1)
+        other.generate(40)
+        assert other.names == synthetic_game.names
+
+    def test_bundles_in_two_hex_prefix_directories(self, synthetic_game):
+        bundles = 0
+        for path in (synthetic_game.game_path, synthetic_game.streaming_path):
+            for directory, _, files in os.walk(path):
+                for bundle in files:
+                    assert os.path.basename(directory) == bundle[:2]
+                    bundles += 1
+        assert bundles == sum(synthetic_game.counts.values()) == 40
+
+    def test_scan_finds_every_category(self, synthetic_game, tmp_path, config):
+        config.override(num_threads=2)
+
+        service = DataService(
+            Workspace(str(tmp_path / "workspace")), Install(synthetic_game.game_path)
+        )
+        service.get_ids()
+
+        ids = service.checkpoint_service.get("ids")
+        for category in ("card_id", "sleeve", "field", "coin", "card_data"):
+            assert ids[category].num_rows > 0, category
+        assert len(ids["icon"]["bundles"].to_pylist()[0]) == 3
+        assert set(ids["face"]["name"].to_pylist()) == set(
+            game_service.GameService.face_names.values()
+        )
+        assert ids["deck_box"].to_pylist()[0]["large"] is not None
+        assert ids["wallpaper"].to_pylist()[0]["front"] is not None
+        assert sorted(ids["card_data"]["name"].to_pylist()) == [
+            "card_desc.bytes",
+            "card_indx.bytes",
+            "card_name.bytes",
+            "card_prop.bytes",
+        ]
+
+    def test_scan_publishes_progress(self, synthetic_game, tmp_path, config):
+        config.override(num_threads=2)
+        METRICS.reset()
+
+        DataService(
+            Workspace(str(tmp_path / "workspace")), Install(synthetic_game.game_path)
+        ).get_ids()
+
+        live = METRICS.live()
+        assert live["progress"]["scan"]["bundles"] == live["counters"]["bundles"] == 40
+        assert (
+            live["progress"]["scan"]["finished"] >= live["progress"]["scan"]["started"]
+        )
+        workers = [live["progress"][f"worker {part}"] for part in range(2)]
+        assert all(worker["done"] == worker["directories"] for worker in workers)
+        assert sum(worker["records"]["sleeve"] for worker in workers) == (
+            live["counters"]["records.sleeve"]
+        )
+
+    def test_part_in_two_bundles_is_replaced_whole(
+        self, synthetic_game, tmp_path, config
+    ):
+        config.override(num_threads=2)
+        # A second bundle carrying the card_prop part, with other content
+        synthetic_game._write(synthetic_game._card_data(0)[3])
+        contents = []
+        for path in (synthetic_game.game_path, synthetic_game.streaming_path):
+            for directory, _, files in os.walk(path):
+                for bundle in files:
+                    env = UnityPy.load(os.path.join(directory, bundle))
+                    if any("card_prop" in key for key in env.container):
+                        contents += [
+                            obj.read().m_Script.encode("utf-8", "surrogateescape")
+                            for obj in env.objects
+                            if obj.type.name == "TextAsset"
+                        ]
+        assert len(contents) == 2
+
+        workspace = tmp_path / "workspace"
+        service = DataService(
+            Workspace(str(workspace)), Install(synthetic_game.game_path)
+        )
+        reported = []
+        service.on_extracted = reported.append
+        service.get_ids()
+
+        assert reported.count(str(workspace / "card_prop.bytes")) == 2
+        assert (workspace / "card_prop.bytes").read_bytes() in contents
+        assert not list(workspace.glob("*.tmp"))
+
+    def test_second_install_replays_cached_bundles(
+        self, synthetic_game, tmp_path, config
+    ):
+        config.override(num_threads=2)
+        cache = BundleCacheService(str(tmp_path / "cache"))
+        install = Install(synthetic_game.game_path)
+
+        ids = []
+        for name in ("first", "second"):
+            METRICS.reset()
+            service = DataService(Workspace(str(tmp_path / name)), install, cache)
+            service.get_ids()
+            ids.append(service.checkpoint_service.get("ids"))
+
+        assert METRICS.report()["counters"]["bundles_cached"] == 40
+        for category, table in ids[0].items():
+            assert ids[1][category].equals(table), category
+        assert (tmp_path / "second" / "card_prop.bytes").read_bytes() == (
+            tmp_path / "first" / "card_prop.bytes"
+        ).read_bytes()
@@ -0,0 +1,102 @@
+"""Tests for the typed stage tables in etl/tables.py."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring
+
+import pyarrow as pa
+import pytest
+
+from tables import ID_SCHEMAS, validate_table, validate_tables
+
+
+class TestRecordsToTables:
+    def test_no_records_has_every_category(self, id_tables):
+        tables = id_tables()
+        assert set(tables) == set(ID_SCHEMAS)
+        for category, table in tables.items():
+            assert table.schema == ID_SCHEMAS[category]
+            assert table.num_rows == 0
+
+    def test_deck_box_sizes_pivoted(self, id_tables):
+        tables = id_tables(deck_box=[("12", "small", "s"), ("12", "large", "l")])
+        box = tables["deck_box"].to_pylist()[0]
+        assert box["name"] == "12"
+        assert box["small"] == "s"
+        assert box["medium"] is None
+
+    def test_unmatched_deck_box_size_kept_as_unknown(self, id_tables):
+        tables = id_tables(deck_box=[("1", "", "u")])
+        assert tables["deck_box"]["unknown"].to_pylist() == ["u"]
+
+    def test_nested_categories(self, id_tables):
+        tables = id_tables(
+            icon=[("100", "a"), ("100", "b"), ("100", "c")],
+            face=[("Normal", 5, "f")],
+            wallpaper=[("0001", "front", "f"), ("0001", "back", "b")],
+            card_icon=[("x", 1.0, 2.0, 3.0, 4.0)],
+        )
+        assert tables["icon"]["bundles"].to_pylist() == [["a", "b", "c"]]
+        assert tables["face"].to_pylist() == [
+            {"name": "Normal", "key": 5, "bundle": "f"}
+        ]
+        assert tables["wallpaper"]["icon"].to_pylist() == [None]
+        assert tables["card_icon"]["height"].to_pylist() == [4.0]
+
+
+def _cards(**columns):
+    return pa.Table.from_pydict(
+        {
+            "data_index": [0, 1],
+            "description": ["a", "b"],
+            "bundle": ["0a1b2c3d", "4e5f6a7b"],
+            "name": ["Dark Magician", "Dark Hole"],
+            **columns,
+        }
+    )
+
+
+class TestValidateTable:
+    def test_valid_table(self):
+        assert not validate_table("cards", _cards())
+
+    def test_bundle_pattern(self):
+        errors = validate_table("cards", _cards(bundle=["0a1b2c3d", "0A1B2C3D"]))
+        assert errors == [
+            "cards.bundle: values not matching ^[0-9a-f]{8}$, such as ['0A1B2C3D']"
+        ]
+
+    def test_unique_and_bounds(self):
+        errors = validate_table(
+            "cards", _cards(name=["Dark Hole", "Dark Hole"], data_index=[0, -1])
+        )
+        assert errors == [
+            "cards.name: 1 duplicated values, such as ['Dark Hole']",
+            "cards.data_index: negative values, such as [-1]",
+        ]
+
+    def test_schema_and_nulls(self):
+        table = _cards(data_index=["0", "x"], bundle=["0a1b2c3d", None]).drop(
+            ["description"]
+        )
+        assert validate_table("cards", table) == [
+            "cards.data_index: string is not int64",
+            "cards.description: missing",
+            "cards.bundle: 1 nulls",
+        ]
+
+    def test_rows_and_required_names(self):
+        metadata = pa.Table.from_pydict(
+            {"bundle": [], "name": []},
+            schema=pa.schema([("bundle", pa.string()), ("name", pa.string())]),
+        )
+        errors = validate_table("metadata", metadata)
+        assert errors[0] == "metadata: 0 rows, expected 1+"
+        assert errors[1].startswith("metadata.name: missing ['card_name.bytes'")
+
+    def test_validate_tables_lists_every_error(self):
+        with pytest.raises(ValueError, match="cards.bundle(.|\n)*sleeves.bundle"):
+            validate_tables(
+                {
+                    "cards": _cards(bundle=["x", "0a1b2c3d"]),
+                    "sleeves": pa.Table.from_pydict({"bundle": ["y"]}),
+                }
+            )
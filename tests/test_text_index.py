@@ -0,0 +1,89 @@
+"""Tests for the trigram index over the text of the cards."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import pyarrow as pa
+import pytest
+
+from tables import TEXT_INDEX_SCHEMA
+from text_index import TextIndex, build_text_index, trigrams
+
+
+@pytest.fixture
+def cards():
+    return pa.Table.from_pydict(
+        {
+            "data_index": [12, 10, 11, 13],
+            "name": ["Blue-Eyes", "Dark Magician", "Dark Hole", "Pot of Greed"],
+            "description": [
+                "A legendary dragon.",
+                "The ultimate wizard.",
+                "Destroy all monsters on the field.",
+                "Draw 2 cards.",
+            ],
+            "bundle": ["0c", "0a", "0b", "0d"],
+        }
+    )
+
+
+@pytest.fixture
+def index(cards):
+    return TextIndex(build_text_index(cards), cards)
+
+
+def test_trigrams_ignore_case():
+    assert trigrams("DarK") == {"dar", "ark"}
+    assert trigrams("ab") == set()
+
+
+class TestBuildTextIndex:
+    def test_postings_are_sorted_data_indexes(self, cards):
+        table = build_text_index(cards)
+
+        assert table.schema == TEXT_INDEX_SCHEMA
+        assert table["trigram"].to_pylist() == sorted(table["trigram"].to_pylist())
+        rows = dict(zip(table["trigram"].to_pylist(), table.to_pylist()))
+        assert rows["dar"]["name_postings"] == [10, 11]
+        assert rows["dra"]["name_postings"] == []
+        assert rows["dra"]["description_postings"] == [12, 13]
+
+    def test_postings_are_distinct(self):
+        cards = pa.Table.from_pydict(
+            {
+                "data_index": [3, 3, 1],
+                "name": ["Dark Hole", "Dark Hole", "Dark Magician"],
+                "description": ["", "", ""],
+            }
+        )
+        table = build_text_index(cards)
+        rows = dict(zip(table["trigram"].to_pylist(), table.to_pylist()))
+
+        assert rows["dar"]["name_postings"] == [1, 3]
+        assert TextIndex(build_text_index(cards), cards).search("dark") == [1, 3]
+
+
+class TestTextIndex:
+    def test_search_intersects_postings(self, index):
+        assert index.search("dark") == [10, 11]
+        assert index.search("DARK HOLE") == [11]
+
+    def test_search_checks_candidates(self):
+        cards = pa.Table.from_pydict(
+            {"data_index": [0], "name": ["Abcab"], "description": [""]}
+        )
+        index = TextIndex(build_text_index(cards), cards)
+
+        # Every trigram of "bcabc" is in "Abcab", but the text is not
+        assert index.search("abcab") == [0]
+        assert index.search("bcabc") == []
+        assert index.search("unknown") == []
+
+    def test_search_shorter_than_a_trigram(self, index):
+        assert index.search("dr") == [12, 13]
+        assert index.search("") == [10, 11, 12, 13]
+
+    def test_search_fields(self, index):
+        assert index.search("dra", fields=("name",)) == []
+        assert index.search("dra", fields=("description",)) == [12, 13]
+        with pytest.raises(KeyError):
+            index.search("dra", fields=("bundle",))
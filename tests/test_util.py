@@ -2,7 +2,19 @@
 
 # pylint: disable=missing-class-docstring,missing-function-docstring,use-implicit-booleaness-not-comparison,duplicate-code
 
-from util import chunkify, get_data_wrapper, merge_nested_dict_lists, merge_nested_dicts
+import os
+
+import pytest
+
+from util import (
+    DATA_PATH,
+    Config,
+    SHM_PATH,
+    Install,
+    Workspace,
+    chunkify,
+    load_installs,
+)
 
 
 class TestChunkify:
@@ -34,101 +46,111 @@ class TestChunkify:
         assert [item for chunk in result for item in chunk] == items
 
 
-class TestMergeNestedDicts:
-    def test_adds_new_key(self):
-        d1 = {"a": 1}
-        merge_nested_dicts(d1, {"b": 2})
-        assert d1 == {"a": 1, "b": 2}
-
-    def test_overwrites_scalar_value(self):
-        d1 = {"a": 1}
-        merge_nested_dicts(d1, {"a": 99})
-        assert d1["a"] == 99
-
-    def test_recursive_merge(self):
-        d1 = {"nested": {"x": 1}}
-        merge_nested_dicts(d1, {"nested": {"y": 2}})
-        assert d1["nested"] == {"x": 1, "y": 2}
-
-    def test_deep_recursive_merge(self):
-        d1 = {"a": {"b": {"c": 1}}}
-        merge_nested_dicts(d1, {"a": {"b": {"d": 2}}})
-        assert d1 == {"a": {"b": {"c": 1, "d": 2}}}
-
-    def test_empty_dicts(self):
-        assert merge_nested_dicts({}, {}) == {}
-
-    def test_returns_dict1_reference(self):
-        d1 = {"a": 1}
-        result = merge_nested_dicts(d1, {"b": 2})
-        assert result is d1
-
-    def test_does_not_modify_dict2(self):
-        d2 = {"x": {"y": 1}}
-        merge_nested_dicts({}, d2)
-        assert d2 == {"x": {"y": 1}}
-
-
-class TestMergeNestedDictLists:
-    def test_adds_new_icon_key(self):
-        d1 = {"icon": {}}
-        merge_nested_dict_lists(d1, {"icon": {"id1": ["bundle_a"]}})
-        assert d1["icon"]["id1"] == ["bundle_a"]
-
-    def test_extends_existing_list(self):
-        d1 = {"icon": {"id1": ["bundle_a"]}}
-        merge_nested_dict_lists(d1, {"icon": {"id1": ["bundle_b"]}})
-        assert set(d1["icon"]["id1"]) == {"bundle_a", "bundle_b"}
-
-    def test_deduplicates_on_extend(self):
-        d1 = {"icon": {"id1": ["bundle_a", "bundle_b"]}}
-        merge_nested_dict_lists(d1, {"icon": {"id1": ["bundle_a", "bundle_c"]}})
-        assert d1["icon"]["id1"].count("bundle_a") == 1
-        assert "bundle_b" in d1["icon"]["id1"]
-        assert "bundle_c" in d1["icon"]["id1"]
-
-    def test_multiple_keys_merged(self):
-        d1 = {"icon": {"1": ["a"]}}
-        merge_nested_dict_lists(d1, {"icon": {"2": ["b"], "3": ["c"]}})
-        assert set(d1["icon"].keys()) == {"1", "2", "3"}
-
-
-class TestGetDataWrapper:
-    def test_has_all_required_keys(self):
-        expected = {
-            "card_id",
-            "sleeve",
-            "icon",
-            "deck_box",
-            "field",
-            "wallpaper",
-            "card_data",
-            "face",
-            "coin",
-            "card_icon",
-        }
-        assert set(get_data_wrapper().keys()) == expected
-
-    def test_dict_values_are_empty(self):
-        wrapper = get_data_wrapper()
-        for key in (
-            "card_id",
-            "icon",
-            "deck_box",
-            "wallpaper",
-            "card_data",
-            "face",
-            "card_icon",
-        ):
-            assert wrapper[key] == {}, f"Expected empty dict for '{key}'"
-
-    def test_list_values_are_empty(self):
-        wrapper = get_data_wrapper()
-        for key in ("sleeve", "field", "coin"):
-            assert wrapper[key] == [], f"Expected empty list for '{key}'"
-
-    def test_returns_independent_instances(self):
-        w1 = get_data_wrapper()
-        w2 = get_data_wrapper()
-        w1["sleeve"].append("sentinel")
-        assert w2["sleeve"] == []
+class TestWorkspace:
+    def test_creates_directory(self, tmp_path):
+        workspace = Workspace(str(tmp_path / "run"))
+        assert (tmp_path / "run").is_dir()
+        assert workspace.path("ids", "card_id.arrow") == str(
+            tmp_path / "run" / "ids" / "card_id.arrow"
+        )
+
+    def test_clear_keeps_directory(self, tmp_path):
+        workspace = Workspace(str(tmp_path / "run"))
+        (tmp_path / "run" / "ids").mkdir()
+        (tmp_path / "run" / "card_name.bytes").write_bytes(b"data")
+
+        workspace.clear()
+
+        assert (tmp_path / "run").is_dir()
+        assert not list((tmp_path / "run").iterdir())
+
+    @pytest.mark.parametrize("in_memory", [False, True])
+    def test_temporary_workspaces_are_separate(self, in_memory):
+        first = Workspace.temporary(in_memory)
+        second = Workspace.temporary(in_memory)
+        try:
+            assert first.directory != second.directory
+            if in_memory and os.path.isdir(SHM_PATH):
+                assert first.directory.startswith(SHM_PATH)
+        finally:
+            first.remove()
+            second.remove()
+
+        assert not os.path.exists(first.directory)
+
+
+class TestLoadInstalls:
+    def test_single_game_path_publishes_to_data_path(self):
+        installs = load_installs({"game_path": "/game/LocalData/5eed0000/0000"})
+        assert [(i.name, i.output_dir) for i in installs] == [("default", DATA_PATH)]
+
+    def test_install_list_in_config_order(self):
+        installs = load_installs(
+            {
+                "installs": [
+                    {"name": "live", "game_path": "/live/LocalData/5eed0000/0000"},
+                    {
+                        "name": "test",
+                        "game_path": "/test/LocalData/5eed0000/0000",
+                        "output_dir": "/out/test",
+                    },
+                ]
+            }
+        )
+        assert [(i.name, i.output_dir) for i in installs] == [
+            ("live", os.path.join(DATA_PATH, "live")),
+            ("test", "/out/test"),
+        ]
+
+    @pytest.mark.parametrize("names", [[], ["live", "live"]])
+    def test_missing_or_duplicate_names_raise(self, names):
+        entries = [{"name": name, "game_path": "/game"} for name in names]
+        with pytest.raises(ValueError):
+            load_installs({"installs": entries})
+
+
+class TestInstall:
+    def test_paths_from_game_path(self):
+        install = Install(os.path.join("/game", "LocalData", "5eed0000", "0000"))
+        assert install.streaming_path == os.path.join(
+            "/game", "masterduel_Data", "StreamingAssets", "AssetBundle"
+        )
+        assert install.unity3d_path == os.path.join(
+            "/game", "masterduel_Data", "data.unity3d"
+        )
+
+
+class TestConfig:
+    @pytest.fixture
+    def config_path(self, tmp_path):
+        path = tmp_path / "config.json"
+        path.write_text(
+            '{"game_path": "/game/LocalData/5eed0000/0000", "num_threads": 4, '
+            '"excluded_sleeves": ["0a1b2c3d"]}',
+            encoding="utf-8",
+        )
+        return str(path)
+
+    def test_file_read_on_first_use(self, tmp_path, config_path):
+        config = Config(str(tmp_path / "missing.json"))
+        config.load(config_path)
+        assert config.num_threads == 4
+        assert config.excluded_sleeves == ["0a1b2c3d"]
+        assert config.field_store == "./etl/res/fields.json"
+        assert config.game_path == "/game/LocalData/5eed0000/0000"
+
+    def test_missing_file_raises_on_use(self, tmp_path):
+        config = Config(str(tmp_path / "missing.json"))
+        with pytest.raises(FileNotFoundError):
+            _ = config.num_threads
+
+    def test_overrides_until_reset(self, config_path):
+        config = Config(config_path)
+        installs = config.installs
+        config.override(num_threads=1, game_path="/other/LocalData/5eed0000/0000")
+        assert config.num_threads == 1
+        assert config.game_path == "/other/LocalData/5eed0000/0000"
+
+        config.reset()
+        assert config.num_threads == 4
+        assert config.installs[0].game_path == installs[0].game_path
@@ -0,0 +1,197 @@
+"""Tests for WriterService publishing of the output tables."""
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,redefined-outer-name
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from services.writer_service import WriterService
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    return tmp_path / "data"
+
+
+@pytest.fixture
+def tables():
+    return {
+        "coins": pa.Table.from_pydict({"bundle": ["0a1b2c3d"]}),
+        "cards": pa.Table.from_pydict(
+            {
+                "name": ["Card"],
+                "bundle": ["0a1b2c3d"],
+                "description": ["desc"],
+                # Declared as int64 in the output schema
+                "data_index": pa.array([3], pa.int32()),
+            }
+        ),
+    }
+
+
+class TestWriterService:
+    def test_writes_tables_with_declared_schema(self, output_dir, tables):
+        WriterService(str(output_dir)).write(tables, "2026-01-01")
+        cards = pq.read_table(output_dir / "cards.parquet")
+        assert cards.column_names == ["data_index", "description", "bundle", "name"]
+        assert cards.schema.field("data_index").type == pa.int64()
+        assert (output_dir / "coins.parquet").exists()
+        assert (output_dir / "version.txt").read_text(encoding="utf-8") == "2026-01-01"
+
+    def test_replaces_previous_output(self, output_dir, tables):
+        output_dir.mkdir()
+        (output_dir / "version.txt").write_text("old", encoding="utf-8")
+        (output_dir / "notes.md").write_text("kept", encoding="utf-8")
+
+        writer = WriterService(str(output_dir))
+        writer.write(tables, "new")
+
+        assert (output_dir / "version.txt").read_text(encoding="utf-8") == "new"
+        assert (output_dir / "notes.md").read_text(encoding="utf-8") == "kept"
+        assert not (output_dir.parent / "data.staging").exists()
+        assert not (output_dir.parent / "data.previous").exists()
+
+    def test_keeps_output_of_other_installs(self, output_dir, tables):
+        (output_dir / "live").mkdir(parents=True)
+        (output_dir / "live" / "version.txt").write_text("live", encoding="utf-8")
+
+        WriterService(str(output_dir)).write(tables, "new")
+
+        assert (output_dir / "live" / "version.txt").read_text(encoding="utf-8") == (
+            "live"
+        )
+
+    def test_decoded_table_cache_not_copied(self, output_dir, tables):
+        (output_dir / ".arrow").mkdir(parents=True)
+        (output_dir / ".arrow" / "cards-1-1.arrow").write_bytes(b"cache")
+
+        WriterService(str(output_dir)).write(tables, "new")
+
+        assert not (output_dir / ".arrow").exists()
+
+    def test_failed_write_leaves_output_untouched(self, output_dir, tables):
+        output_dir.mkdir()
+        (output_dir / "version.txt").write_text("old", encoding="utf-8")
+        tables["coins"] = pa.Table.from_pydict({"wrong": ["x"]})
+
+        with pytest.raises(KeyError):
+            WriterService(str(output_dir)).write(tables, "new")
+
+        assert [path.name for path in output_dir.iterdir()] == ["version.txt"]
+        assert (output_dir / "version.txt").read_text(encoding="utf-8") == "old"
+
+    def test_recovers_interrupted_publish(self, output_dir, tables):
+        previous_dir = output_dir.parent / "data.previous"
+        previous_dir.mkdir()
+        (previous_dir / "notes.md").write_text("kept", encoding="utf-8")
+
+        WriterService(str(output_dir)).write(tables, "new")
+
+        assert (output_dir / "notes.md").exists()
+        assert not previous_dir.exists()
+
+    def test_tables_sorted_by_lookup_keys(self, output_dir, tables):
+        tables["cards"] = pa.Table.from_pydict(
+            {
+                "name": ["B", "A", "C"],
+                "bundle": ["00000002", "00000001", "00000003"],
+                "description": ["b", "a", "c"],
+                "data_index": [2, 1, 3],
+            }
+        )
+        WriterService(str(output_dir)).write(tables, "v")
+
+        cards = pq.read_table(output_dir / "cards.parquet")
+        assert cards["name"].to_pylist() == ["A", "B", "C"]
+        assert cards["data_index"].to_pylist() == [1, 2, 3]
+
+    def test_lookup_profile_metadata(self, output_dir, tables):
+        WriterService(str(output_dir)).write(tables, "v")
+
+        metadata = pq.ParquetFile(output_dir / "cards.parquet").metadata
+        row_group = metadata.row_group(0)
+        name_column = row_group.column(3)
+        assert name_column.path_in_schema == "name"
+        assert name_column.compression == "ZSTD"
+        assert name_column.statistics.has_min_max
+        assert [column.column_index for column in row_group.sorting_columns] == [3, 2]
+
+    def test_point_lookup_with_filter(self, output_dir, tables):
+        WriterService(str(output_dir)).write(tables, "v")
+        found = pq.read_table(
+            output_dir / "cards.parquet", filters=[("name", "==", "Card")]
+        )
+        assert found["bundle"].to_pylist() == ["0a1b2c3d"]
+
+    def test_unchanged_tables_not_republished(self, output_dir, tables):
+        writer = WriterService(str(output_dir))
+        assert writer.write(tables, "v1")
+        coins_mtime = (output_dir / "coins.parquet").stat().st_mtime_ns
+
+        assert not writer.write(tables, "v2")
+        assert (output_dir / "version.txt").read_text(encoding="utf-8") == "v1"
+        assert (output_dir / "coins.parquet").stat().st_mtime_ns == coins_mtime
+
+    def test_only_changed_files_rewritten(self, output_dir, tables):
+        writer = WriterService(str(output_dir))
+        writer.write(tables, "v1")
+        coins_bytes = (output_dir / "coins.parquet").read_bytes()
+
+        tables["cards"] = tables["cards"].set_column(
+            1, "bundle", pa.array(["ffffffff"])
+        )
+        assert writer.write(tables, "v2")
+        assert (output_dir / "coins.parquet").read_bytes() == coins_bytes
+        assert (output_dir / "version.txt").read_text(encoding="utf-8") == "v2"
+
+    def test_changelog_lists_row_changes(self, output_dir, tables):
+        writer = WriterService(str(output_dir))
+        writer.write(tables, "v1")
+
+        tables["coins"] = pa.Table.from_pydict({"bundle": ["11111111"]})
+        tables["cards"] = tables["cards"].set_column(
+            1, "bundle", pa.array(["ffffffff"])
+        )
+        writer.write(tables, "v2")
+
+        changelog = pq.read_table(output_dir / "changelog.parquet")
+        rows = sorted(
+            (row["table"], row["change"], row["key"]) for row in changelog.to_pylist()
+        )
+        assert rows == [
+            ("cards", "rebundled", "Card"),
+            ("coins", "added", "11111111"),
+            ("coins", "removed", "0a1b2c3d"),
+        ]
+        assert set(changelog["version"].to_pylist()) == {"v2"}
+
+    def test_first_write_lists_all_rows_as_added(self, output_dir, tables):
+        WriterService(str(output_dir)).write(tables, "v1")
+        changelog = pq.read_table(output_dir / "changelog.parquet")
+        assert set(changelog["change"].to_pylist()) == {"added"}
+        assert changelog.num_rows == 2
+
+    def test_changelog_tells_rebundled_from_changed_rows(self, output_dir, tables):
+        writer = WriterService(str(output_dir))
+        writer.write(tables, "v1")
+
+        tables["cards"] = tables["cards"].set_column(
+            2, "description", pa.array(["new desc"])
+        )
+        assert writer.write(tables, "v2")
+
+        changelog = pq.read_table(output_dir / "changelog.parquet")
+        assert changelog.select(["table", "change", "key"]).to_pylist() == [
+            {"table": "cards", "change": "changed", "key": "Card"}
+        ]
+
+    def test_same_rows_with_other_settings_not_republished(self, output_dir, tables):
+        writer = WriterService(str(output_dir))
+        writer.write(tables, "v1")
+        cards_bytes = (output_dir / "cards.parquet").read_bytes()
+
+        writer.compression = "gzip"
+        assert not writer.write(tables, "v2")
+        assert (output_dir / "version.txt").read_text(encoding="utf-8") == "v1"
+        assert (output_dir / "cards.parquet").read_bytes() == cards_bytes